@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# File name: bench_chain.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides a benchmark of chained calculations.
+
+    python3 benchmarks/bench_chain.py [--rows N] [--repeat N]
+
+Runs two chains, D341 -> Reynolds number -> flow type and oil mixture at
+40/100°C -> viscosity index, three ways:
+
+    strings:   the calculators, every result passed on as the text the GUI
+               shows and parsed again
+    rounded:   lubricalc.columnar, rounded results passed on as floats
+    unrounded: lubricalc.columnar with rounded=False, full precision
+               floats passed on, rounded by present() at the end
+
+and prints the time per row and how many final results differ from the
+unrounded ones.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark this checkout, not an installed Lubricalc
+sys.path.insert(0, ROOT)
+
+from lubricalc import columnar
+from lubricalc.exception import ConceptError
+from lubricalc.mixture import OilMixture
+from lubricalc.reynolds import Reynolds
+from lubricalc.viscosity import Viscosity
+
+ERRORS = (ValueError, ConceptError)
+
+
+def inputs(rows, seed=0):
+    rand = random.Random(seed)
+    viscosity100 = [round(rand.uniform(4, 30), 2) for _ in range(rows)]
+    return {
+        'viscosity40': [round(v * rand.uniform(5.5, 9), 1)
+                        for v in viscosity100],
+        'viscosity100': viscosity100,
+        'temperature': [round(rand.uniform(20, 90), 1) for _ in range(rows)],
+        'velocity': [round(rand.uniform(2, 10), 2) for _ in range(rows)],
+        'length': [round(rand.uniform(10, 100), 1) for _ in range(rows)],
+        'viscosity0': [round(rand.uniform(20, 100), 1) for _ in range(rows)],
+        'viscosity1': [round(rand.uniform(150, 680), 1)
+                       for _ in range(rows)],
+        'oil0_percent': [round(rand.uniform(5, 95), 1) for _ in range(rows)]}
+
+
+def reynolds_strings(data):
+    viscosity, reynolds = Viscosity(), Reynolds()
+    results = []
+    for row in zip(data['viscosity40'], data['viscosity100'],
+                   data['temperature'], data['velocity'], data['length']):
+        kv40, kv100, temperature, velocity, length = map(str, row)
+        at_temperature = str(viscosity.viscosity_at_any_temp(
+            kv40, kv100, temperature))
+        number = str(reynolds.reynolds_number(velocity, length,
+                                              at_temperature))
+        results.append((float(number), reynolds.flow_type(
+            velocity, length, at_temperature)))
+    return results
+
+
+def reynolds_columns(data, rounded):
+    at_temperature = columnar.viscosity_at_any_temp(
+        data['viscosity40'], data['viscosity100'], data['temperature'],
+        rounded=rounded)
+    numbers = columnar.reynolds_number(data['velocity'], data['length'],
+                                       at_temperature, rounded=rounded)
+    types = columnar.flow_type(data['velocity'], data['length'],
+                               at_temperature, rounded=rounded)
+    if not rounded:
+        numbers = columnar.present('reynolds_number', numbers)
+    return list(zip(numbers, types))
+
+
+def index_strings(data):
+    mixture, viscosity = OilMixture(), Viscosity()
+    results = []
+    for row in zip(data['viscosity0'], data['viscosity1'],
+                   data['oil0_percent']):
+        viscosity0, viscosity1, percent = map(str, row)
+        # KV100 of the base oils, as read off their data sheets
+        mix40 = str(mixture.oil_mix_viscosity(viscosity0, viscosity1,
+                                              percent, '40'))
+        mix100 = str(mixture.oil_mix_viscosity(
+            str(round(float(viscosity0) / 7, 2)),
+            str(round(float(viscosity1) / 12, 2)), percent, '100'))
+        try:
+            results.append(viscosity.viscosity_index(mix40, mix100))
+        except ERRORS:
+            results.append(None)
+    return results
+
+
+def index_columns(data, rounded):
+    mix40 = columnar.oil_mix_viscosity(
+        data['viscosity0'], data['viscosity1'], data['oil0_percent'],
+        ['40'] * len(data['viscosity0']), rounded=rounded)
+    mix100 = columnar.oil_mix_viscosity(
+        [round(v / 7, 2) for v in data['viscosity0']],
+        [round(v / 12, 2) for v in data['viscosity1']],
+        data['oil0_percent'], ['100'] * len(data['viscosity0']),
+        rounded=rounded)
+    results = columnar.viscosity_index(mix40, mix100, rounded=rounded)
+    if not rounded:
+        results = columnar.present('viscosity_index', results)
+    return [None if isinstance(result, Exception) else result
+            for result in results]
+
+
+def best(function, repeat):
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = function()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    data = inputs(args.rows)
+
+    chains = (('D341 -> Reynolds', reynolds_strings, reynolds_columns),
+              ('mixture -> VI', index_strings, index_columns))
+    for name, strings, columns in chains:
+        print(name)
+        _, reference = best(lambda: columns(data, False), 1)
+        for mode, function in (
+                ('strings', lambda: strings(data)),
+                ('rounded', lambda: columns(data, True)),
+                ('unrounded', lambda: columns(data, False))):
+            elapsed, results = best(function, args.repeat)
+            differ = sum(result != expected for result, expected
+                         in zip(results, reference))
+            print('  {0:10} {1:8.2f} us/row {2:7} results differ'.format(
+                mode, elapsed / args.rows * 1e6, differ))
+
+
+if __name__ == '__main__':
+    main()
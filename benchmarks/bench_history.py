@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# File name: bench_history.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides a benchmark of the oil analysis history store.
+
+    python3 benchmarks/bench_history.py [--samples N] [--assets N] [--db FILE]
+
+Adds N hourly samples spread over the assets to a new store in batches,
+then prints the ingestion rate and the median time of range and
+aggregate queries on one asset.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark this checkout, not an installed Lubricalc
+sys.path.insert(0, ROOT)
+
+from lubricalc.history import HistoryStore
+
+HOUR = 3600
+DAY = 24 * HOUR
+START = 1.5e9
+
+
+def samples(count, assets, seed=0):
+    rand = random.Random(seed)
+    for index in range(count):
+        viscosity40 = rand.uniform(40, 50)
+        yield {'asset': 'asset-{0}'.format(index % assets),
+               'timestamp': START + index // assets * HOUR,
+               'viscosity40': viscosity40,
+               'viscosity100': viscosity40 / rand.uniform(6.5, 7),
+               'v_index': rand.uniform(90, 110),
+               'total_ash': rand.uniform(0.5, 1),
+               'iron': rand.uniform(0, 0.01),
+               'copper': rand.uniform(0, 0.005)}
+
+
+def median_ms(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e3, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=1000000)
+    parser.add_argument('--assets', type=int, default=100)
+    parser.add_argument('--batch', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--db', help='store file (default: temporary)')
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    path = args.db or os.path.join(directory.name, 'history.db')
+    with HistoryStore(path) as store:
+        start = time.perf_counter()
+        batch = []
+        for sample in samples(args.samples, args.assets):
+            batch.append(sample)
+            if len(batch) == args.batch:
+                store.add_many(batch)
+                batch = []
+        store.add_many(batch)
+        elapsed = time.perf_counter() - start
+        print('ingest    {0:10.0f} samples/s ({1} samples, {2:.1f} s)'.format(
+            args.samples / elapsed, args.samples, elapsed))
+
+        asset = 'asset-0'
+        hours = args.samples // args.assets
+        end = START + hours * HOUR
+        queries = (
+            ('latest', lambda: store.latest(asset)),
+            ('30 days', lambda: store.samples(asset, end - 30 * DAY, end)),
+            ('summary', lambda: store.summary(asset, 'viscosity40')),
+            ('weekly', lambda: store.trend(asset, 'viscosity40',
+                                           bucket=7 * DAY)),
+            ('monthly', lambda: store.trend(asset, 'iron', end - 365 * DAY,
+                                            end, bucket=30 * DAY)))
+        for name, query in queries:
+            ms, result = median_ms(query, args.repeat)
+            rows = len(result) if isinstance(result, list) else 1
+            print('{0:9} {1:10.2f} ms ({2} rows of {3})'.format(
+                name, ms, rows, hours))
+    directory.cleanup()
+
+
+if __name__ == '__main__':
+    main()
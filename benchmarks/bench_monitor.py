@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# File name: bench_monitor.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides a replayable benchmark for FlowRegimeMonitor.
+
+Record a synthetic 1 Hz stream once, then replay it as many times as needed:
+
+    python3 benchmarks/bench_monitor.py readings.csv --record
+    python3 benchmarks/bench_monitor.py readings.csv
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark this checkout, not an installed Lubricalc
+sys.path.insert(0, ROOT)
+
+from lubricalc.monitor import FlowRegimeMonitor
+from lubricalc.monitor import read_readings
+
+
+def circuits(count):
+    """Return a deterministic set of circuits (KV40, KV100, diameter)."""
+    grades = ((32, 5.4), (46, 6.8), (68, 8.6), (100, 11.1), (150, 14.7))
+    return {'c{0}'.format(n): grades[n % len(grades)] + (0.02 + n % 4 * 0.01,)
+            for n in range(count)}
+
+
+def record(path, count, seconds, seed=0):
+    """Write a stream of oils warming up and cooling down at 1 Hz."""
+    rand = random.Random(seed)
+    with open(path, 'w') as file:
+        file.write('circuit,timestamp,flow_rate,temperature\n')
+        for second in range(seconds):
+            temperature = 45 + 25 * math.sin(second / 300)
+            for n, circuit in enumerate(circuits(count)):
+                file.write('{0},{1},{2:.2f},{3:.1f}\n'.format(
+                    circuit, second, 40 + n % 7 * 10 + rand.gauss(0, 2),
+                    temperature + rand.gauss(0, 0.5)))
+
+
+def replay(path, count):
+    monitor = FlowRegimeMonitor()
+    for circuit, (viscosity40, viscosity100, diameter) in circuits(
+            count).items():
+        monitor.add_circuit(circuit, viscosity40, viscosity100, diameter)
+
+    with open(path) as file:
+        readings = list(read_readings(file))
+
+    start = time.perf_counter()
+    events = sum(1 for _ in monitor.process(readings))
+    process_time = time.perf_counter() - start
+
+    monitor = FlowRegimeMonitor()
+    for circuit, (viscosity40, viscosity100, diameter) in circuits(
+            count).items():
+        monitor.add_circuit(circuit, viscosity40, viscosity100, diameter)
+
+    start = time.perf_counter()
+    with open(path) as file:
+        sum(1 for _ in monitor.process(read_readings(file)))
+    stream_time = time.perf_counter() - start
+
+    print('readings:              {0}'.format(len(readings)))
+    print('events:                {0}'.format(events))
+    print('process (readings/s):  {0:.0f}'.format(len(readings) /
+                                                  process_time))
+    print('parse+process (rd/s):  {0:.0f}'.format(len(readings) /
+                                                  stream_time))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='recorded readings file (CSV)')
+    parser.add_argument('--record', action='store_true',
+                        help='record a new stream before replaying it')
+    parser.add_argument('--circuits', type=int, default=300)
+    parser.add_argument('--seconds', type=int, default=1200)
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.path, args.circuits, args.seconds)
+    replay(args.path, args.circuits)
+
+
+if __name__ == '__main__':
+    main()
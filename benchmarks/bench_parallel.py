@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# File name: bench_parallel.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides a scaling benchmark for ParallelExecutor.
+
+    python3 benchmarks/bench_parallel.py [--rows N] [--calc NAME]
+
+Runs the same batch with 1, 2, ... up to os.cpu_count() workers and
+prints throughput, speedup and parallel efficiency for each.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark this checkout, not an installed Lubricalc
+sys.path.insert(0, ROOT)
+
+from lubricalc import columnar
+from lubricalc.parallel import ParallelExecutor
+
+
+def columns(calc, rows, seed=0):
+    """Return realistic input columns for calc."""
+    rand = random.Random(seed)
+    if calc == 'viscosity_at_40':
+        return {'viscosity100': [round(rand.uniform(4, 30), 2)
+                                 for _ in range(rows)],
+                'v_index': [rand.randint(80, 160) for _ in range(rows)]}
+    if calc == 'viscosity_at_100':
+        return {'viscosity40': [round(rand.uniform(20, 460), 1)
+                                for _ in range(rows)],
+                'v_index': [rand.randint(80, 160) for _ in range(rows)]}
+    return {'viscosity40': [round(rand.uniform(20, 460), 1)
+                            for _ in range(rows)],
+            'viscosity100': [round(rand.uniform(4, 19), 2)
+                             for _ in range(rows)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--calc', default='viscosity_at_40',
+                        choices=('viscosity_at_40', 'viscosity_at_100',
+                                 'viscosity_index'))
+    args = parser.parse_args()
+
+    data = columns(args.calc, args.rows)
+    start = time.perf_counter()
+    expected = columnar.calculate(args.calc, data)
+    serial = time.perf_counter() - start
+    print('{0}: {1} rows, {2} CPUs'.format(args.calc, args.rows,
+                                           os.cpu_count()))
+    print('in-process: {0:10.0f} rows/s'.format(args.rows / serial))
+
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        with ParallelExecutor(workers, args.chunk_size) as executor:
+            # Start the workers before timing
+            executor.run(args.calc, columns(args.calc, workers))
+            start = time.perf_counter()
+            results = executor.run(args.calc, data)
+            elapsed = time.perf_counter() - start
+        assert results == expected
+        speedup = serial / elapsed
+        print('{0:2d} workers: {1:10.0f} rows/s  speedup {2:5.2f}  '
+              'efficiency {3:4.0%}'.format(workers, args.rows / elapsed,
+                                           speedup, speedup / workers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# File name: bench_service.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides a load generator for the calculation service.
+
+    python3 benchmarks/bench_service.py [--clients N] [--requests N]
+
+Starts 'lubricalc serve' on a free port, opens --clients connections
+that each keep up to --window requests in flight, and reports the
+throughput and the p50/p99 latency of every request.
+"""
+
+import argparse
+import asyncio
+from collections import deque
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def requests(count, heavy, seed):
+    """Yield request lines, a fraction heavy of them inverse solves."""
+    rand = random.Random(seed)
+    for index in range(count):
+        viscosity100 = round(rand.uniform(4, 19), 2)
+        if rand.random() < heavy:
+            record = {'calc': 'viscosity_at_40', 'viscosity100': viscosity100,
+                      'v_index': rand.randint(80, 160)}
+        else:
+            record = {'calc': 'viscosity_index',
+                      'viscosity40': round(viscosity100 *
+                                           rand.uniform(5.5, 9), 1),
+                      'viscosity100': viscosity100}
+        record['id'] = index
+        yield (json.dumps(record) + '\n').encode()
+
+
+async def client(port, lines, window, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    in_flight = asyncio.Semaphore(window)
+    sent = deque()
+
+    async def receive():
+        for _ in range(len(lines)):
+            line = await reader.readline()
+            latencies.append(time.perf_counter() - sent.popleft())
+            assert json.loads(line)
+            in_flight.release()
+
+    receiver = asyncio.ensure_future(receive())
+    for line in lines:
+        await in_flight.acquire()
+        sent.append(time.perf_counter())
+        writer.write(line)
+        await writer.drain()
+    await receiver
+    writer.close()
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def run(port, args):
+    latencies = []
+    lines = list(requests(args.requests, args.heavy, 0))
+    share = -(-len(lines) // args.clients)
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, lines[index:index + share],
+                                  args.window, latencies)
+                           for index in range(0, len(lines), share)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print('{0} requests, {1} clients, window {2}, {3:.0%} inverse solves'
+          .format(len(latencies), args.clients, args.window, args.heavy))
+    print('throughput: {0:10.0f} requests/s'.format(len(latencies) /
+                                                     elapsed))
+    print('latency:    p50 {0:7.2f} ms  p99 {1:7.2f} ms  max {2:7.2f} ms'
+          .format(percentile(latencies, 0.5) * 1000,
+                  percentile(latencies, 0.99) * 1000,
+                  latencies[-1] * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=50000)
+    parser.add_argument('--window', type=int, default=32,
+                        help='requests in flight per client')
+    parser.add_argument('--heavy', type=float, default=0.1,
+                        help='fraction of viscosity_at_40 requests')
+    parser.add_argument('--batch-delay', default='1')
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'main.py'), 'serve', '--port',
+         '0', '--batch-delay', args.batch_delay],
+        stderr=subprocess.PIPE, universal_newlines=True)
+    try:
+        port = int(server.stderr.readline().rsplit(':', 1)[1])
+        asyncio.run(run(port, args))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
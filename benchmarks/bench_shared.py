@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# File name: bench_shared.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides a memory benchmark for shared fleet columns.
+
+    python3 benchmarks/bench_shared.py [--rows N] [--workers N]
+
+Runs the same batch through ParallelExecutor.run (columns pickled to the
+workers as buffers, results pickled back) and through run_shared
+(workers attach to shared columns and write results in place). Each
+path runs in a fresh interpreter so their peak resident set sizes can be
+compared.
+"""
+
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark this checkout, not an installed Lubricalc
+sys.path.insert(0, ROOT)
+
+from lubricalc.parallel import ParallelExecutor
+from lubricalc.shared import SharedColumns
+
+NAMES = ('viscosity40', 'viscosity100')
+
+
+def samples(rows, seed=0):
+    """Yield realistic (kv40, kv100) pairs, most VIs within 0 to 200."""
+    rand = random.Random(seed)
+    for _ in range(rows):
+        viscosity100 = round(rand.uniform(4, 19), 2)
+        yield round(viscosity100 * rand.uniform(5.5, 9), 1), viscosity100
+
+
+def pickled(rows, workers, chunk_size):
+    data = dict(zip(NAMES, map(list, zip(*samples(rows)))))
+    with ParallelExecutor(workers, chunk_size) as executor:
+        start = time.perf_counter()
+        results = executor.run('viscosity_index', data)
+        elapsed = time.perf_counter() - start
+    return elapsed, sum(1 for result in results
+                        if isinstance(result, Exception))
+
+
+def shared(rows, workers, chunk_size):
+    with SharedColumns.create(NAMES, rows) as inputs, \
+            SharedColumns.create(['result'], rows) as outputs:
+        viscosity40, viscosity100 = (inputs[name] for name in NAMES)
+        for index, (value40, value100) in enumerate(samples(rows)):
+            viscosity40[index] = value40
+            viscosity100[index] = value100
+        with ParallelExecutor(workers, chunk_size) as executor:
+            start = time.perf_counter()
+            errors = executor.run_shared('viscosity_index', inputs, outputs)
+            elapsed = time.perf_counter() - start
+    return elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--mode', choices=('pickled', 'shared'))
+    args = parser.parse_args()
+
+    if args.mode:
+        run = pickled if args.mode == 'pickled' else shared
+        elapsed, errors = run(args.rows, args.workers, args.chunk_size)
+        parent = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        print(elapsed, errors, parent, children)
+        return
+
+    print('viscosity_index: {0} rows'.format(args.rows))
+    for mode in ('pickled', 'shared'):
+        output = subprocess.check_output(
+            [sys.executable, __file__, '--mode', mode,
+             '--rows', str(args.rows), '--chunk-size', str(args.chunk_size)]
+            + (['--workers', str(args.workers)] if args.workers else []),
+            universal_newlines=True)
+        elapsed, errors, parent, children = output.split()
+        print('{0:>8}: {1:10.0f} rows/s  peak RSS parent {2:7.1f} MiB  '
+              'worker {3:7.1f} MiB  ({4} failed rows)'.format(
+                  mode, args.rows / float(elapsed), int(parent) / 1024,
+                  int(children) / 1024, errors))
+
+
+if __name__ == '__main__':
+    main()
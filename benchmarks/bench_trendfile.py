@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# File name: bench_trendfile.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides a benchmark of trend files against CSV.
+
+    python3 benchmarks/bench_trendfile.py [--rows N] [--repeat N]
+
+Writes a year of per-minute samples of one asset (viscosity at 40 and
+100°C, viscosity index) as CSV and as a trend file, then prints the file
+sizes and the time to load the viscosity at 40°C column: parsing the CSV,
+opening the trend file and taking its column, summing it, and summing
+only its last 30 days.
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark this checkout, not an installed Lubricalc
+sys.path.insert(0, ROOT)
+
+from lubricalc import trendfile
+
+FIELDS = ('viscosity40', 'viscosity100', 'v_index')
+
+
+def history(rows, seed=0):
+    rand = random.Random(seed)
+    timestamps = [1.5e9 + minute * 60 for minute in range(rows)]
+    viscosity40 = [round(rand.uniform(40, 50), 2) for _ in range(rows)]
+    return timestamps, {
+        'viscosity40': viscosity40,
+        'viscosity100': [round(v / rand.uniform(6.5, 7), 2)
+                         for v in viscosity40],
+        'v_index': [float(rand.randint(90, 110)) for _ in range(rows)]}
+
+
+def read_csv(path):
+    with open(path, newline='') as file:
+        reader = csv.reader(file)
+        next(reader)
+        return [float(row[1]) for row in reader]
+
+
+def read_range(path):
+    with trendfile.TrendFile(path) as trend:
+        end = trend.timestamps(len(trend) - 1)[0]
+        first, stop = trend.range(end - 30 * 86400, end)
+        with trend.column('viscosity40', first, stop) as column:
+            return sum(column)
+
+
+def read_trend(path, total=False):
+    with trendfile.TrendFile(path) as trend:
+        with trend.column('viscosity40') as column:
+            return sum(column) if total else len(column)
+
+
+def best(function, repeat):
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=365 * 24 * 60)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    timestamps, columns = history(args.rows)
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'history.csv')
+        trend_path = os.path.join(directory, 'history.trend')
+        with open(csv_path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(('timestamp',) + FIELDS)
+            writer.writerows(zip(timestamps, *columns.values()))
+        trendfile.write(trend_path, timestamps, columns,
+                        types=dict.fromkeys(FIELDS, 'f'), resolution=60)
+
+        for name, path in (('csv', csv_path), ('trend', trend_path)):
+            print('{0:12} {1:8.2f} MB'.format(
+                name, os.path.getsize(path) / 2 ** 20))
+        for name, function in (
+                ('parse csv', lambda: read_csv(csv_path)),
+                ('map trend', lambda: read_trend(trend_path)),
+                ('sum trend', lambda: read_trend(trend_path, True)),
+                ('last month', lambda: read_range(trend_path))):
+            print('{0:12} {1:8.3f} ms'.format(
+                name, best(function, args.repeat) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
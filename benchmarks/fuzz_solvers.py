@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# File name: fuzz_solvers.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides a worst-case input search for the inverse solvers.
+
+    python3 benchmarks/fuzz_solvers.py [--samples N] [--top N] [--save]
+    python3 benchmarks/fuzz_solvers.py --check
+
+Viscosity.viscosity_at_40() and viscosity_at_100() step towards their
+answer one viscosity index evaluation at a time, so their cost depends on
+the input. Random (KV100, VI) and (KV40, VI) inputs are ranked by the
+steps the answer is away from the start of the scan, which the bisecting
+lubricalc.columnar solvers give at once; the slowest are refined by
+jittering them, then the top ones are run on the calculator to count the
+exact iterations and time them. --save merges them into
+tests/solver_cases.json, the regression cases of the test suite, with a
+time budget per call. The tests check their results and iterations;
+--check replays them and also checks the time budgets, which depend on
+the machine and are kept out of the unit tests.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark this checkout, not an installed Lubricalc
+sys.path.insert(0, ROOT)
+
+from lubricalc import columnar
+from lubricalc.viscosity import Viscosity
+
+CASES = os.path.join(ROOT, 'tests', 'solver_cases.json')
+
+# (first argument, start of the scan, step, end of the scan) of each solver
+SOLVERS = {'viscosity_at_40': ('viscosity100', None, 0.05, 2000.0),
+           'viscosity_at_100': ('viscosity40', 2.0, 0.01, 500.0)}
+
+# Input space: the first argument is log-uniform, VI uniform
+BOUNDS = {'viscosity100': (2, 2000), 'viscosity40': (2, 20000),
+          'v_index': (0, 400)}
+
+# Budget per call: the measured time times this, rounded up to 10 ms
+BUDGET_FACTOR = 3
+
+
+class CountingViscosity(Viscosity):
+    """Viscosity counting the viscosity index evaluations of its solvers."""
+
+    iterations = 0
+
+    def _viscosity_index(self, viscosity40, viscosity100):
+        self.iterations += 1
+        return super()._viscosity_index(viscosity40, viscosity100)
+
+
+def sample(calc, rand):
+    name = SOLVERS[calc][0]
+    low, high = BOUNDS[name]
+    return {name: round(math.exp(rand.uniform(math.log(low),
+                                              math.log(high))), 2),
+            'v_index': rand.randint(*BOUNDS['v_index'])}
+
+
+def jitter(calc, args, rand):
+    """Return args moved a little, inside the input space."""
+    name = SOLVERS[calc][0]
+    low, high = BOUNDS[name]
+    value = args[name] * math.exp(rand.gauss(0, 0.05))
+    v_index = args['v_index'] + rand.choice((-5, -1, 1, 5))
+    return {name: round(min(max(value, low), high), 2),
+            'v_index': min(max(v_index, 0), BOUNDS['v_index'][1])}
+
+
+def predict(calc, rows):
+    """Return (estimated iterations, capped) of every row.
+
+    Failed rows take 0 iterations; capped rows run the whole scan without
+    finding the answer.
+    """
+    name, start, step, end = SOLVERS[calc]
+    results = columnar.calculate(calc, {
+        name: [args[name] for args in rows],
+        'v_index': [args['v_index'] for args in rows]})
+    return [(0, False) if isinstance(result, Exception)
+            else (round((result - (args[name] if start is None else start))
+                        / step), result > end)
+            for args, result in zip(rows, results)]
+
+
+def measure(calc, args, repeat=3):
+    """Return (iterations, best seconds, result or error name) of a call."""
+    best = float('inf')
+    for _ in range(repeat):
+        viscosity = CountingViscosity()
+        start = time.perf_counter()
+        try:
+            result = getattr(viscosity, calc)(**args)
+        except Exception as error:
+            result = {'error': type(error).__name__}
+        best = min(best, time.perf_counter() - start)
+    return viscosity.iterations, best, result
+
+
+def region(calc, args, capped=False):
+    """Return a coarse cell of the input space, to report distinct inputs.
+
+    Inputs whose scan hits its cap are all the same case, whatever their
+    cell, so they share one.
+    """
+    if capped:
+        return 'capped'
+    return (int(math.log2(args[SOLVERS[calc][0]])), args['v_index'] // 50)
+
+
+def search(calc, samples, rounds, top, seed=0):
+    """Return the top inputs of calc by estimated iterations.
+
+    Only the slowest input of each region of the input space, and only
+    one input hitting the scan cap, is kept, so the top ones are not all
+    neighbours or copies of the same worst case.
+    """
+    rand = random.Random('{0}-{1}'.format(calc, seed))
+    rows = [sample(calc, rand) for _ in range(samples)]
+    # The edges of the input space
+    name = SOLVERS[calc][0]
+    rows += [{name: value, 'v_index': v_index}
+             for value in BOUNDS[name] for v_index in BOUNDS['v_index']]
+    best = rows
+    for _ in range(rounds + 1):
+        scored = sorted(zip(predict(calc, rows), range(len(rows))),
+                        key=lambda item: -item[0][0])
+        regions = set()
+        best = []
+        for (_, capped), index in scored:
+            key = region(calc, rows[index], capped)
+            if key not in regions:
+                regions.add(key)
+                best.append(rows[index])
+            if len(best) == top * 4:
+                break
+        rows = best + [jitter(calc, args, rand) for args in best
+                       for _ in range(4)]
+    return best[:top]
+
+
+def budget(seconds):
+    """Return the per-call budget in ms for a measured time."""
+    return int(math.ceil(seconds * 1000 * BUDGET_FACTOR / 10)) * 10
+
+
+def save(cases, path=CASES):
+    """Merge cases into the regression cases file."""
+    try:
+        with open(path) as file:
+            saved = json.load(file)
+    except FileNotFoundError:
+        saved = []
+    keys = {(case['calc'], tuple(sorted(case['args'].items())))
+            for case in saved}
+    for case in cases:
+        key = (case['calc'], tuple(sorted(case['args'].items())))
+        if key not in keys:
+            keys.add(key)
+            saved.append(case)
+    with open(path, 'w') as file:
+        json.dump(saved, file, indent=2)
+        file.write('\n')
+
+
+def check(path=CASES):
+    """Return the saved cases over their iterations or time budget."""
+    with open(path) as file:
+        cases = json.load(file)
+    failures = []
+    for case in cases:
+        iterations, seconds, result = measure(case['calc'], case['args'])
+        print('{0:18} {1:40} {2:6} iterations {3:8.1f} ms (budget {4} '
+              'ms)'.format(case['calc'], json.dumps(case['args']),
+                           iterations, seconds * 1000, case['budget_ms']))
+        if (result != case['result'] or iterations > case['iterations'] or
+                seconds * 1000 > case['budget_ms']):
+            failures.append(case)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=20000,
+                        help='random inputs per solver (default: 20000)')
+    parser.add_argument('--rounds', type=int, default=5,
+                        help='jitter rounds over the slowest (default: 5)')
+    parser.add_argument('--top', type=int, default=3,
+                        help='inputs reported per solver (default: 3)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', action='store_true',
+                        help='add them to ' + os.path.relpath(CASES))
+    parser.add_argument('--check', action='store_true',
+                        help='replay the saved cases against their budgets '
+                             'instead of searching')
+    args = parser.parse_args(argv)
+
+    if args.check:
+        failures = check()
+        for case in failures:
+            print('FAILED', json.dumps(case))
+        return 1 if failures else 0
+
+    cases = []
+    for calc in sorted(SOLVERS):
+        print(calc)
+        for inputs in search(calc, args.samples, args.rounds, args.top,
+                             args.seed):
+            iterations, seconds, result = measure(calc, inputs)
+            print('  {0:40} {1:6} iterations {2:8.1f} ms -> {3}'.format(
+                json.dumps(inputs), iterations, seconds * 1000, result))
+            cases.append({'calc': calc, 'args': inputs, 'result': result,
+                          'iterations': iterations,
+                          'budget_ms': budget(seconds)})
+    if args.save:
+        save(cases)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
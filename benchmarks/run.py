@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# File name: run.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides the Lubricalc benchmark suite.
+
+    python3 benchmarks/run.py [--save FILE] [--compare FILE] [-k PATTERN]
+
+Times every public calculator method one call at a time ('scalar.*',
+ns per call) and every lubricalc.columnar calculation plus
+OilBlend.total_ash_batch() over whole columns ('batch.*', ns per row),
+with seeded, realistic inputs. --save writes the results as a JSON
+baseline; --compare reads one back and exits with status 1 if any
+benchmark got slower than --threshold percent.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark this checkout, not an installed Lubricalc
+sys.path.insert(0, ROOT)
+
+from lubricalc import columnar
+from lubricalc.bearing import Bearing
+from lubricalc.blend import OilBlend
+from lubricalc.exception import ConceptError
+from lubricalc.mixture import OilMixture
+from lubricalc.reynolds import Reynolds
+from lubricalc.viscosity import Viscosity
+
+ERRORS = (ValueError, ConceptError)
+
+# Fraction of --rows used by the scalar runs of the slow inverse solvers
+SCALE = {'viscosity_at_40': 0.02, 'viscosity_at_100': 0.02,
+         'transition_temperatures': 0.2}
+
+
+def oil(rand):
+    """Return (KV40, KV100) of a mineral or synthetic oil, VI 60 to 160."""
+    viscosity100 = round(rand.lognormvariate(2.3, 0.5), 2)
+    return round(viscosity100 * rand.uniform(5.5, 9), 1), viscosity100
+
+
+def row(calc, rand):
+    """Return realistic arguments for one calc."""
+    if calc in ('viscosity_index', 'viscosity_at_any_temp',
+                'temperature_at_viscosity', 'transition_temperatures'):
+        viscosity40, viscosity100 = oil(rand)
+        args = {'viscosity40': viscosity40, 'viscosity100': viscosity100}
+        if calc == 'viscosity_at_any_temp':
+            args['temperature'] = round(rand.uniform(-10, 120), 1)
+        elif calc == 'temperature_at_viscosity':
+            args['viscosity'] = round(viscosity40 * rand.uniform(0.1, 3), 1)
+        elif calc == 'transition_temperatures':
+            args['velocity'] = round(rand.uniform(0.5, 5), 2)
+            args['length'] = round(rand.uniform(0.01, 0.1), 3)
+        return args
+    if calc == 'viscosity_at_40':
+        return {'viscosity100': oil(rand)[1], 'v_index': rand.randint(80, 160)}
+    if calc == 'viscosity_at_100':
+        return {'viscosity40': oil(rand)[0], 'v_index': rand.randint(80, 160)}
+    if calc in ('oil_mix_viscosity', 'mix_proportions'):
+        viscosity0, viscosity1 = sorted(oil(rand)[0] for _ in range(2))
+        args = {'viscosity0': viscosity0, 'viscosity1': viscosity1 + 1,
+                'temperature': rand.choice(('40', '100'))}
+        if calc == 'oil_mix_viscosity':
+            args['oil0_percent'] = round(rand.uniform(5, 95), 1)
+        else:
+            args['mix_viscosity'] = round(rand.uniform(viscosity0 + 0.5,
+                                                       viscosity1 + 0.5), 1)
+        return args
+    if calc in ('grease_amount', 'lubrication_frequency', 'velocity_factor'):
+        inner_diameter = rand.choice((10, 17, 25, 35, 50, 70, 100, 150))
+        outer_diameter = round(inner_diameter * rand.uniform(1.6, 2.4))
+        rpm = rand.choice((600, 900, 1200, 1800, 3600))
+        if calc == 'grease_amount':
+            return {'outer_diameter': outer_diameter,
+                    'width': round(outer_diameter * 0.3)}
+        if calc == 'velocity_factor':
+            return {'outer_diameter': outer_diameter,
+                    'inner_diameter': inner_diameter, 'rpm': rpm}
+        return dict({'rpm': rpm, 'inner_diameter': inner_diameter},
+                    **{name: rand.randrange(len(factors)) for name, factors
+                       in Bearing.factors_map.items()})
+    if calc in ('reynolds_number', 'flow_type'):
+        return {'velocity': round(rand.uniform(0.1, 5), 2),
+                'length': round(rand.uniform(0.005, 0.1), 3),
+                'viscosity': round(rand.uniform(5, 500), 1)}
+    if calc == 'additive_percent_mass':
+        return {'additive_percent': round(rand.uniform(1, 20), 1),
+                'additive_density': round(rand.uniform(0.9, 1.2), 3),
+                'oil_density': round(rand.uniform(0.82, 0.9), 3)}
+    if calc == 'total_ash':
+        args = {'additive_percent': round(rand.uniform(1, 20), 1)}
+        for metal in ('calcium', 'magnesium', 'zinc', 'barium'):
+            args[metal] = round(rand.uniform(0, 3), 2)
+        return args
+    raise ValueError('Calculation not defined: {0}'.format(calc))
+
+
+def scalar_function(calc):
+    """Return a callable running calc on one calculator call."""
+    if calc in ('additive_percent_mass', 'total_ash'):
+        def function(additive_percent, **args):
+            return getattr(OilBlend(additive_percent), calc)(**args)
+        return function
+    for cls in (Viscosity, OilMixture, Bearing, Reynolds):
+        if hasattr(cls, calc):
+            return getattr(cls(), calc)
+    raise ValueError('Calculation not defined: {0}'.format(calc))
+
+
+def time_best(run, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmarks(rows, repeat, pattern):
+    """Yield (name, ns per call or per row) of every benchmark."""
+    for calc in sorted(columnar.FUNCTIONS):
+        rand = random.Random(calc)
+        data = [row(calc, rand) for _ in range(rows)]
+
+        name = 'scalar.' + calc
+        if re.search(pattern, name):
+            function = scalar_function(calc)
+            sample = data[:max(1, int(rows * SCALE.get(calc, 1)))]
+
+            def run():
+                for args in sample:
+                    try:
+                        function(**args)
+                    except ERRORS:
+                        pass
+
+            yield name, time_best(run, repeat) / len(sample) * 1e9
+
+        name = 'batch.' + calc
+        if re.search(pattern, name):
+            columns = {key: [args[key] for args in data] for key in data[0]}
+            yield name, time_best(lambda: columnar.calculate(calc, columns),
+                                  repeat) / rows * 1e9
+
+    name = 'batch.total_ash_batch'
+    if re.search(pattern, name):
+        rand = random.Random(name)
+        data = [row('total_ash', rand) for _ in range(rows)]
+        metals = ['calcium', 'magnesium', 'zinc', 'barium']
+        contents = [[args[metal] for metal in metals] for args in data]
+        percents = [args['additive_percent'] for args in data]
+        yield name, time_best(
+            lambda: OilBlend.total_ash_batch(contents, percents, metals),
+            repeat) / rows * 1e9
+
+
+def compare(results, baseline, threshold):
+    """Print the change against baseline; return the regressed names."""
+    regressions = []
+    print('{0:40} {1:>12} {2:>12} {3:>8}'.format('benchmark', 'baseline',
+                                                 'current', 'change'))
+    for name, current in sorted(results.items()):
+        if name not in baseline:
+            print('{0:40} {1:>12} {2:12.0f} {3:>8}'.format(name, '-',
+                                                           current, 'new'))
+            continue
+        change = (current - baseline[name]) / baseline[name] * 100
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('{0:40} {1:12.0f} {2:12.0f} {3:+7.1f}%{4}'.format(
+            name, baseline[name], current, change, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000,
+                        help='inputs per benchmark (default: 5000)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs per benchmark, the best is kept '
+                             '(default: 5)')
+    parser.add_argument('-k', '--pattern', default='',
+                        help='only run benchmarks matching this regex')
+    parser.add_argument('--save', metavar='FILE',
+                        help='write the results to FILE as a baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare the results with a baseline FILE')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='slowdown percent flagged as a regression '
+                             '(default: 10)')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, nanoseconds in benchmarks(args.rows, args.repeat,
+                                        args.pattern):
+        results[name] = nanoseconds
+        if not args.compare:
+            print('{0:40} {1:12.0f} ns'.format(name, nanoseconds))
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'rows': args.rows,
+                       'results': results}, file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('{0} regression(s) over {1:g}%'.format(len(regressions),
+                                                         args.threshold))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -21,7 +21,9 @@
 
 """This module provides Main Controller."""
 
+import os
 import sys
+import time
 
 from PyQt5.QtWidgets import QApplication, QMessageBox
 
@@ -33,8 +35,11 @@ from lubricalc.config import LONG_DESC
 class MainController:
     """Class to provide main controller."""
 
-    def __init__(self):
-        self.app = QApplication(sys.argv)
+    def __init__(self, started=None):
+        """started is the perf_counter() time startup is measured from."""
+        self.started = time.perf_counter() if started is None else started
+        self.startup_time = None
+        self.app = QApplication.instance() or QApplication(sys.argv)
         self.model = None
         self.view = LubricalcMWin()
         self._connect_events()
@@ -46,10 +51,19 @@ class MainController:
     def _connect_events(self):
         self.view.action_exit.triggered.connect(self.on_exit_triggered)
         self.view.action_about.triggered.connect(self.on_about_triggered)
+        self.view.action_live.toggled.connect(
+            self.view.central_widget.set_live)
+        self.view.shown.connect(self.on_window_shown)
 
     def on_exit_triggered(self):
         self.app.quit()
 
+    def on_window_shown(self):
+        self.startup_time = time.perf_counter() - self.started
+        if os.environ.get('LUBRICALC_STARTUP_TIME'):
+            print('Window shown in {0:.0f} ms'.format(
+                self.startup_time * 1000), file=sys.stderr)
+
     def on_about_triggered(self):
         QMessageBox.about(self.view.central_widget,
                           self.view.tr('About') + ' ' + APP_NAME,
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+
+# File name: batch.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides the headless batch command of Lubricalc.
+
+    lubricalc batch [--format {csv,jsonl}] [--errors FILE] [--cache FILE]
+                    [FILE ...]
+
+Every record names its calculation in a 'calc' field and carries the
+arguments of the calculator method in the other fields, e.g.:
+
+    {"calc": "viscosity_index", "viscosity40": 46, "viscosity100": 6.8}
+
+Results are streamed to stdout as the record plus a 'result' field, and
+records that fail are reported to the errors file (stderr by default).
+With --cache, results are looked up in and added to a persistent
+ResultCache, a chunk of records at a time.
+"""
+
+import argparse
+import csv
+from functools import lru_cache
+from inspect import signature
+from itertools import islice
+import json
+import sys
+
+from .bearing import Bearing
+from .blend import OilBlend
+from .columnar import ROW_ERRORS
+from .exception import ConceptError
+from .mixture import OilMixture
+from .reynolds import Reynolds
+from .viscosity import Viscosity
+
+CALCULATIONS = {'viscosity_index': (Viscosity, 'viscosity_index'),
+                'viscosity_at_40': (Viscosity, 'viscosity_at_40'),
+                'viscosity_at_100': (Viscosity, 'viscosity_at_100'),
+                'viscosity_at_any_temp': (Viscosity,
+                                          'viscosity_at_any_temp'),
+                'temperature_at_viscosity': (Viscosity,
+                                             'temperature_at_viscosity'),
+                'oil_mix_viscosity': (OilMixture, 'oil_mix_viscosity'),
+                'mix_proportions': (OilMixture, 'mix_proportions'),
+                'grease_amount': (Bearing, 'grease_amount'),
+                'lubrication_frequency': (Bearing, 'lubrication_frequency'),
+                'velocity_factor': (Bearing, 'velocity_factor'),
+                'reynolds_number': (Reynolds, 'reynolds_number'),
+                'flow_type': (Reynolds, 'flow_type'),
+                'transition_temperatures': (Reynolds,
+                                            'transition_temperatures'),
+                'additive_percent_mass': (OilBlend, 'additive_percent_mass'),
+                'total_ash': (OilBlend, 'total_ash')}
+
+BUFFER_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=None)
+def _required(calc):
+    """Return the names of the arguments calc can't run without."""
+    cls, method = CALCULATIONS[calc]
+    required = {name for name, parameter in signature(
+        getattr(cls, method)).parameters.items()
+        if name != 'self' and parameter.default is parameter.empty and
+        parameter.kind is parameter.POSITIONAL_OR_KEYWORD}
+    if cls is OilBlend:
+        required.add('additive_percent')
+    return frozenset(required)
+
+
+def _check_name(calc):
+    if not isinstance(calc, str):
+        raise ValueError('Calculation must be a name, not: {0}'.format(
+            json.dumps(calc, default=str)))
+
+
+def parse_record(record):
+    """Return the calc and arguments of a record, or raise ValueError."""
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError('Record must be an object, not: {0}'.format(
+            type(record).__name__))
+    calc = record.get('calc')
+    _check_name(calc)
+    return calc, {key: value for key, value in record.items()
+                  if key != 'calc'}
+
+
+def calculate(calc, args):
+    """Run the calculation named calc with a mapping of arguments."""
+    _check_name(calc)
+    try:
+        cls, method = CALCULATIONS[calc]
+    except KeyError:
+        raise ValueError('Calculation not defined: {0}'.format(calc))
+    missing = _required(calc).difference(args)
+    if missing:
+        raise ValueError('{0}: missing arguments: {1}'.format(
+            calc, ', '.join(sorted(missing))))
+
+    args = dict(args)
+    if cls is OilBlend:
+        calculator = OilBlend(args.pop('additive_percent'))
+    else:
+        calculator = cls()
+    temperature = args.get('temperature')
+    if cls is OilMixture and isinstance(temperature, (int, float)):
+        # Mixture temperatures are keys: 40, 40.0 and '40' are the same
+        args['temperature'] = '{0:g}'.format(temperature)
+
+    try:
+        return getattr(calculator, method)(**args)
+    except TypeError as error:
+        raise ValueError('{0}: {1}'.format(calc, error))
+    except (KeyError, IndexError) as error:
+        raise ConceptError('{0}: not defined for {1}'.format(calc, error))
+
+
+def to_json(result):
+    if hasattr(result, '_asdict'):
+        return dict(result._asdict())
+    return result
+
+
+def read_jsonl(file):
+    """Yield the records of a JSONL file, or a ValueError for bad lines."""
+    for line in file:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                yield ValueError('Invalid JSON record: {0}'.format(error))
+
+
+class BatchRunner:
+    """Class to stream records through the calculators."""
+
+    def __init__(self, output, errors, output_format='jsonl', cache=None,
+                 chunk_size=1000):
+        self.output = output
+        self.errors = errors
+        self.output_format = output_format
+        self.cache = cache
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.failed = 0
+        self._csv_writer = None
+        self._csv_fields = None
+
+    def run(self, records, fields=None):
+        if self.cache is not None:
+            self._run_cached(records, fields)
+            return
+        for record in records:
+            self.count += 1
+            try:
+                result = calculate(*parse_record(record))
+            except ROW_ERRORS as error:
+                self._error(record, error)
+                continue
+            self._write(record, to_json(result), fields)
+
+    def _run_cached(self, records, fields):
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                return
+            requests = []
+            for record in chunk:
+                try:
+                    requests.append(parse_record(record))
+                except ValueError as error:
+                    requests.append(error)
+            results = iter(self.cache.calculate_many(
+                [request for request in requests
+                 if not isinstance(request, Exception)]))
+            for record, request in zip(chunk, requests):
+                self.count += 1
+                result = request if isinstance(request, Exception) else next(
+                    results)
+                if isinstance(result, Exception):
+                    self._error(record, result)
+                else:
+                    self._write(record, to_json(result), fields)
+
+    def _error(self, record, error):
+        self.failed += 1
+        calc = record.get('calc') if isinstance(record, dict) else None
+        self.errors.write(json.dumps({'record': self.count, 'calc': calc,
+                                      'error': type(error).__name__,
+                                      'message': str(error)}) + '\n')
+
+    def _write(self, record, result, fields):
+        if self.output_format == 'jsonl':
+            record = dict(record)
+            record['result'] = result
+            self.output.write(json.dumps(record) + '\n')
+            return
+
+        fields = list(fields or record) + ['result']
+        if fields != self._csv_fields:
+            self._csv_fields = fields
+            self._csv_writer = csv.DictWriter(self.output, fields,
+                                              extrasaction='ignore')
+            self._csv_writer.writeheader()
+        if isinstance(result, dict):
+            result = json.dumps(result)
+        row = dict(record)
+        row['result'] = result
+        self._csv_writer.writerow(row)
+
+
+def _input_format(path, default):
+    if default is not None:
+        return default
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='lubricalc batch',
+        description='Run Lubricalc calculations on CSV or JSONL records.')
+    parser.add_argument('files', nargs='*', default=['-'],
+                        help="input files, '-' for stdin (default)")
+    parser.add_argument('--format', choices=('csv', 'jsonl'),
+                        help='input format (default: from file extension, '
+                             'jsonl for stdin)')
+    parser.add_argument('--output-format', choices=('csv', 'jsonl'),
+                        help='output format (default: input format)')
+    parser.add_argument('--errors', metavar='FILE',
+                        help='write failed records to FILE instead of '
+                             'stderr')
+    parser.add_argument('--cache', metavar='FILE',
+                        help='reuse and keep results in the SQLite FILE')
+    parser.add_argument('--cache-size', type=int, default=1000000,
+                        help='results kept in the cache (default: 1000000)')
+    args = parser.parse_args(argv)
+
+    output = open(sys.stdout.fileno(), 'w', buffering=BUFFER_SIZE,
+                  encoding='utf-8', newline='', closefd=False)
+    if args.errors:
+        errors = open(args.errors, 'w', buffering=BUFFER_SIZE,
+                      encoding='utf-8')
+    else:
+        errors = sys.stderr
+
+    cache = None
+    if args.cache:
+        # cache imports this module for calculate()
+        from .cache import ResultCache
+        cache = ResultCache(args.cache, args.cache_size)
+    runner = None
+    try:
+        for path in args.files:
+            input_format = _input_format(path, args.format)
+            runner = runner or BatchRunner(
+                output, errors, args.output_format or input_format, cache)
+            try:
+                if path == '-':
+                    file = open(sys.stdin.fileno(), buffering=BUFFER_SIZE,
+                                encoding='utf-8', newline='', closefd=False)
+                else:
+                    file = open(path, buffering=BUFFER_SIZE,
+                                encoding='utf-8', newline='')
+                with file:
+                    if input_format == 'csv':
+                        reader = csv.DictReader(file)
+                        # Blank cells are arguments of other calculations
+                        records = ({key: value for key, value in row.items()
+                                    if value != ''} for row in reader)
+                        runner.run(records, fields=reader.fieldnames)
+                    else:
+                        runner.run(read_jsonl(file))
+            except (OSError, UnicodeDecodeError) as error:
+                print('lubricalc batch: cannot read {0}: {1}'.format(
+                    path, getattr(error, 'strerror', None) or error),
+                    file=sys.stderr)
+                return 2
+    finally:
+        output.flush()
+        if errors is not sys.stderr:
+            errors.close()
+        if cache is not None:
+            cache.close()
+            print('Cache: {0} hits, {1} misses ({2:.1%})'.format(
+                cache.hits, cache.misses, cache.hit_rate), file=sys.stderr)
+
+    return 1 if runner is not None and runner.failed else 0
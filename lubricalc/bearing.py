@@ -30,6 +30,13 @@ from .validator import validate
 class Bearing:
     """Class to define calculations related with bearings."""
 
+    factors_map = {'ft': (1.0, 0.5, 0.2, 0.1),
+                   'fc': (1.0, 0.7, 0.4, 0.2),
+                   'fh': (1.0, 0.7, 0.4, 0.1),
+                   'fv': (1.0, 0.6, 0.3),
+                   'fp': (1.0, 0.5, 0.3),
+                   'fd': (10.0, 5.0, 1.0)}
+
     def __init__(self):
         self._outer_diameter = None
         self._inner_diameter = None
@@ -100,18 +107,11 @@ class Bearing:
         self.rpm = rpm
         self.inner_diameter = inner_diameter
 
-        factors_map = {'ft': (1.0, 0.5, 0.2, 0.1),
-                       'fc': (1.0, 0.7, 0.4, 0.2),
-                       'fh': (1.0, 0.7, 0.4, 0.1),
-                       'fv': (1.0, 0.6, 0.3),
-                       'fp': (1.0, 0.5, 0.3),
-                       'fd': (10.0, 5.0, 1.0)}
-
         k_factor = 1
 
         for k, v in factors.items():
             v = int(v)
-            k_factor *= factors_map[k][v]
+            k_factor *= self.factors_map[k][v]
 
         frequency = k_factor * ((14000000 / (self._rpm * math.sqrt(
             self._inner_diameter))) - 4 * self._inner_diameter)
@@ -21,6 +21,10 @@
 
 """This module provides OilBlend Class."""
 
+from operator import mul
+
+from lubricalc.exception import ConceptError
+from lubricalc.validator import Validator
 from lubricalc.validator import validate
 
 
@@ -84,6 +88,61 @@ class OilBlend:
                         metal, content in metal_contents.items())
         return round(total_ash, 2)
 
+    @classmethod
+    def total_ash_batch(cls, metal_contents, additive_percents, metals=None):
+        """Calculate the % of sulfated ash of many formulations at once.
+
+        SA = (M . c) * AP / 100
+        where:
+        M: Metal content (% mass) matrix, one row per formulation and
+           one column per metal in metals (all metals by default)
+        c: Contribution to ash vector of the metals
+        AP: Additive package (% by volume) of each formulation, or a
+            single value for every formulation
+
+        Unlike total_ash(), the contributions are not rounded metal by
+        metal, so a result may differ from it in the last decimal.
+        """
+        metals = cls.metals() if metals is None else [
+            metal.lower() for metal in metals]
+        weights = [cls.contributions[metal] for metal in metals]
+
+        # Data Validation
+        if not weights:
+            raise ValueError('Metal Content: at least one metal is needed')
+        if isinstance(additive_percents, (int, float)):
+            additive_percents = [additive_percents] * len(metal_contents)
+        if len(additive_percents) != len(metal_contents):
+            raise ValueError('Additive (% volume): one value is needed '
+                             'for each formulation')
+        if any(len(row) != len(weights) for row in metal_contents):
+            raise ValueError('Metal Content: one value is needed '
+                             'for each metal')
+        metal_contents = [[cls._content(value) for value in row]
+                          for row in metal_contents]
+        additive_percents = [cls._percent(value)
+                             for value in additive_percents]
+
+        return [round(sum(map(mul, row, weights)) * percent / 100, 2)
+                for row, percent in zip(metal_contents, additive_percents)]
+
+    @staticmethod
+    def _content(value):
+        """Validate a metal content like the metal_content setter does."""
+        if value == '':
+            return 0.0
+        value = Validator.validate_float('Metal Content', value)
+        Validator.validate_lower_limit('Metal Content', value)
+        return value
+
+    @staticmethod
+    def _percent(value):
+        """Validate an additive percent like its setter does."""
+        value = Validator.validate_float('Additive (% volume)', value)
+        Validator.validate_lower_limit('Additive (% volume)', value,
+                                       strict=True)
+        return value
+
     @property
     def additive_percent(self):
         return self._additive_percent
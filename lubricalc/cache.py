@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+# File name: cache.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides ResultCache Class.
+
+A persistent cache of calculation results in an SQLite file, shared by
+runs and processes:
+
+    with ResultCache('results.db') as cache:
+        cache.calculate('viscosity_at_40', {'viscosity100': 10,
+                                            'v_index': 95})
+        print(cache.hit_rate)
+
+Results are keyed by the calculation, its arguments normalized the way
+the calculators parse them ('73,3', ' 73.3' and 73.3 are the same) and
+the library version, so upgrading Lubricalc starts from an empty cache.
+Errors in ERRORS are cached too, since the calculators are deterministic;
+other row errors are returned but computed again on every run. The file
+is in WAL mode, so any number of processes can read it while one writes,
+and the least recently used results are evicted beyond max_entries.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+import hashlib
+import json
+import sqlite3
+import time
+
+from . import batch
+from .columnar import ROW_ERRORS
+from .config import VERSION
+from .exception import ConceptError
+from .exception import InvertedViscosityError
+from .exception import ViscosityIntervalError
+
+# Errors cached by name; their messages round-trip through str()
+ERRORS = {cls.__name__: cls for cls in (ValueError, ConceptError,
+                                        InvertedViscosityError,
+                                        ViscosityIntervalError,
+                                        ArithmeticError, OverflowError,
+                                        ZeroDivisionError)}
+
+# Keys per SELECT, below SQLite's default limit of bound parameters
+LOOKUP_SIZE = 500
+
+
+def normalize(value):
+    """Return value as the calculators read it, or as it is if they can't."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        text = value.replace(',', '.').strip()
+        try:
+            return float(text)
+        except ValueError:
+            return text
+    return value
+
+
+@lru_cache(maxsize=64)
+def _tuple_type(name, fields):
+    return namedtuple(name, fields)
+
+
+def encode(result):
+    """Return a calculation result or error as JSON text."""
+    if isinstance(result, Exception):
+        return json.dumps({'e': type(result).__name__, 'm': str(result)})
+    if hasattr(result, '_fields'):
+        return json.dumps({'t': type(result).__name__,
+                           'f': list(result._fields), 'v': list(result)})
+    return json.dumps({'v': result})
+
+
+def decode(text):
+    """Return the result or error encode() returned text for."""
+    value = json.loads(text)
+    if 'e' in value:
+        return ERRORS.get(value['e'], ValueError)(value['m'])
+    if 't' in value:
+        return _tuple_type(value['t'], tuple(value['f']))(*value['v'])
+    return value['v']
+
+
+class ResultCache:
+    """Class to cache calculation results in an SQLite file."""
+
+    def __init__(self, path, max_entries=1000000, version=VERSION):
+        self.path = path
+        self.max_entries = int(max_entries)
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._used = {}
+        self._connection = sqlite3.connect(path, timeout=30)
+        with self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, '
+                'calc TEXT, value TEXT, used REAL) WITHOUT ROWID')
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._connection is not None:
+            self.flush()
+            self._connection.close()
+            self._connection = None
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def key(self, calc, args):
+        """Return the cache key of a calculation."""
+        text = json.dumps([self.version, calc, sorted(
+            (name, normalize(value)) for name, value in args.items())],
+            default=str)
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    def lookup(self, keys):
+        """Return {key: result} of the keys found in the cache."""
+        found = {}
+        keys = list(set(keys))
+        for start in range(0, len(keys), LOOKUP_SIZE):
+            chunk = keys[start:start + LOOKUP_SIZE]
+            found.update(self._connection.execute(
+                'SELECT key, value FROM results WHERE key IN ({0})'.format(
+                    ', '.join('?' * len(chunk))), chunk))
+        now = time.time()
+        self._used.update(dict.fromkeys(found, now))
+        return {key: decode(value) for key, value in found.items()}
+
+    def store(self, items):
+        """Store (key, calc, result) items and evict beyond max_entries."""
+        now = time.time()
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                [(key, calc, encode(result), now)
+                 for key, calc, result in items])
+            count, = self._connection.execute(
+                'SELECT count(*) FROM results').fetchone()
+            if count > self.max_entries:
+                # Leave some room, so eviction does not run on every store
+                excess = count - self.max_entries + self.max_entries // 10
+                self._connection.execute(
+                    'DELETE FROM results WHERE key IN (SELECT key FROM '
+                    'results ORDER BY used LIMIT ?)', (excess,))
+
+    def flush(self):
+        """Record when the results found were last used, for eviction."""
+        if not self._used:
+            return
+        with self._connection:
+            self._connection.executemany(
+                'UPDATE results SET used = ? WHERE key = ?',
+                [(used, key) for key, used in self._used.items()])
+        self._used = {}
+
+    def calculate_many(self, requests):
+        """Return the result, or error, of every (calc, args) request.
+
+        Cached results are read in one pass; the others are computed with
+        lubricalc.batch.calculate() and stored in one transaction.
+        """
+        keys = [self.key(calc, args) for calc, args in requests]
+        found = self.lookup(keys)
+        results = []
+        computed = {}
+        for key, (calc, args) in zip(keys, requests):
+            if key in found:
+                self.hits += 1
+                results.append(found[key])
+                continue
+            self.misses += 1
+            if key not in computed:
+                try:
+                    computed[key] = (calc, batch.calculate(calc, args))
+                except ROW_ERRORS as error:
+                    computed[key] = (calc, error)
+            results.append(computed[key][1])
+        items = [(key, calc, result)
+                 for key, (calc, result) in computed.items()
+                 if not isinstance(result, Exception) or
+                 ERRORS.get(type(result).__name__) is type(result)]
+        if items:
+            self.store(items)
+        return results
+
+    def calculate(self, calc, args):
+        """Return the result of a calculation, raising its error."""
+        result, = self.calculate_many([(calc, args)])
+        if isinstance(result, Exception):
+            raise result
+        return result
@@ -0,0 +1,588 @@
+# -*- coding: utf-8 -*-
+
+# File name: columnar.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides columnar versions of the calculators.
+
+Every function takes one column (sequence) per argument of the matching
+calculator method and returns a list with one item per row: the same
+result the calculator returns, or the exception it raises for that row.
+Inputs are validated with the same rules and messages, but numbers that
+are already floats skip the string round trip, coefficients and D341
+constants are looked up once, and the inverse viscosity solvers bisect
+over the same grid the calculators scan step by step.
+
+rounded=False skips the rounding of every result (and of intermediate
+values), so results chained from one calculation into another keep full
+float64 precision; present() rounds them for display.
+"""
+
+from bisect import bisect_left
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+from itertools import accumulate
+from itertools import repeat
+import math
+
+from .bearing import Bearing
+from .blend import OilBlend
+from .exception import ConceptError
+from .exception import InvertedViscosityError
+from .exception import ViscosityIntervalError
+from .mixture import OilMixture
+from .reynolds import Reynolds
+from .reynolds import Transitions
+from .validator import Validator
+from .viscosity import TO_KELVIN
+from .viscosity import Viscosity
+from .viscosity import d341_constants
+
+# Errors that are reported for one row instead of stopping the column
+ROW_ERRORS = (ValueError, ArithmeticError, LookupError, ConceptError)
+
+Proportions = namedtuple('Proportions', ['oil1', 'oil2'])
+
+_INFINITIES = (float('inf'), float('-inf'))
+_LOWER_BOUNDS = [bounds[0] for bounds in Viscosity.coefficients]
+_ROWS = list(Viscosity.coefficients.values())
+_TEMP_MAP = OilMixture().temp_map
+
+
+def _number(name, value, limit=0, strict=False):
+    """Validate a value like lubricalc.validator.validate() does."""
+    if type(value) is not float or value in _INFINITIES or value != value:
+        value = Validator.validate_float(name, value)
+    if value < limit or strict and value == limit:
+        Validator.validate_lower_limit(name, value, limit, strict)
+    return value
+
+
+def _temperature_key(temperature):
+    # Mixture temperatures are keys: 40, 40.0 and '40' are the same, like
+    # in lubricalc.batch.calculate()
+    if isinstance(temperature, str):
+        return temperature
+    return '{0:g}'.format(temperature)
+
+
+def _unrounded(value, digits=None):
+    return value
+
+
+def _map(function, *columns, rounded=True):
+    if not rounded:
+        # Row functions take how to round as their last argument
+        columns += (repeat(_unrounded),)
+    results = []
+    append = results.append
+    for row in zip(*columns):
+        try:
+            append(function(*row))
+        except ROW_ERRORS as error:
+            append(error)
+    return results
+
+
+def _coefficients(viscosity100):
+    if not viscosity100 >= 2:
+        return (0,) * 6
+    return _ROWS[bisect_right(_LOWER_BOUNDS, viscosity100) - 1]
+
+
+def _v_index(viscosity40, viscosity100, coefficients, rounding=round):
+    """Return the VI exactly as Viscosity._viscosity_index() does."""
+    a, b, c, d, e, f = coefficients
+    L = a * viscosity100 ** 2 + b * viscosity100 + c
+    H = d * viscosity100 ** 2 + e * viscosity100 + f
+
+    if viscosity40 >= H:
+        return rounding(((L - viscosity40) / (L - H)) * 100)
+
+    N = ((math.log10(H) - math.log10(viscosity40)) /
+         math.log10(viscosity100))
+
+    return rounding(((10 ** N - 1) / 0.00715) + 100)
+
+
+def _viscosities(viscosity40, viscosity100):
+    viscosity40 = _number('Viscosity at 40°C', viscosity40, 2)
+    viscosity100 = _number('Viscosity at 100°C', viscosity100, 2)
+    if viscosity100 > viscosity40:
+        raise InvertedViscosityError('Viscosity at 40°C must be'
+                                     ' greater than Viscosity at 100°C')
+    return viscosity40, viscosity100
+
+
+def _validate_v_index(v_index):
+    if v_index < 0.0 or v_index > 400.0:
+        raise ConceptError('Viscosity Index: not defined')
+
+
+def _viscosity_index_row(viscosity40, viscosity100, rounding=round):
+    viscosity40, viscosity100 = _viscosities(viscosity40, viscosity100)
+    v_index = _v_index(viscosity40, viscosity100,
+                       _coefficients(viscosity100), rounding)
+    # The range is that of the VI the calculator gives, which is rounded
+    _validate_v_index(round(v_index))
+    return v_index
+
+
+def viscosity_index(viscosity40, viscosity100, rounded=True):
+    """Return the Viscosity Index (ASTM D2270) of every row."""
+    return _map(_viscosity_index_row, viscosity40, viscosity100,
+                rounded=rounded)
+
+
+def _accumulate(value, step, count):
+    """Return value after adding step count times, one addition at a time.
+
+    Floats in [2^e, 2^(e + 1)) are all multiples of the same ulp, so
+    inside that range every addition adds the same rounded step and the
+    additions can be done at once as a multiplication.
+    """
+    while count > 0:
+        top = math.ldexp(1.0, math.frexp(value)[1])
+        delta = (value + step) - value
+        ulp = math.ulp(value)
+        k = min(count, int((top - value) / delta))
+        if k > 1 and value + k * delta >= top:
+            k -= 1
+        # A step exactly halfway between two floats rounds to even, which
+        # depends on the value, so add it one at a time
+        if k <= 1 or (value + ulp + step) - (value + ulp) != delta:
+            value += step
+            count -= 1
+            continue
+        value += k * delta
+        count -= k
+    return value
+
+
+def _viscosity_at_40_row(viscosity100, v_index):
+    viscosity100 = _number('Viscosity at 100°C', viscosity100, 2)
+    v_index = _number('Viscosity Index', v_index)
+    _validate_v_index(v_index)
+    coefficients = _coefficients(viscosity100)
+
+    # Viscosity.viscosity_at_40() scans n = KV100, KV100 + 0.05, ... and
+    # stops after the first n whose VI is below v_index. VI falls as n
+    # grows, so bisect over the step index with n ~ KV100 + 0.05 * k,
+    # then replay the last steps on the exactly accumulated n.
+    def below(n):
+        return _v_index(n, viscosity100, coefficients) < v_index
+
+    low, high = 0, max(int((2000 - viscosity100) / 0.05) + 1, 0)
+    while low < high:
+        middle = (low + high) // 2
+        if below(viscosity100 + 0.05 * middle):
+            high = middle
+        else:
+            low = middle + 1
+
+    n = viscosity100
+    if low > 1:
+        previous = _accumulate(viscosity100, 0.05, low - 2)
+        # Replay from scratch in the unlikely case the bisection over the
+        # approximated n went past the step where the scan stops
+        if previous <= 2000 and not below(previous):
+            n = previous + 0.05
+
+    temp_v_index = v_index
+    while temp_v_index >= v_index and n <= 2000:
+        temp_v_index = _v_index(n, viscosity100, coefficients)
+        n += 0.05
+    return round((n * 100 + 0.1) / 100, 2)
+
+
+def viscosity_at_40(viscosity100, v_index, rounded=True):
+    """Return the Kinematic Viscosity at 40°C of every row.
+
+    The results are points of the 0.05 cSt grid the calculator scans, so
+    rounded=False returns them as they are.
+    """
+    return _map(_viscosity_at_40_row, viscosity100, v_index)
+
+
+@lru_cache(maxsize=1)
+def _grid_100():
+    """Return the KV100 values Viscosity.viscosity_at_100() steps through.
+
+    They are accumulated 0.01 at a time from 2.0, like the calculator
+    does, so they are the very same floats.
+    """
+    grid = list(accumulate(repeat(0.01, 50000), initial=2.0))
+    last = bisect_right(grid, 500.0) - 1
+    # Index where every interval of the D2270 table starts
+    segments = [bisect_left(grid, low, hi=last + 1)
+                for low in _LOWER_BOUNDS[1:]]
+    segments.append(last + 1)
+    return grid, last, segments
+
+
+def _viscosity_at_100_row(viscosity40, v_index):
+    viscosity40 = _number('Viscosity at 40°C', viscosity40, 2)
+    v_index = _number('Viscosity Index', v_index)
+    _validate_v_index(v_index)
+    grid, last, segments = _grid_100()
+
+    # Viscosity.viscosity_at_100() scans KV100 = 2.00, 2.01, ... and stops
+    # after the first KV100 whose VI is above v_index, failing if KV100
+    # gets over KV40 before. VI grows with KV100 inside every interval of
+    # the D2270 table, so bisect interval by interval.
+    inverted = bisect_right(grid, viscosity40, hi=last + 1)
+    stop = min(last + 1, inverted)
+
+    def above(k):
+        return _v_index(viscosity40, grid[k], _coefficients(grid[k])) > \
+            v_index
+
+    found = None
+    start = 0
+    for end in segments:
+        end = min(end, stop)
+        if start < end and above(end - 1):
+            low, high = start, end - 1
+            while low < high:
+                middle = (low + high) // 2
+                if above(middle):
+                    high = middle
+                else:
+                    low = middle + 1
+            found = low
+            break
+        start = max(start, end)
+        if start >= stop:
+            break
+
+    if found is None:
+        if inverted <= last:
+            raise InvertedViscosityError('Viscosity at 40°C must be'
+                                         ' greater than Viscosity at 100°C')
+        found = last
+    return round((grid[found + 1] * 100 + 0.01) / 100, 2)
+
+
+def viscosity_at_100(viscosity40, v_index, rounded=True):
+    """Return the Kinematic Viscosity at 100°C of every row.
+
+    The results are points of the 0.01 cSt grid the calculator scans, so
+    rounded=False returns them as they are.
+    """
+    return _map(_viscosity_at_100_row, viscosity40, v_index)
+
+
+def _viscosity_at_any_temp_row(viscosity40, viscosity100, temperature,
+                               rounding=round):
+    viscosity40, viscosity100 = _viscosities(viscosity40, viscosity100)
+    temperature = _number('Temperature', temperature, -273.0)
+    a, b = d341_constants(viscosity40, viscosity100)
+    target_t = math.log10(temperature + TO_KELVIN)
+    return rounding(10 ** (10 ** (a - b * target_t)) - 0.7, 2)
+
+
+def viscosity_at_any_temp(viscosity40, viscosity100, temperature,
+                          rounded=True):
+    """Return the kinematic viscosity (ASTM D341) of every row."""
+    return _map(_viscosity_at_any_temp_row, viscosity40, viscosity100,
+                temperature, rounded=rounded)
+
+
+def _temperature_at_viscosity_row(viscosity40, viscosity100, viscosity,
+                                  rounding=round):
+    viscosity40, viscosity100 = _viscosities(viscosity40, viscosity100)
+    viscosity = _number('Viscosity', viscosity, 0.3, strict=True)
+    a, b = d341_constants(viscosity40, viscosity100)
+    if b == 0:
+        raise ConceptError('Viscosity: not defined for an oil whose '
+                           'viscosity does not change with temperature')
+    target_t = (a - math.log10(math.log10(viscosity + 0.7))) / b
+    return rounding(10 ** target_t - TO_KELVIN, 1)
+
+
+def temperature_at_viscosity(viscosity40, viscosity100, viscosity,
+                             rounded=True):
+    """Return the temperature (ASTM D341) of every row."""
+    return _map(_temperature_at_viscosity_row, viscosity40, viscosity100,
+                viscosity, rounded=rounded)
+
+
+def _oil_mix_viscosity_row(viscosity0, viscosity1, oil0_percent,
+                           temperature, rounding=round):
+    viscosity0 = _number('1st. Oil Viscosity', viscosity0, 2)
+    viscosity1 = _number('2nd. Oil Viscosity', viscosity1, 2)
+    oil0_percent = _number('1st. Oil Percent in Mix', oil0_percent, 0,
+                           strict=True)
+    K = _TEMP_MAP[_temperature_key(temperature)]
+    x1 = oil0_percent / 100
+    a = math.log(viscosity1 + K)
+    b = math.log(viscosity0 + K)
+    return rounding(math.exp(a * math.exp(x1 * math.log(b / a))) - K, 2)
+
+
+def oil_mix_viscosity(viscosity0, viscosity1, oil0_percent, temperature,
+                      rounded=True):
+    """Return the viscosity of every mixture."""
+    return _map(_oil_mix_viscosity_row, viscosity0, viscosity1,
+                oil0_percent, temperature, rounded=rounded)
+
+
+def _mix_proportions_row(viscosity0, viscosity1, mix_viscosity,
+                         temperature, rounding=round):
+    viscosity0 = _number('1st. Oil Viscosity', viscosity0, 2)
+    viscosity1 = _number('2nd. Oil Viscosity', viscosity1, 2)
+    mix_viscosity = _number('Mixture Viscosity', mix_viscosity, 2)
+    if not(viscosity0 < mix_viscosity < viscosity1 or
+            viscosity1 < mix_viscosity < viscosity0):
+        raise ViscosityIntervalError('Mixture viscosity must be inside '
+                                     'the viscosity interval')
+    K = _TEMP_MAP[_temperature_key(temperature)]
+    a = math.log(mix_viscosity + K)
+    b = math.log(viscosity0 + K)
+    c = math.log(viscosity1 + K)
+    oil1_percent = 10000 * (math.log(a / c) / math.log(b / c)) / 100
+    oil2_percent = 100 - oil1_percent
+    return Proportions(rounding(oil1_percent, 2), rounding(oil2_percent, 2))
+
+
+def mix_proportions(viscosity0, viscosity1, mix_viscosity, temperature,
+                    rounded=True):
+    """Return the proportions of every mixture."""
+    return _map(_mix_proportions_row, viscosity0, viscosity1,
+                mix_viscosity, temperature, rounded=rounded)
+
+
+def _grease_amount_row(outer_diameter, width, rounding=round):
+    outer_diameter = _number('Outer Diameter', outer_diameter, strict=True)
+    width = _number('Width', width, strict=True)
+    return rounding(0.005 * outer_diameter * width, 2)
+
+
+def grease_amount(outer_diameter, width, rounded=True):
+    """Return the amount of grease for re-lubrication of every bearing."""
+    return _map(_grease_amount_row, outer_diameter, width, rounded=rounded)
+
+
+def lubrication_frequency(rpm, inner_diameter, rounded=True, **factors):
+    """Return the re-lubrication frequency of every bearing.
+
+    factors are columns of the correction factor indexes (ft, fc, ...).
+    """
+    names = list(factors)
+    factors_map = Bearing.factors_map
+    rounding = round if rounded else _unrounded
+
+    def row(rpm, inner_diameter, *indexes):
+        rpm = _number('Rotation Velocity', rpm, strict=True)
+        inner_diameter = _number('Inner Diameter', inner_diameter,
+                                 strict=True)
+        k_factor = 1
+        for name, index in zip(names, indexes):
+            k_factor *= factors_map[name][int(index)]
+        return rounding(k_factor * ((14000000 / (rpm * math.sqrt(
+            inner_diameter))) - 4 * inner_diameter))
+
+    return _map(row, rpm, inner_diameter, *factors.values())
+
+
+def _velocity_factor_row(outer_diameter, inner_diameter, rpm,
+                         rounding=round):
+    outer_diameter = _number('Outer Diameter', outer_diameter, strict=True)
+    inner_diameter = _number('Inner Diameter', inner_diameter, strict=True)
+    if inner_diameter >= outer_diameter:
+        raise ConceptError('Inner Diameter must be '
+                           'lower than Outer Diameter')
+    rpm = _number('Rotation Velocity', rpm, strict=True)
+    return rounding(rpm * (outer_diameter + inner_diameter) / 2)
+
+
+def velocity_factor(outer_diameter, inner_diameter, rpm, rounded=True):
+    """Return the velocity factor of every bearing."""
+    return _map(_velocity_factor_row, outer_diameter, inner_diameter, rpm,
+                rounded=rounded)
+
+
+def _reynolds_number_row(velocity, length, viscosity, rounding=round):
+    viscosity = _number('Viscosity', viscosity, 2)
+    velocity = _number('Velocity', velocity, 2)
+    length = _number('Length', length, strict=True)
+    return rounding(velocity * length / viscosity, 1)
+
+
+def reynolds_number(velocity, length, viscosity, rounded=True):
+    """Return the Reynolds number of every row."""
+    return _map(_reynolds_number_row, velocity, length, viscosity,
+                rounded=rounded)
+
+
+def _flow_type_row(velocity, length, viscosity, rounding=round):
+    reynolds = _reynolds_number_row(velocity, length, viscosity, rounding)
+    if reynolds <= Reynolds.laminar_limit:
+        return 'laminar'
+    if reynolds >= Reynolds.turbulent_limit:
+        return 'turbulent'
+    if Reynolds.laminar_limit < reynolds < Reynolds.turbulent_limit:
+        return 'mixed'
+
+
+def flow_type(velocity, length, viscosity, rounded=True):
+    """Return the flow type of every row.
+
+    With rounded=False, the type follows the unrounded Reynolds number.
+    """
+    return _map(_flow_type_row, velocity, length, viscosity,
+                rounded=rounded)
+
+
+def _transition_temperatures_row(viscosity40, viscosity100, velocity,
+                                 length, rounding=round):
+    velocity = _number('Velocity', velocity, 2)
+    length = _number('Length', length, strict=True)
+    temperatures = []
+    for limit in (Reynolds.laminar_limit, Reynolds.turbulent_limit):
+        target = velocity * length / limit * 10 ** 6
+        if target <= 0.3:
+            temperatures.append(None)
+            continue
+        temperatures.append(_temperature_at_viscosity_row(
+            viscosity40, viscosity100, target, rounding))
+    return Transitions(*temperatures)
+
+
+def transition_temperatures(viscosity40, viscosity100, velocity, length,
+                            rounded=True):
+    """Return the flow type transition temperatures of every row."""
+    return _map(_transition_temperatures_row, viscosity40, viscosity100,
+                velocity, length, rounded=rounded)
+
+
+def _additive_percent_mass_row(additive_percent, additive_density,
+                               oil_density, rounding=round):
+    additive_percent = _number('Additive (% volume)', additive_percent,
+                               strict=True)
+    additive_density = _number('Additive Density', additive_density,
+                               strict=True)
+    oil_density = _number('Finished Oil Density', oil_density, strict=True)
+    return rounding((additive_density * additive_percent) / oil_density, 2)
+
+
+def additive_percent_mass(additive_percent, additive_density, oil_density,
+                          rounded=True):
+    """Return the additive % by mass of every blend."""
+    return _map(_additive_percent_mass_row, additive_percent,
+                additive_density, oil_density, rounded=rounded)
+
+
+def total_ash(additive_percent, rounded=True, **metal_contents):
+    """Return the total sulfated ash of every blend.
+
+    Unlike OilBlend.total_ash_batch(), every metal is rounded like in
+    OilBlend.total_ash(), so results are the same; with rounded=False
+    nothing is.
+    """
+    metals = list(metal_contents)
+    rounding = round if rounded else _unrounded
+    contributions = [OilBlend.contributions[metal.lower()]
+                     if metal.lower() in OilBlend.contributions else None
+                     for metal in metals]
+
+    def row(additive_percent, *contents):
+        additive_percent = _number('Additive (% volume)', additive_percent,
+                                   strict=True)
+        ashes = []
+        for metal, contribution, content in zip(metals, contributions,
+                                                contents):
+            content = 0.0 if content == '' else _number('Metal Content',
+                                                        content)
+            if contribution is None:
+                raise KeyError(metal.lower())
+            ashes.append(rounding(content * contribution *
+                                  additive_percent / 100, 3))
+        return rounding(sum(ashes), 2)
+
+    return _map(row, additive_percent, *metal_contents.values())
+
+
+FUNCTIONS = {'viscosity_index': viscosity_index,
+             'viscosity_at_40': viscosity_at_40,
+             'viscosity_at_100': viscosity_at_100,
+             'viscosity_at_any_temp': viscosity_at_any_temp,
+             'temperature_at_viscosity': temperature_at_viscosity,
+             'oil_mix_viscosity': oil_mix_viscosity,
+             'mix_proportions': mix_proportions,
+             'grease_amount': grease_amount,
+             'lubrication_frequency': lubrication_frequency,
+             'velocity_factor': velocity_factor,
+             'reynolds_number': reynolds_number,
+             'flow_type': flow_type,
+             'transition_temperatures': transition_temperatures,
+             'additive_percent_mass': additive_percent_mass,
+             'total_ash': total_ash}
+
+
+# Decimals the calculators round each result to (None: to an integer)
+DIGITS = {'viscosity_index': None,
+          'viscosity_at_40': 2,
+          'viscosity_at_100': 2,
+          'viscosity_at_any_temp': 2,
+          'temperature_at_viscosity': 1,
+          'oil_mix_viscosity': 2,
+          'mix_proportions': 2,
+          'grease_amount': 2,
+          'lubrication_frequency': None,
+          'velocity_factor': None,
+          'reynolds_number': 1,
+          'flow_type': None,
+          'transition_temperatures': 1,
+          'additive_percent_mass': 2,
+          'total_ash': 2}
+
+
+def calculate(calc, columns, rounded=True):
+    """Run the calculation named calc over a mapping of columns.
+
+    With rounded=False, results keep full float precision, to be chained
+    into the next calculation as they are and rounded by present() only
+    when shown.
+    """
+    try:
+        function = FUNCTIONS[calc]
+    except KeyError:
+        raise ValueError('Calculation not defined: {0}'.format(calc))
+    return function(rounded=rounded, **columns)
+
+
+def present(calc, results):
+    """Return unrounded results of calc rounded like the calculators.
+
+    They may differ in the last decimal from rounded=True results where
+    the calculators round intermediate values (total_ash), and flow types
+    are not rounded at all.
+    """
+    digits = DIGITS[calc]
+
+    def rounded(value):
+        if isinstance(value, float):
+            return round(value, digits)
+        if isinstance(value, tuple):
+            return type(value)(*map(rounded, value))
+        return value
+
+    return [rounded(value) for value in results]
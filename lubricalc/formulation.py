@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+# File name: formulation.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides Formulation Class."""
+
+import math
+
+from .blend import OilBlend
+from .validator import validate
+
+
+class Formulation:
+    """Class to keep the sulfated ash of a formulation up to date.
+
+    Sulfated ash is linear in every metal content and in the additive
+    percent, so the formulation caches the contribution of each metal
+    (content * contribution to ash) and their sum. Changing one metal or
+    the treat rate only updates that term, and every listener connected
+    with connect() is called with the formulation after each change.
+    """
+
+    # Re-sum the cached contributions after this many updates to keep
+    # floating point drift away
+    resum_interval = 1000
+
+    def __init__(self, additive_percent, **metal_contents):
+        self._listeners = []
+        self._additive_percent = None
+        self.additive_percent = additive_percent
+        self._metal_content = None
+        self._metal_contents = dict.fromkeys(OilBlend.metals(), 0.0)
+        self._contributions = dict.fromkeys(OilBlend.metals(), 0.0)
+        self._ash = 0.0
+        self._updates = 0
+
+        for metal, content in metal_contents.items():
+            self.set_metal_content(metal, content)
+
+    def connect(self, listener):
+        """Call listener(formulation) after every change."""
+        self._listeners.append(listener)
+
+    def disconnect(self, listener):
+        self._listeners.remove(listener)
+
+    def set_metal_content(self, metal, content):
+        """Set the content (% mass) of one metal in the additive package."""
+        metal = metal.lower()
+        contribution = OilBlend.contributions[metal]
+        # Data Validation
+        self.metal_content = content
+
+        value = self._metal_content * contribution
+        self._ash += value - self._contributions[metal]
+        self._contributions[metal] = value
+        self._metal_contents[metal] = self._metal_content
+
+        self._updates += 1
+        if self._updates >= self.resum_interval:
+            self._ash = math.fsum(self._contributions.values())
+            self._updates = 0
+        self._notify()
+
+    def metal_contents(self):
+        return dict(self._metal_contents)
+
+    def sulfated_ash(self, metal):
+        """Return the % of sulfated ash coming from one metal."""
+        return round(self._contributions[metal.lower()] *
+                     self._additive_percent / 100, 3)
+
+    @property
+    def total_ash(self):
+        """Return the total % of sulfated ash of the formulation.
+
+        Like OilBlend.total_ash_batch(), the metal contributions are not
+        rounded one by one before adding them up.
+        """
+        return round(self._ash * self._additive_percent / 100, 2)
+
+    def _notify(self):
+        for listener in self._listeners:
+            listener(self)
+
+    @property
+    def additive_percent(self):
+        return self._additive_percent
+
+    @additive_percent.setter
+    def additive_percent(self, value):
+        validate(self, 'Additive (% volume)', value, '_additive_percent',
+                 strict=True)
+        self._notify()
+
+    @property
+    def metal_content(self):
+        return self._metal_content
+
+    @metal_content.setter
+    def metal_content(self, value):
+        if value == '':
+            self._metal_content = 0.0
+        else:
+            validate(self, 'Metal Content', value, '_metal_content')
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+
+# File name: history.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides HistoryStore Class.
+
+An SQLite store of oil analysis samples per asset:
+
+    with HistoryStore('history.db') as store:
+        store.add_many([{'asset': 'compressor-1', 'timestamp': 1.7e9,
+                         'viscosity40': 46.2, 'viscosity100': 6.9,
+                         'iron': 0.0012}, ...])
+        store.trend('compressor-1', 'viscosity40', bucket=86400)
+
+Samples are kept in a table clustered on (asset, timestamp), so the
+samples of an asset over a time range are contiguous on disk and range
+and aggregate queries read only them. There is one sample per asset and
+timestamp; adding it again replaces it. Timestamps are seconds since the
+epoch (datetimes are converted), and missing values are NULL.
+"""
+
+from collections import namedtuple
+import datetime
+import sqlite3
+
+from . import columnar
+from .blend import OilBlend
+from .validator import Validator
+
+# Wear metals reported by oil analysis besides the additive metals
+WEAR_METALS = ('iron', 'chromium', 'aluminum', 'nickel', 'tin', 'silver')
+
+# Stored values: viscosities (cSt), viscosity index, sulfated ash (% mass)
+# and metal contents, in the unit the laboratory reports
+FIELDS = ('viscosity40', 'viscosity100', 'v_index', 'total_ash') + tuple(
+    OilBlend.contributions) + WEAR_METALS
+
+Sample = namedtuple('Sample', ('asset', 'timestamp') + FIELDS)
+
+Bucket = namedtuple('Bucket', ['start', 'count', 'mean', 'min', 'max'])
+
+Summary = namedtuple('Summary', ['count', 'mean', 'min', 'max', 'first',
+                                 'last'])
+
+_COLUMNS = ', '.join(FIELDS)
+
+_INFINITIES = (float('inf'), float('-inf'))
+
+
+def timestamp(value):
+    """Return a timestamp or datetime as seconds since the epoch."""
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    return Validator.validate_float('timestamp', value)
+
+
+def _number(name, value):
+    """Return value parsed like the calculators parse it; None stays."""
+    if value is None or (type(value) is float and value == value and
+                         value not in _INFINITIES):
+        return value
+    return Validator.validate_float(name, value)
+
+
+def _parse(sample):
+    """Return [asset, timestamp] + the FIELDS values of a sample."""
+    if hasattr(sample, '_asdict'):
+        sample = sample._asdict()
+    try:
+        asset, time = sample['asset'], sample['timestamp']
+    except (KeyError, TypeError):
+        raise ValueError('Sample must have an asset and a timestamp, '
+                         'not: {0!r}'.format(sample)) from None
+    if not isinstance(asset, str):
+        raise ValueError('Asset must be a name, not: {0!r}'.format(asset))
+    return [asset, timestamp(time)] + [_number(field, sample.get(field))
+                                       for field in FIELDS]
+
+
+class HistoryStore:
+    """Class to keep and query oil analysis samples of assets."""
+
+    def __init__(self, path):
+        self.path = path
+        self._assets = {}
+        self._connection = sqlite3.connect(path, timeout=30)
+        with self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS assets '
+                '(id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS samples (asset INTEGER NOT NULL '
+                'REFERENCES assets (id), timestamp REAL NOT NULL, {0}, '
+                'PRIMARY KEY (asset, timestamp)) WITHOUT ROWID'.format(
+                    ', '.join(field + ' REAL' for field in FIELDS)))
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _asset_id(self, name):
+        """Return the id of a stored asset, or None."""
+        if name not in self._assets:
+            row = self._connection.execute(
+                'SELECT id FROM assets WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                return None
+            self._assets[name] = row[0]
+        return self._assets[name]
+
+    def _add_assets(self, names):
+        """Return {name: id} of assets, adding the new ones.
+
+        Runs inside the caller's transaction, so the ids are only cached
+        by the caller once it commits.
+        """
+        ids = {name: self._assets[name] for name in names
+               if name in self._assets}
+        new = [(name,) for name in names if name not in ids]
+        self._connection.executemany(
+            'INSERT OR IGNORE INTO assets (name) VALUES (?)', new)
+        for name, in new:
+            ids[name], = self._connection.execute(
+                'SELECT id FROM assets WHERE name = ?', (name,)).fetchone()
+        return ids
+
+    def assets(self):
+        """Return the names of the assets with samples."""
+        return [name for name, in self._connection.execute(
+            'SELECT name FROM assets ORDER BY name')]
+
+    def add(self, asset, timestamp, **values):
+        """Add one sample of asset."""
+        return self.add_many([dict(values, asset=asset,
+                                   timestamp=timestamp)])
+
+    def add_many(self, samples):
+        """Add samples (mappings or Sample tuples) in one transaction.
+
+        Values are parsed like the calculators parse them ('46,2' is
+        46.2), and a sample that can't be raises ValueError before anything
+        is added. The viscosity index of samples with both viscosities and
+        no v_index is computed. Returns the number of samples added.
+        """
+        rows = [_parse(sample) for sample in samples]
+        # Rows are asset, timestamp, then FIELDS
+        kv40, kv100, v_index = (FIELDS.index(field) + 2 for field in (
+            'viscosity40', 'viscosity100', 'v_index'))
+        missing = [row for row in rows
+                   if row[v_index] is None and row[kv40] is not None and
+                   row[kv100] is not None]
+        if missing:
+            indexes = columnar.viscosity_index(
+                [row[kv40] for row in missing],
+                [row[kv100] for row in missing])
+            for row, index in zip(missing, indexes):
+                if not isinstance(index, Exception):
+                    row[v_index] = index
+
+        with self._connection:
+            ids = self._add_assets({row[0] for row in rows})
+            for row in rows:
+                row[0] = ids[row[0]]
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO samples (asset, timestamp, {0}) '
+                'VALUES ({1})'.format(_COLUMNS,
+                                      ', '.join('?' * (len(FIELDS) + 2))),
+                rows)
+        self._assets.update(ids)
+        return len(rows)
+
+    def _range(self, asset, start, end):
+        """Return the WHERE clause and parameters of a time range."""
+        where = 'asset = ?'
+        parameters = [self._asset_id(asset)]
+        if start is not None:
+            where += ' AND timestamp >= ?'
+            parameters.append(timestamp(start))
+        if end is not None:
+            where += ' AND timestamp < ?'
+            parameters.append(timestamp(end))
+        return where, parameters
+
+    @staticmethod
+    def _field(field):
+        if field not in FIELDS:
+            raise ValueError('Field not defined: {0}'.format(field))
+        return field
+
+    def samples(self, asset, start=None, end=None, limit=None):
+        """Return the samples of asset in [start, end), oldest first."""
+        where, parameters = self._range(asset, start, end)
+        query = ('SELECT ?, timestamp, {0} FROM samples WHERE {1} '
+                 'ORDER BY timestamp'.format(_COLUMNS, where))
+        parameters.insert(0, asset)
+        if limit is not None:
+            query += ' LIMIT ?'
+            parameters.append(int(limit))
+        return list(map(Sample._make,
+                        self._connection.execute(query, parameters)))
+
+    def latest(self, asset):
+        """Return the last sample of asset, or None."""
+        where, parameters = self._range(asset, None, None)
+        row = self._connection.execute(
+            'SELECT timestamp, {0} FROM samples WHERE {1} '
+            'ORDER BY timestamp DESC LIMIT 1'.format(_COLUMNS, where),
+            parameters).fetchone()
+        return None if row is None else Sample(asset, *row)
+
+    def summary(self, asset, field, start=None, end=None):
+        """Return the Summary of a field of asset in [start, end).
+
+        first and last are the oldest and newest values in the range.
+        """
+        field = self._field(field)
+        where, parameters = self._range(asset, start, end)
+        where += ' AND {0} IS NOT NULL'.format(field)
+        count, mean, low, high = self._connection.execute(
+            'SELECT count({0}), avg({0}), min({0}), max({0}) FROM samples '
+            'WHERE {1}'.format(field, where), parameters).fetchone()
+        first = last = None
+        if count:
+            first, = self._connection.execute(
+                'SELECT {0} FROM samples WHERE {1} ORDER BY timestamp '
+                'LIMIT 1'.format(field, where), parameters).fetchone()
+            last, = self._connection.execute(
+                'SELECT {0} FROM samples WHERE {1} ORDER BY timestamp DESC '
+                'LIMIT 1'.format(field, where), parameters).fetchone()
+        return Summary(count, mean, low, high, first, last)
+
+    def trend(self, asset, field, start=None, end=None, bucket=86400):
+        """Return a Bucket per bucket seconds with samples of a field.
+
+        Buckets start at start (or at the first sample) and come oldest
+        first.
+        """
+        field = self._field(field)
+        bucket = Validator.validate_float('Bucket', bucket)
+        Validator.validate_lower_limit('Bucket', bucket, strict=True)
+        where, parameters = self._range(asset, start, end)
+        if start is None:
+            first = self.samples(asset, limit=1)
+            if not first:
+                return []
+            start = first[0].timestamp
+        origin = timestamp(start)
+        return [Bucket(origin + index * bucket, *row)
+                for index, *row in self._connection.execute(
+                    'SELECT CAST((timestamp - ?) / ? AS INTEGER) AS bucket, '
+                    'count({0}), avg({0}), min({0}), max({0}) FROM samples '
+                    'WHERE {1} AND {0} IS NOT NULL GROUP BY bucket '
+                    'ORDER BY bucket'.format(field, where),
+                    [origin, bucket] + parameters)]
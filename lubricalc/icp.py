@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+# File name: icp.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides ICPReader Class."""
+
+import csv
+from itertools import islice
+import re
+
+from .blend import OilBlend
+from .exception import ConceptError
+from .validator import Validator
+from .validator import validate
+
+ELEMENTS = {'zn': 'zinc',
+            'ba': 'barium',
+            'na': 'sodium',
+            'ca': 'calcium',
+            'mg': 'magnesium',
+            'pb': 'lead',
+            'b': 'boron',
+            'k': 'potassium',
+            'mn': 'manganese',
+            'mo': 'molybdenum',
+            'cu': 'copper'}
+
+
+def metal_name(column):
+    """Return the metal of an ICP column ('Zn', 'Zn (ppm)', 'zinc'...)."""
+    match = re.match(r'\s*([A-Za-z]+)', column)
+    if match is None:
+        return None
+    name = match.group(1).lower()
+    name = ELEMENTS.get(name, name)
+    return name if name in OilBlend.contributions else None
+
+
+class ICPReader:
+    """Class to compute sulfated ash from ICP elemental analysis files.
+
+    The input is a CSV file with one sample per row and one column per
+    element. Element columns are mapped onto OilBlend.contributions by
+    symbol or name; other columns are copied to the output as they are.
+    Optional 'additive_percent', 'additive_density' and 'oil_density'
+    columns override the values given to the reader for that sample.
+
+    Rows are read, computed and written chunk_size at a time, so memory
+    use does not depend on the size of the file.
+    """
+
+    def __init__(self, additive_percent, additive_density=None,
+                 oil_density=None, units='ppm', chunk_size=10000):
+        self._additive_percent = None
+        self._additive_density = None
+        self._oil_density = None
+        self.additive_percent = additive_percent
+        if additive_density is not None:
+            self.additive_density = additive_density
+        if oil_density is not None:
+            self.oil_density = oil_density
+        # ICP results usually come in ppm (mg/kg) and contents in % mass
+        self.scale = {'ppm': 1 / 10000, '%': 1.0}[units]
+        self.chunk_size = int(chunk_size)
+        if self.chunk_size < 1:
+            raise ValueError('Chunk size: Input value must be at least 1, '
+                             'not: {0}'.format(chunk_size))
+
+    def process(self, infile, outfile):
+        """Read samples from infile and write results to outfile.
+
+        Adds sulfated_ash, additive_percent_mass and error columns to every
+        row and returns the number of rows processed.
+        """
+        reader = csv.reader(infile)
+        writer = csv.writer(outfile)
+        header = self._header(reader, infile)
+        writer.writerow(header + ['sulfated_ash', 'additive_percent_mass',
+                                  'error'])
+        count = 0
+        for rows in self._chunks(reader, header):
+            writer.writerows(rows)
+            count += len(rows)
+        return count
+
+    def chunks(self, infile):
+        """Yield the result rows of infile, one list per chunk."""
+        reader = csv.reader(infile)
+        yield from self._chunks(reader, self._header(reader, infile))
+
+    @staticmethod
+    def _header(reader, infile):
+        try:
+            return next(reader)
+        except StopIteration:
+            raise ValueError('ICP file: no header line in {0}'.format(
+                getattr(infile, 'name', repr(infile))))
+
+    def _chunks(self, reader, header):
+        columns = [(index, metal_name(column))
+                   for index, column in enumerate(header)]
+        columns = [(index, metal) for index, metal in columns
+                   if metal is not None]
+        named = {column.strip().lower(): index
+                 for index, column in enumerate(header)}
+
+        while True:
+            chunk = list(islice(reader, self.chunk_size))
+            if not chunk:
+                break
+            yield self._process_chunk(chunk, columns, named)
+
+    def _process_chunk(self, chunk, columns, named):
+        contents = []
+        percents = []
+        masses = []
+        valid = []
+        errors = {}
+
+        for position, row in enumerate(chunk):
+            try:
+                content = [self._content(metal, row[index])
+                           for index, metal in columns]
+                percent = self._sample_value(
+                    'Additive (% volume)', row, named.get('additive_percent'),
+                    self._additive_percent)
+                density = self._sample_value(
+                    'Additive Density', row, named.get('additive_density'),
+                    self._additive_density)
+                oil_density = self._sample_value(
+                    'Finished Oil Density', row, named.get('oil_density'),
+                    self._oil_density)
+            except (ValueError, ConceptError, IndexError) as error:
+                errors[position] = str(error)
+                continue
+            contents.append(content)
+            percents.append(percent)
+            if density is None or oil_density is None:
+                masses.append('')
+            else:
+                masses.append(round(density * percent / oil_density, 2))
+            valid.append(position)
+
+        if columns:
+            ash = OilBlend.total_ash_batch(contents, percents,
+                                           [metal for _, metal in columns])
+        else:
+            # A file without element columns has no ash to compute
+            ash = [0.0] * len(contents)
+
+        results = [row + ['', '', errors.get(position, '')]
+                   for position, row in enumerate(chunk)]
+        for position, value, mass in zip(valid, ash, masses):
+            results[position][-3] = value
+            results[position][-2] = mass
+        return results
+
+    def _content(self, metal, value):
+        value = value.strip()
+        # Blank cells and values under the detection limit count as zero
+        if value == '' or value.startswith('<'):
+            return 0.0
+        name = metal.capitalize()
+        value = Validator.validate_float(name, value)
+        Validator.validate_lower_limit(name, value)
+        return value * self.scale
+
+    @staticmethod
+    def _sample_value(name, row, index, default):
+        if index is None or not row[index].strip():
+            return default
+        value = Validator.validate_float(name, row[index])
+        Validator.validate_lower_limit(name, value, strict=True)
+        return value
+
+    @property
+    def additive_percent(self):
+        return self._additive_percent
+
+    @additive_percent.setter
+    def additive_percent(self, value):
+        validate(self, 'Additive (% volume)', value, '_additive_percent',
+                 strict=True)
+
+    @property
+    def additive_density(self):
+        return self._additive_density
+
+    @additive_density.setter
+    def additive_density(self, value):
+        validate(self, 'Additive Density', value, '_additive_density',
+                 strict=True)
+
+    @property
+    def oil_density(self):
+        return self._oil_density
+
+    @oil_density.setter
+    def oil_density(self, value):
+        validate(self, 'Finished Oil Density', value, '_oil_density',
+                 strict=True)
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+
+# File name: instrument.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides opt-in instrumentation of the calculators.
+
+    from lubricalc import instrument
+    instrument.enable()
+    ...
+    instrument.export('metrics.prom')
+
+enable() wraps the public methods of the calculator classes, the
+columnar functions and validate() in the modules that use it; disable()
+puts the originals back, so nothing is measured, and nothing is paid,
+while instrumentation is off. Every wrapped call records its count and
+latency, and every Viscosity._viscosity_index() call is counted as one
+solver iteration of the outermost calculation running in its thread,
+which is what the viscosity_at_40/viscosity_at_100 searches spend on.
+"""
+
+from collections import deque
+import functools
+import json
+import sys
+import threading
+import time
+
+from . import columnar
+from . import validator
+from .bearing import Bearing
+from .blend import OilBlend
+from .mixture import OilMixture
+from .reynolds import Reynolds
+from .viscosity import Viscosity
+
+CLASSES = (Viscosity, OilMixture, Bearing, Reynolds, OilBlend)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Latencies kept per metric for the percentiles
+SAMPLES = 10000
+
+
+class Metric:
+    """Class to accumulate the calls of one instrumented function."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.iterations = 0
+        self.samples = deque(maxlen=SAMPLES)
+
+    def add(self, seconds, iterations=0, failed=False):
+        self.count += 1
+        self.errors += failed
+        self.seconds += seconds
+        self.iterations += iterations
+        self.samples.append(seconds)
+
+    def quantiles(self):
+        """Return {quantile: seconds} over the kept samples."""
+        samples = sorted(self.samples)
+        if not samples:
+            return {}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))]
+                for q in QUANTILES}
+
+
+_metrics = {}
+_originals = []
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _record(name, seconds, iterations, failed):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = Metric()
+        metric.add(seconds, iterations, failed)
+
+
+def _timed(name, function):
+    """Return function recording its calls under name."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        outermost = not getattr(_local, 'active', False)
+        if outermost:
+            _local.active = True
+            _local.iterations = 0
+        failed = True
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            seconds = time.perf_counter() - start
+            iterations = 0
+            if outermost:
+                _local.active = False
+                iterations = _local.iterations
+            _record(name, seconds, iterations, failed)
+    return wrapper
+
+
+def _counted(function):
+    """Return function counting its calls as solver iterations."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, 'active', False):
+            _local.iterations += 1
+        return function(*args, **kwargs)
+    return wrapper
+
+
+def _patch(owner, attr, value):
+    """Replace attr (or key) of owner by value, keeping the original."""
+    if isinstance(owner, dict):
+        _originals.append((owner, attr, owner[attr]))
+        owner[attr] = value
+        return
+    original = (owner.__dict__[attr] if isinstance(owner, type)
+                else getattr(owner, attr))
+    _originals.append((owner, attr, original))
+    setattr(owner, attr, value)
+
+
+def enabled():
+    """Return whether the calculators are instrumented."""
+    return bool(_originals)
+
+
+def enable():
+    """Instrument the calculators, validate() and the columnar functions."""
+    if enabled():
+        return
+    for cls in CLASSES:
+        for attr, member in list(vars(cls).items()):
+            if attr.startswith('_'):
+                continue
+            name = '{0}.{1}'.format(cls.__name__, attr)
+            if isinstance(member, classmethod):
+                _patch(cls, attr, classmethod(_timed(name, member.__func__)))
+            elif callable(member):
+                _patch(cls, attr, _timed(name, member))
+    _patch(Viscosity, '_viscosity_index',
+           _counted(Viscosity.__dict__['_viscosity_index']))
+
+    for calc, function in list(columnar.FUNCTIONS.items()):
+        _patch(columnar.FUNCTIONS, calc,
+               _timed('columnar.' + calc, function))
+
+    original = validator.validate
+    validate = _timed('validate', original)
+    for module in list(sys.modules.values()):
+        if getattr(module, 'validate', None) is original:
+            _patch(module, 'validate', validate)
+
+
+def disable():
+    """Remove the instrumentation, keeping the recorded metrics."""
+    while _originals:
+        owner, attr, original = _originals.pop()
+        if isinstance(owner, dict):
+            owner[attr] = original
+        else:
+            setattr(owner, attr, original)
+
+
+def reset():
+    """Drop the recorded metrics."""
+    with _lock:
+        _metrics.clear()
+
+
+def snapshot():
+    """Return the recorded metrics as a JSON serializable dict."""
+    with _lock:
+        metrics = {name: (metric.count, metric.errors, metric.seconds,
+                          metric.iterations, metric.quantiles())
+                   for name, metric in _metrics.items()}
+    return {name: {'count': count,
+                   'errors': errors,
+                   'seconds': seconds,
+                   'iterations': iterations,
+                   'quantiles': {str(q): value
+                                 for q, value in quantiles.items()}}
+            for name, (count, errors, seconds, iterations, quantiles)
+            in sorted(metrics.items())}
+
+
+def prometheus(metrics=None):
+    """Return a snapshot in the Prometheus text exposition format."""
+    metrics = snapshot() if metrics is None else metrics
+    lines = ['# HELP lubricalc_calls_total Calls per calculation.',
+             '# TYPE lubricalc_calls_total counter']
+    lines += ['lubricalc_calls_total{{function="{0}"}} {1}'.format(
+        name, metric['count']) for name, metric in metrics.items()]
+    lines += ['# HELP lubricalc_errors_total Calls that raised.',
+              '# TYPE lubricalc_errors_total counter']
+    lines += ['lubricalc_errors_total{{function="{0}"}} {1}'.format(
+        name, metric['errors']) for name, metric in metrics.items()]
+    lines += ['# HELP lubricalc_solver_iterations_total Viscosity index '
+              'evaluations done by each calculation.',
+              '# TYPE lubricalc_solver_iterations_total counter']
+    lines += ['lubricalc_solver_iterations_total{{function="{0}"}} '
+              '{1}'.format(name, metric['iterations'])
+              for name, metric in metrics.items() if metric['iterations']]
+    lines += ['# HELP lubricalc_seconds Latency per calculation.',
+              '# TYPE lubricalc_seconds summary']
+    for name, metric in metrics.items():
+        for q, value in metric['quantiles'].items():
+            lines.append('lubricalc_seconds{{function="{0}",quantile="{1}"}}'
+                         ' {2!r}'.format(name, q, value))
+        lines.append('lubricalc_seconds_sum{{function="{0}"}} {1!r}'.format(
+            name, metric['seconds']))
+        lines.append('lubricalc_seconds_count{{function="{0}"}} {1}'.format(
+            name, metric['count']))
+    return '\n'.join(lines) + '\n'
+
+
+def export(path):
+    """Write a snapshot to path: Prometheus text for *.prom, else JSON."""
+    metrics = snapshot()
+    with open(path, 'w') as file:
+        if path.endswith('.prom'):
+            file.write(prometheus(metrics))
+        else:
+            json.dump(metrics, file, indent=2)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+# File name: monitor.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides FlowRegimeMonitor Class."""
+
+from collections import namedtuple
+import csv
+import math
+
+from .exception import ConceptError
+from .reynolds import Reynolds
+from .validator import Validator
+from .validator import validate
+from .viscosity import TO_KELVIN
+from .viscosity import Viscosity
+from .viscosity import d341_constants
+
+Reading = namedtuple('Reading',
+                     ['circuit', 'timestamp', 'flow_rate', 'temperature'])
+
+RegimeChange = namedtuple('RegimeChange', ['circuit', 'timestamp',
+                                           'previous', 'current', 'reynolds'])
+
+
+def read_readings(lines):
+    """Yield sensor readings from CSV lines.
+
+    Lines are: circuit, timestamp (s), flow rate (L/min), temperature (°C),
+    with an optional header line starting with 'circuit'.
+    """
+    for row in csv.reader(lines):
+        if not row or row[0] == 'circuit':
+            continue
+        yield Reading(row[0], float(row[1]), float(row[2]), float(row[3]))
+
+
+class FlowRegimeMonitor:
+    """Class to detect flow type changes from streamed sensor readings.
+
+    Every circuit keeps only its oil D341 constants, its line diameter, the
+    last temperature and viscosity seen and its current flow type, so
+    memory does not grow with the length of the stream.
+    """
+
+    def __init__(self, hysteresis=0.05):
+        self._hysteresis = None
+        self.hysteresis = hysteresis
+        self._circuits = {}
+
+    def add_circuit(self, circuit, viscosity40, viscosity100, diameter):
+        """Register a circuit with its oil and line diameter (m).
+
+                 Q * 4 * D         Q
+        Re = ---------------- = ------- * k
+              pi * D^2 * v        v
+
+        where:
+        Q: flow rate (L/min)
+        D: line diameter (m)
+        v: kinematic viscosity at the oil temperature (cSt)
+        k: constant of the circuit
+        """
+        # Validate Data
+        oil = Viscosity()
+        oil.viscosity40 = viscosity40
+        oil.viscosity100 = viscosity100
+        oil._validate_viscosity_relation()
+        validator = Validator()
+        diameter = validator.validate_float('Diameter', diameter)
+        validator.validate_lower_limit('Diameter', diameter, 0, strict=True)
+
+        a, b = d341_constants(oil.viscosity40, oil.viscosity100)
+        k = 4 * 10 ** 6 / (60000 * math.pi * diameter)
+        self._circuits[circuit] = [a, b, k, None, None, None, diameter]
+
+    def diameter(self, circuit):
+        """Return the line diameter (m) of a circuit."""
+        return self._state(circuit)[6]
+
+    def regime(self, circuit):
+        """Return the current flow type of a circuit."""
+        return self._state(circuit)[5]
+
+    def process(self, readings):
+        """Yield a RegimeChange every time a circuit changes its flow type.
+
+        The first reading of each circuit always yields an event with
+        previous set to None. A circuit leaves its flow type only when Re
+        goes past a limit by more than the hysteresis band.
+        """
+        circuits = self._circuits
+        log10 = math.log10
+        laminar = Reynolds.laminar_limit
+        turbulent = Reynolds.turbulent_limit
+        laminar_up = laminar * (1 + self._hysteresis)
+        laminar_down = laminar * (1 - self._hysteresis)
+        turbulent_up = turbulent * (1 + self._hysteresis)
+        turbulent_down = turbulent * (1 - self._hysteresis)
+
+        for circuit, timestamp, flow_rate, temperature in readings:
+            state = circuits.get(circuit)
+            if state is None:
+                state = self._state(circuit)
+
+            if temperature == state[3]:
+                viscosity = state[4]
+            else:
+                a, b = state[0], state[1]
+                viscosity = 10 ** (10 ** (a - b * log10(
+                    temperature + TO_KELVIN))) - 0.7
+                state[3] = temperature
+                state[4] = viscosity
+
+            reynolds = flow_rate * state[2] / viscosity
+            previous = state[5]
+
+            if previous == 'laminar':
+                if reynolds <= laminar_up:
+                    continue
+                current = 'turbulent' if reynolds >= turbulent_up else 'mixed'
+            elif previous == 'mixed':
+                if reynolds < laminar_down:
+                    current = 'laminar'
+                elif reynolds > turbulent_up:
+                    current = 'turbulent'
+                else:
+                    continue
+            elif previous == 'turbulent':
+                if reynolds >= turbulent_down:
+                    continue
+                current = 'laminar' if reynolds < laminar_down else 'mixed'
+            elif reynolds <= laminar:
+                current = 'laminar'
+            elif reynolds >= turbulent:
+                current = 'turbulent'
+            else:
+                current = 'mixed'
+
+            state[5] = current
+            yield RegimeChange(circuit, timestamp, previous, current,
+                               round(reynolds, 1))
+
+    def _state(self, circuit):
+        try:
+            return self._circuits[circuit]
+        except KeyError:
+            raise ConceptError('Circuit: not defined: {0}'.format(circuit))
+
+    @property
+    def hysteresis(self):
+        return self._hysteresis
+
+    @hysteresis.setter
+    def hysteresis(self, value):
+        validate(self, 'Hysteresis', value, '_hysteresis')
+        if self._hysteresis >= 1:
+            raise ConceptError('Hysteresis: Input value must be lower than 1')
+
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+# File name: optimizer.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides AdditiveOptimizer Class."""
+
+from bisect import bisect_right
+from collections import namedtuple
+import heapq
+import math
+
+from .blend import OilBlend
+from .validator import validate
+
+AdditivePackage = namedtuple('AdditivePackage',
+                             ['name', 'density', 'metal_contents'])
+
+Treatment = namedtuple('Treatment', ['package', 'additive_percent',
+                                     'total_ash', 'additive_percent_mass',
+                                     'detergent'])
+
+
+class AdditiveOptimizer:
+    """Class to find the best treat rate of additive packages.
+
+    Every package is dosed to get as much detergent metal as possible in
+    the finished oil without going over the sulfated ash and additive mass
+    limits. Ash, additive mass and detergent are all linear in the treat
+    rate (AP, % volume):
+
+    SA = AP * sum(Ci * Wi) / 100
+    Additive (% mass) = AP * Additive Density / Finished Oil Density
+    Detergent (% mass) = AP * sum(Cd) / 100
+    where:
+    Ci: Content (% mass) of each metal in the package
+    Wi: Contribution to ash of each metal
+    Cd: Content (% mass) of each detergent metal in the package
+
+    so the best treat rate is the smallest of the bounds set by each limit
+    and the packages are ranked by the detergent they deliver there.
+    """
+
+    detergents = ('calcium', 'magnesium', 'sodium', 'barium')
+
+    def __init__(self, max_ash, max_additive_mass, oil_density,
+                 max_additive_percent=100):
+        self._max_ash = None
+        self._max_additive_mass = None
+        self._oil_density = None
+        self._max_additive_percent = None
+        self.max_ash = max_ash
+        self.max_additive_mass = max_additive_mass
+        self.oil_density = oil_density
+        self.max_additive_percent = max_additive_percent
+
+    def treat(self, package, treat_rates=None):
+        """Return the best Treatment of a package, or None if none fits.
+
+        With treat_rates (sorted % volume values), only those treat rates
+        are considered.
+        """
+        contributions = OilBlend.contributions
+        ash_factor = 0.0
+        detergent_factor = 0.0
+        for metal, content in package.metal_contents.items():
+            metal = metal.lower()
+            ash_factor += content * contributions[metal]
+            if metal in self.detergents:
+                detergent_factor += content
+
+        percent = min(self._max_additive_percent,
+                      self._max_additive_mass * self._oil_density /
+                      package.density)
+        if ash_factor > 0:
+            percent = min(percent, 100 * self._max_ash / ash_factor)
+
+        if treat_rates is None:
+            # Round down so the rounded treat rate still meets the limits
+            percent = math.floor(percent * 100) / 100
+        else:
+            index = bisect_right(treat_rates, percent)
+            if index == 0:
+                return None
+            percent = treat_rates[index - 1]
+        if percent <= 0:
+            return None
+
+        return Treatment(package.name, percent,
+                         round(percent * ash_factor / 100, 2),
+                         round(percent * package.density /
+                               self._oil_density, 2),
+                         round(percent * detergent_factor / 100, 3))
+
+    def rank(self, packages, treat_rates=None, top=None):
+        """Return the Treatments of the packages, best detergent first."""
+        if treat_rates is not None:
+            treat_rates = sorted(treat_rates)
+        treatments = (self.treat(package, treat_rates)
+                      for package in packages)
+        treatments = [t for t in treatments if t is not None]
+
+        def key(treatment):
+            return treatment.detergent
+
+        if top is not None:
+            return heapq.nlargest(top, treatments, key=key)
+        return sorted(treatments, key=key, reverse=True)
+
+    @property
+    def max_ash(self):
+        return self._max_ash
+
+    @max_ash.setter
+    def max_ash(self, value):
+        validate(self, 'Maximum Sulfated Ash', value, '_max_ash', strict=True)
+
+    @property
+    def max_additive_mass(self):
+        return self._max_additive_mass
+
+    @max_additive_mass.setter
+    def max_additive_mass(self, value):
+        validate(self, 'Maximum Additive (% mass)', value,
+                 '_max_additive_mass', strict=True)
+
+    @property
+    def oil_density(self):
+        return self._oil_density
+
+    @oil_density.setter
+    def oil_density(self, value):
+        validate(self, 'Finished Oil Density', value, '_oil_density',
+                 strict=True)
+
+    @property
+    def max_additive_percent(self):
+        return self._max_additive_percent
+
+    @max_additive_percent.setter
+    def max_additive_percent(self, value):
+        validate(self, 'Maximum Additive (% volume)', value,
+                 '_max_additive_percent', strict=True)
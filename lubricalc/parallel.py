@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+# File name: parallel.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides ParallelExecutor Class."""
+
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from . import columnar
+from .reynolds import Transitions
+from .shared import SharedColumns
+
+# Result fields run_shared() writes to output columns, in order. flow_type
+# results are names, which float64 columns can't hold.
+SHARED_FIELDS = {calc: ('result',) for calc in columnar.FUNCTIONS
+                 if calc != 'flow_type'}
+SHARED_FIELDS['mix_proportions'] = columnar.Proportions._fields
+SHARED_FIELDS['transition_temperatures'] = Transitions._fields
+
+
+def pack(values):
+    """Return a column as a float64 buffer, or as a list if not numeric."""
+    try:
+        return array('d', values).tobytes()
+    except TypeError:
+        return list(values)
+
+
+def unpack(column):
+    if isinstance(column, bytes):
+        values = array('d')
+        values.frombytes(column)
+        return values
+    return column
+
+
+def run_chunk(calc, names, buffers):
+    """Compute one chunk in a worker and pack its results.
+
+    Returns (typecode, results, errors): numeric results come back as an
+    int64 or float64 buffer, with the exceptions of failed rows in the
+    errors mapping; other results come back as a list.
+    """
+    results = columnar.calculate(
+        calc, {name: unpack(buffer) for name, buffer in zip(names, buffers)})
+    errors = {index: result for index, result in enumerate(results)
+              if isinstance(result, Exception)}
+    values = [0 if index in errors else result
+              for index, result in enumerate(results)]
+    for typecode, kind in (('q', int), ('d', float)):
+        if all(type(value) is kind or type(value) is int
+               for value in values):
+            try:
+                return typecode, array(typecode, values).tobytes(), errors
+            except (TypeError, OverflowError):
+                break
+    return None, results, {}
+
+
+def unpack_results(typecode, results, errors):
+    if typecode is None:
+        return results
+    values = array(typecode)
+    values.frombytes(results)
+    values = values.tolist()
+    for index, error in errors.items():
+        values[index] = error
+    return values
+
+
+def run_shared_chunk(calc, inputs, outputs, start, stop):
+    """Compute rows start:stop of shared inputs into shared outputs.
+
+    Only the exceptions of failed rows go back to the parent process;
+    their output rows are set to NaN, like missing values of results
+    such as transition temperatures.
+    """
+    nan = float('nan')
+    errors = {}
+    with SharedColumns.attach(inputs) as source, \
+            SharedColumns.attach(outputs) as target:
+        results = columnar.calculate(
+            calc, {name: source.column(name, start, stop)
+                   for name in source.names})
+        columns = [target.column(name, start, stop) for name in target.names]
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                errors[start + index] = result
+                result = (nan,) * len(columns)
+            elif not isinstance(result, tuple):
+                result = (result,)
+            for column, value in zip(columns, result):
+                column[index] = nan if value is None else value
+        del results
+    return errors
+
+
+class ParallelExecutor:
+    """Class to run columnar calculations chunk by chunk in processes.
+
+    Columns are cut into chunks of chunk_size rows and sent to the workers
+    as float64 buffers (one bytes object per column), and results come
+    back the same way, so almost nothing goes through per-item pickling.
+    At most two chunks per worker are in flight, and results are yielded
+    in input order.
+    """
+
+    def __init__(self, workers=None, chunk_size=10000):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = int(chunk_size)
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def map(self, calc, columns):
+        """Yield the result of every row, in order.
+
+        columns maps argument names to sequences of the same length.
+        Failed rows yield the exception the calculator raises.
+        """
+        if calc not in columnar.FUNCTIONS:
+            raise ValueError('Calculation not defined: {0}'.format(calc))
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+
+        names = list(columns)
+        length = len(columns[names[0]]) if names else 0
+        pending = deque()
+        for start in range(0, length, self.chunk_size):
+            stop = start + self.chunk_size
+            buffers = [pack(columns[name][start:stop]) for name in names]
+            pending.append(self._pool.submit(run_chunk, calc, names,
+                                             buffers))
+            if len(pending) >= 2 * self.workers:
+                yield from unpack_results(*pending.popleft().result())
+        while pending:
+            yield from unpack_results(*pending.popleft().result())
+
+    def run(self, calc, columns):
+        """Return the results of every row as a list."""
+        return list(self.map(calc, columns))
+
+    def run_shared(self, calc, inputs, outputs):
+        """Compute shared input columns into shared output columns.
+
+        inputs and outputs are SharedColumns; the workers attach to them
+        by name and write the results in place, one output column per
+        result field ('oil1', 'oil2' for mix_proportions, for instance;
+        see SHARED_FIELDS). Returns a mapping of failed row indexes to
+        their exceptions.
+        """
+        if calc not in columnar.FUNCTIONS:
+            raise ValueError('Calculation not defined: {0}'.format(calc))
+        if calc not in SHARED_FIELDS:
+            raise ValueError('{0}: Results are not numbers and can not be '
+                             'written to shared columns'.format(calc))
+        fields = SHARED_FIELDS[calc]
+        if len(outputs.names) != len(fields):
+            raise ValueError('{0}: Results need {1} output columns ({2}), '
+                             'not: {3}'.format(calc, len(fields),
+                                               ', '.join(fields),
+                                               len(outputs.names)))
+        if outputs.length != inputs.length:
+            raise ValueError('{0}: Output columns need {1} rows, '
+                             'not: {2}'.format(calc, inputs.length,
+                                               outputs.length))
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+
+        futures = [self._pool.submit(run_shared_chunk, calc,
+                                     inputs.descriptor, outputs.descriptor,
+                                     start, min(start + self.chunk_size,
+                                                inputs.length))
+                   for start in range(0, inputs.length, self.chunk_size)]
+        errors = {}
+        for future in futures:
+            errors.update(future.result())
+        return errors
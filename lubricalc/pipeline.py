@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+
+# File name: pipeline.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides Pipeline Class.
+
+A pipeline composes stages over a stream of records (dicts, like the
+records of lubricalc batch) and runs lazily: records are read chunk by
+chunk, every chunk goes through all the stages before the next one is
+read, and nothing runs until the pipeline is iterated.
+
+    with open('samples.csv') as file:
+        pipeline = (Pipeline(csv.DictReader(file))
+                    .validate('kv40', 'kv100', limit=2)
+                    .calculate('viscosity_index', output='vi',
+                               viscosity40='kv40', viscosity100='kv100')
+                    .calculate('viscosity_at_any_temp', output='kv',
+                               viscosity40='kv40', viscosity100='kv100',
+                               temperature=60)
+                    .map(flag_out_of_grade))
+        for record in pipeline:
+            ...
+    print(pipeline.report())
+
+Adjacent validate() and calculate() stages are fused: the chunk is turned
+into columns once, the stages run on lubricalc.columnar one after the
+other, and their outputs are written back to the records once. Records
+that fail a stage are dropped, and passed with their exception to the
+errors callback if one is given.
+"""
+
+from collections import namedtuple
+import inspect
+from itertools import islice
+import time
+
+from . import columnar
+from .exception import ConceptError
+from .validator import Validator
+
+StageStats = namedtuple('StageStats', ['name', 'rows', 'failed', 'seconds'])
+
+
+class _Stats:
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.failed = 0
+        self.seconds = 0.0
+
+
+class _Validate:
+    """Stage converting fields to floats like the calculators do."""
+
+    vectorized = True
+
+    def __init__(self, fields, limit, strict):
+        self.fields = fields
+        self.limit = limit
+        self.strict = strict
+        self.name = 'validate({0})'.format(', '.join(fields))
+
+    def run(self, columns, length):
+        failures = {}
+        outputs = {}
+        for field in self.fields:
+            column = []
+            for index, value in enumerate(columns[field]):
+                try:
+                    value = Validator.validate_float(field, value)
+                    Validator.validate_lower_limit(field, value, self.limit,
+                                                   self.strict)
+                except (ValueError, ConceptError) as error:
+                    failures.setdefault(index, error)
+                column.append(value)
+            outputs[field] = column
+        return outputs, failures
+
+
+class _Calculate:
+    """Stage running a columnar calculation."""
+
+    vectorized = True
+
+    def __init__(self, calc, output, rounded, fields):
+        try:
+            function = columnar.FUNCTIONS[calc]
+        except KeyError:
+            raise ValueError('Calculation not defined: {0}'.format(calc))
+        parameters = inspect.signature(function).parameters
+        arguments = dict((name, name) for name, parameter
+                         in parameters.items()
+                         if parameter.default is parameter.empty and
+                         parameter.kind != parameter.VAR_KEYWORD)
+        arguments.update(fields)
+        self.calc = calc
+        self.rounded = rounded
+        # Argument names to record fields; other values are constants
+        self.arguments = arguments
+        self.fields = [field for field in arguments.values()
+                       if isinstance(field, str)]
+        self.output = output or calc
+        self.name = calc
+
+    def run(self, columns, length):
+        results = columnar.calculate(
+            self.calc, {name: columns[field] if isinstance(field, str)
+                        else [field] * length
+                        for name, field in self.arguments.items()},
+            rounded=self.rounded)
+        failures = {index: result for index, result in enumerate(results)
+                    if isinstance(result, Exception)}
+        return {self.output: results}, failures
+
+
+class _Map:
+    """Stage applying a function to every record."""
+
+    vectorized = False
+
+    def __init__(self, function, name):
+        self.function = function
+        self.name = name or 'map({0})'.format(function.__name__)
+
+    def run(self, records):
+        return [self.function(record) for record in records]
+
+
+class _Filter:
+    """Stage keeping the records a predicate is true for."""
+
+    vectorized = False
+
+    def __init__(self, predicate, name):
+        self.predicate = predicate
+        self.name = name or 'filter({0})'.format(predicate.__name__)
+
+    def run(self, records):
+        return [record for record in records if self.predicate(record)]
+
+
+class Pipeline:
+    """Class to compose lazy, chunked stages over a stream of records.
+
+    Every stage method returns a new pipeline, so a pipeline can be the
+    common head of several others. Records are updated in place.
+    """
+
+    def __init__(self, source, chunk_size=1000, errors=None, stages=()):
+        self.source = source
+        self.chunk_size = int(chunk_size)
+        self.errors = errors
+        self.stages = tuple(stages)
+        self._stats = []
+
+    def _then(self, stage):
+        return Pipeline(self.source, self.chunk_size, self.errors,
+                        self.stages + (stage,))
+
+    def validate(self, *fields, limit=0, strict=False):
+        """Convert fields to floats; drop records with invalid numbers.
+
+        Numbers are checked like the calculators check their inputs, with
+        limit as the lower limit.
+        """
+        return self._then(_Validate(list(fields), limit, strict))
+
+    def calculate(self, calc, output=None, rounded=True, **fields):
+        """Add a column calc into the output field (calc by default).
+
+        fields maps argument names to record fields; arguments not given
+        are read from the field of the same name, and values that are not
+        strings are constants for every record.
+        """
+        return self._then(_Calculate(calc, output, rounded, fields))
+
+    def map(self, function, name=None):
+        """Replace every record by function(record)."""
+        return self._then(_Map(function, name))
+
+    def filter(self, predicate, name=None):
+        """Keep the records predicate(record) is true for."""
+        return self._then(_Filter(predicate, name))
+
+    def _groups(self):
+        """Yield lists of stages: adjacent vectorized stages go together."""
+        group = []
+        for stage in self.stages:
+            if stage.vectorized:
+                group.append(stage)
+                continue
+            if group:
+                yield group
+                group = []
+            yield [stage]
+        if group:
+            yield group
+
+    def _fail(self, record, error, stats=None):
+        if stats is not None:
+            stats.failed += 1
+        if self.errors is not None:
+            self.errors(record, error)
+
+    def _run_fused(self, stages, records):
+        columns = {}
+        written = []
+        for stage, stats in stages:
+            start = time.perf_counter()
+            stats.rows += len(records)
+            for field in stage.fields:
+                if field not in columns:
+                    columns[field] = [record.get(field) for record in records]
+            outputs, failures = stage.run(columns, len(records))
+            columns.update(outputs)
+            written.extend(field for field in outputs if field not in written)
+            if failures:
+                for index, error in sorted(failures.items()):
+                    self._fail(records[index], error, stats)
+                keep = [index for index in range(len(records))
+                        if index not in failures]
+                records = [records[index] for index in keep]
+                columns = {field: [column[index] for index in keep]
+                           for field, column in columns.items()}
+            stats.seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for field in written:
+            for record, value in zip(records, columns[field]):
+                record[field] = value
+        stats.seconds += time.perf_counter() - start
+        return records
+
+    def chunks(self):
+        """Yield the records, a list per chunk, after every stage.
+
+        Source items that are exceptions, like the bad lines
+        lubricalc.batch.read_jsonl() yields, go to the errors callback.
+        """
+        self._stats = [_Stats(stage.name) for stage in self.stages]
+        stats = iter(self._stats)
+        groups = [[(stage, next(stats)) for stage in group]
+                  for group in self._groups()]
+
+        source = iter(self.source)
+        while True:
+            chunk = list(islice(source, self.chunk_size))
+            if not chunk:
+                return
+            records = []
+            for record in chunk:
+                if isinstance(record, Exception):
+                    self._fail(None, record)
+                else:
+                    records.append(record)
+            for group in groups:
+                if not records:
+                    break
+                if len(group) > 1 or group[0][0].vectorized:
+                    records = self._run_fused(group, records)
+                    continue
+                stage, stats = group[0]
+                start = time.perf_counter()
+                stats.rows += len(records)
+                records = stage.run(records)
+                stats.seconds += time.perf_counter() - start
+            if records:
+                yield records
+
+    def stats(self):
+        """Return the StageStats of every stage of the last run."""
+        return [StageStats(stats.name, stats.rows, stats.failed,
+                           stats.seconds) for stats in self._stats]
+
+    def report(self):
+        """Return the stats of the last run as a table."""
+        lines = ['{0:32} {1:>9} {2:>7} {3:>9} {4:>11}'.format(
+            'stage', 'rows', 'failed', 'ms', 'rows/s')]
+        for stats in self.stats():
+            rate = stats.rows / stats.seconds if stats.seconds else 0
+            lines.append('{0:32} {1:9} {2:7} {3:9.1f} {4:11.0f}'.format(
+                stats.name[:32], stats.rows, stats.failed,
+                stats.seconds * 1000, rate))
+        return '\n'.join(lines)
+
+    def __iter__(self):
+        for records in self.chunks():
+            yield from records
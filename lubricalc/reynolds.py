@@ -20,12 +20,20 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
 # MA 02110-1301, USA.
 
+from collections import namedtuple
+
 from lubricalc.validator import validate
+from lubricalc.viscosity import Viscosity
+
+Transitions = namedtuple('Transitions', ['mixed', 'turbulent'])
 
 
 class Reynolds:
     """Class for calculations on Reynolds Number (Re)."""
 
+    laminar_limit = 2000.0
+    turbulent_limit = 4000.0
+
     def __init__(self):
         self._velocity = None
         self._viscosity = None
@@ -65,13 +73,50 @@ class Reynolds:
         Re > 4000 => Turbulent flow
         """
         reynolds = self.reynolds_number(velocity, length, viscosity)
-        if reynolds <= 2000.0:
+        if reynolds <= self.laminar_limit:
             return 'laminar'
-        if reynolds >= 4000.0:
+        if reynolds >= self.turbulent_limit:
             return 'turbulent'
-        if 2000.0 < reynolds < 4000.0:
+        if self.laminar_limit < reynolds < self.turbulent_limit:
             return 'mixed'
 
+    def transition_temperatures(self, viscosity40, viscosity100,
+                                velocity, length):
+        """Calculate the temperatures where the flow type changes.
+
+        The oil viscosity drops along its ASTM D341 line as the oil warms
+        up, so Re grows with temperature. The flow type changes at the
+        temperatures where the oil viscosity reaches:
+
+                 V * Lc
+        v = ------------- * 10^6       [cSt]
+                  Re
+
+        with Re = 2000 (laminar to mixed) and Re = 4000 (mixed to turbulent)
+        where:
+        V: velocity (m/s)
+        Lc: characteristic length (m)
+        KV40, KV100: Kinematic viscosities of the oil (cSt)
+
+        The D341 line is solved in closed form for each limit, so no
+        temperature sweep is needed. A limit is None when the oil never
+        gets thin enough to reach it.
+        """
+        # Validate input data
+        self.velocity = velocity
+        self.length = length
+
+        temperatures = []
+        for limit in (self.laminar_limit, self.turbulent_limit):
+            target = self._velocity * self._length / limit * 10 ** 6
+            if target <= 0.3:
+                temperatures.append(None)
+                continue
+            temperatures.append(Viscosity().temperature_at_viscosity(
+                viscosity40, viscosity100, target))
+
+        return Transitions(*temperatures)
+
     @property
     def velocity(self):
         return self._viscosity
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+# File name: service.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides CalculationService Class."""
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import sys
+
+from . import columnar
+from .batch import to_json
+from .exception import ConceptError
+
+# Inverse solves are run in the executor, everything else in the loop
+HEAVY = frozenset(('viscosity_at_40', 'viscosity_at_100'))
+
+MIXTURES = frozenset(('oil_mix_viscosity', 'mix_proportions'))
+
+
+class CalculationService:
+    """Class to serve the calculators as line-delimited JSON.
+
+    Every request line is a record like the ones of 'lubricalc batch'
+    ({"calc": ..., arguments..., optional "id"}) and gets one response
+    line, {"id": ..., "result": ...} or {"id": ..., "error": ...,
+    "message": ...}, in request order per connection.
+
+    Requests for the same calculation and arguments arriving within
+    batch_delay seconds are answered by a single lubricalc.columnar call
+    of up to max_batch rows.
+    """
+
+    def __init__(self, executor=None, batch_delay=0.001, max_batch=512,
+                 queue_size=4096):
+        self.executor = executor
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self.queue_size = queue_size
+        self.requests = 0
+        self.batches = 0
+        self._pending = {}
+
+    async def calculate(self, record):
+        """Return the response to one request record."""
+        self.requests += 1
+        calc = record.get('calc') if isinstance(record, dict) else None
+        try:
+            if isinstance(record, Exception):
+                raise record
+            if not isinstance(record, dict):
+                raise ValueError('Invalid request: expected a JSON object')
+            if not isinstance(calc, str):
+                raise ValueError('Calculation must be a name, not: '
+                                 '{0}'.format(json.dumps(calc)))
+            if calc not in columnar.FUNCTIONS:
+                raise ValueError('Calculation not defined: {0}'.format(calc))
+            args = {key: value for key, value in record.items()
+                    if key not in ('calc', 'id')}
+            temperature = args.get('temperature')
+            if calc in MIXTURES and isinstance(temperature, (int, float)):
+                # Mixture temperatures are keys: 40, 40.0 and '40' are equal
+                args['temperature'] = '{0:g}'.format(temperature)
+            result = await self._submit(calc, args)
+        except (ValueError, ConceptError) as error:
+            result = error
+        return self._response(record, calc, result)
+
+    @staticmethod
+    def _response(record, calc, result):
+        response = {}
+        if isinstance(record, dict) and 'id' in record:
+            response['id'] = record['id']
+        if isinstance(result, Exception):
+            if isinstance(result, (KeyError, IndexError)):
+                result = ConceptError(
+                    '{0}: not defined for {1}'.format(calc, result))
+            response['error'] = type(result).__name__
+            response['message'] = str(result)
+        else:
+            response['result'] = to_json(result)
+        return response
+
+    def _submit(self, calc, args):
+        loop = asyncio.get_running_loop()
+        key = (calc, tuple(sorted(args)))
+        future = loop.create_future()
+        if key not in self._pending:
+            self._pending[key] = (
+                [], loop.call_later(self.batch_delay, self._flush, key))
+        batch = self._pending[key][0]
+        batch.append((args, future))
+        if len(batch) >= self.max_batch:
+            self._flush(key)
+        return future
+
+    def _flush(self, key):
+        batch, timer = self._pending.pop(key)
+        timer.cancel()
+        asyncio.ensure_future(self._run(key[0], key[1], batch))
+
+    async def _run(self, calc, names, batch):
+        self.batches += 1
+        columns = {name: [args[name] for args, _ in batch] for name in names}
+        try:
+            if calc in HEAVY:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, columnar.calculate, calc, columns)
+            else:
+                results = columnar.calculate(calc, columns)
+        except TypeError as error:
+            # Missing or unexpected arguments
+            results = [ValueError('{0}: {1}'.format(calc, error))] * len(batch)
+        except Exception as error:
+            results = [error] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def handle(self, reader, writer):
+        """Answer the requests of one connection."""
+        queue = asyncio.Queue(self.queue_size)
+        sender = asyncio.ensure_future(self._send(queue, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as error:
+                    record = ValueError('Invalid JSON request: {0}'.format(
+                        error))
+                await queue.put(asyncio.ensure_future(self.calculate(record)))
+        finally:
+            await queue.put(None)
+            await sender
+            writer.close()
+
+    @staticmethod
+    async def _send(queue, writer):
+        while True:
+            task = await queue.get()
+            if task is None:
+                break
+            writer.write(json.dumps(await task).encode() + b'\n')
+            if queue.empty():
+                await writer.drain()
+
+    async def start(self, host='127.0.0.1', port=8765, path=None):
+        """Start listening on a TCP port, or on a Unix socket path."""
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path=path)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def _serve(service, args):
+    server = await service.start(args.host, args.port, args.unix)
+    address = server.sockets[0].getsockname()
+    if not isinstance(address, str):
+        address = '{0}:{1}'.format(*address[:2])
+    print('Serving on {0}'.format(address), file=sys.stderr, flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='lubricalc serve',
+        description='Serve Lubricalc calculations as line-delimited JSON.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='TCP port, 0 for any free port (default: 8765)')
+    parser.add_argument('--unix', metavar='PATH',
+                        help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes for inverse solves (default: one '
+                             'per CPU)')
+    parser.add_argument('--batch-delay', type=float, default=1.0,
+                        help='milliseconds to wait for requests to batch '
+                             '(default: 1)')
+    parser.add_argument('--max-batch', type=int, default=512)
+    args = parser.parse_args(argv)
+
+    # Forked workers would inherit, and keep open, the client sockets
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(args.workers, context) as executor:
+        service = CalculationService(executor, args.batch_delay / 1000,
+                                     args.max_batch)
+        try:
+            asyncio.run(_serve(service, args))
+        except KeyboardInterrupt:
+            pass
+    return 0
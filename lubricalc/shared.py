@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+# File name: shared.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides SharedColumns Class."""
+
+from multiprocessing import shared_memory
+
+ITEM_SIZE = 8
+
+
+class SharedColumns:
+    """Class to keep float64 columns in one shared memory block.
+
+    Columns are laid out one after the other, so a worker process only
+    needs the descriptor (block name, column names and length) to attach
+    to them and read or write any row range in place, without copying or
+    pickling the data.
+    """
+
+    def __init__(self, shm, names, length, owner):
+        self._shm = shm
+        self.names = list(names)
+        self.length = length
+        self._owner = owner
+        self._views = []
+
+    @classmethod
+    def create(cls, names, length):
+        """Return new columns; a fresh block is always zero-filled."""
+        size = max(len(names) * length * ITEM_SIZE, 1)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        return cls(shm, names, length, owner=True)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Return shared columns holding a copy of a mapping of columns."""
+        names = list(columns)
+        length = len(columns[names[0]]) if names else 0
+        shared = cls.create(names, length)
+        for name in names:
+            view = shared[name]
+            for index, value in enumerate(columns[name]):
+                view[index] = value
+        return shared
+
+    @classmethod
+    def attach(cls, descriptor):
+        """Attach to the columns described by descriptor."""
+        name, names, length = descriptor
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the block again, which
+            # is harmless for workers sharing the creator's resource tracker
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, names, length, owner=False)
+
+    @property
+    def descriptor(self):
+        return self._shm.name, self.names, self.length
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+    def column(self, name, start=0, stop=None):
+        """Return rows start:stop of a column as a float64 memoryview.
+
+        The view maps the shared block directly; it is released on close.
+        """
+        stop = self.length if stop is None else min(stop, self.length)
+        offset = self.names.index(name) * self.length
+        view = self._shm.buf[(offset + start) * ITEM_SIZE:
+                             (offset + stop) * ITEM_SIZE].cast('d')
+        self._views.append(view)
+        return view
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the views and the block; the owner also unlinks it."""
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+
+# File name: trendfile.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides TrendFile Class.
+
+A compact columnar binary file of one asset's sample history:
+
+    write('pump.trend', timestamps, {'viscosity40': [...], ...})
+    with TrendFile('pump.trend') as trend:
+        trend.column('viscosity40')    # memoryview over the mapped file
+
+Layout, little-endian:
+
+    header    magic b'LUBT', version, column count, row count, first
+              timestamp, timestamp resolution (seconds) and block size
+    index     per column: name, type code and file offset
+    columns   rows fixed-width values of each column, 8-byte aligned
+
+Timestamps are stored as a 'timestamp' column of unsigned 32-bit deltas,
+in resolution units, from the previous sample (the first is 0), plus a
+'blocks' column with the absolute ticks of every block size-th row, so a
+time range is found by bisecting the blocks and decoding the deltas of
+two blocks at most. Value columns are float64 ('d') or float32 ('f'),
+with NaN for missing values, or integers ('i', 'q'). Opening a file maps
+it and reads the header, and columns are memoryviews of the map, so the
+cost does not depend on the file size.
+"""
+
+from array import array
+from itertools import accumulate
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b'LUBT'
+VERSION = 1
+
+# magic, version, column count, row count, first timestamp, resolution,
+# block size
+HEADER = struct.Struct('<4sHHQddI4x')
+
+# name, type code, padding, offset
+COLUMN = struct.Struct('<16sc7xQ')
+
+TIMESTAMP = 'timestamp'
+
+BLOCKS = 'blocks'
+
+# Rows per entry of the blocks column
+BLOCK_SIZE = 1024
+
+# How far, as a fraction of the resolution, a timestamp may be from its
+# tick; sub-resolution timestamps are an error rather than being rounded
+TOLERANCE = 0.01
+
+TYPES = ('d', 'f', 'i', 'q')
+
+_LITTLE = sys.byteorder == 'little'
+
+
+def _aligned(offset):
+    return offset + -offset % 8
+
+
+def _bytes(values):
+    if not _LITTLE:
+        values.byteswap()
+    return values.tobytes()
+
+
+def write(path, timestamps, columns, types=None, resolution=1.0,
+          block_size=BLOCK_SIZE):
+    """Write a trend file of timestamps and columns of values.
+
+    columns maps column names to sequences as long as timestamps, and
+    types maps column names to type codes (default 'd'). Missing values
+    (None) are stored as NaN in float columns and are an error in integer
+    ones. Timestamps must be sorted, and are stored as whole multiples of
+    resolution seconds from the first one, so every timestamp must be
+    that far from the first within TOLERANCE of the resolution.
+    """
+    if not 0 < resolution < float('inf'):
+        raise ValueError('Resolution must be greater than 0 seconds, '
+                         'not: {0}'.format(resolution))
+    if not (isinstance(block_size, int) and 1 <= block_size < 2 ** 32):
+        raise ValueError('Block size must be a whole number of rows from 1 '
+                         'to {0}, not: {1}'.format(2 ** 32 - 1, block_size))
+    types = types or {}
+    timestamps = list(timestamps)
+    first = timestamps[0] if timestamps else 0.0
+    ticks = []
+    for timestamp in timestamps:
+        tick = (timestamp - first) / resolution
+        ticks.append(round(tick))
+        if abs(ticks[-1] - tick) > TOLERANCE:
+            raise ValueError('Timestamp {0} is not a multiple of {1} '
+                             'seconds from the first one, {2}'.format(
+                                 timestamp, resolution, first))
+    deltas = [later - earlier
+              for earlier, later in zip([0] + ticks, ticks)]
+    if deltas and not 0 <= min(deltas) <= max(deltas) < 2 ** 32:
+        raise ValueError('Timestamps must be sorted and less than {0} '
+                         'seconds apart'.format(2 ** 32 * resolution))
+
+    data = [(TIMESTAMP, 'I', array('I', deltas)),
+            (BLOCKS, 'Q', array('Q', ticks[::block_size]))]
+    for name, values in columns.items():
+        code = types.get(name, 'd')
+        if code not in TYPES:
+            raise ValueError('{0}: Column type must be one of {1}, '
+                             'not: {2}'.format(name, ', '.join(TYPES), code))
+        if name in (TIMESTAMP, BLOCKS) or len(name.encode()) > 16:
+            raise ValueError('Column name not valid: {0}'.format(name))
+        values = list(values)
+        if len(values) != len(timestamps):
+            raise ValueError('{0}: Column must have {1} values, '
+                             'not: {2}'.format(name, len(timestamps),
+                                               len(values)))
+        if code in 'df':
+            values = [float('nan') if value is None else value
+                      for value in values]
+        elif None in values:
+            raise ValueError('{0}: Integer columns can not have missing '
+                             'values, row: {1}'.format(name,
+                                                       values.index(None)))
+        data.append((name, code, array(code, values)))
+
+    offset = _aligned(HEADER.size + COLUMN.size * len(data))
+    index, chunks = [], []
+    for name, code, values in data:
+        index.append(COLUMN.pack(name.encode(), code.encode(), offset))
+        chunk = _bytes(values)
+        chunks.append(chunk + bytes(-len(chunk) % 8))
+        offset += len(chunks[-1])
+
+    temporary = '{0}.tmp{1}'.format(path, os.getpid())
+    with open(temporary, 'wb') as file:
+        header = HEADER.pack(MAGIC, VERSION, len(data), len(timestamps),
+                             first, resolution, block_size) + b''.join(
+                                 index)
+        file.write(header + bytes(_aligned(len(header)) - len(header)))
+        file.writelines(chunks)
+    os.replace(temporary, path)
+
+
+def export(store, asset, path, fields=('viscosity40', 'viscosity100',
+                                       'v_index'),
+           start=None, end=None, types=None, resolution=1.0):
+    """Write the samples of asset in a HistoryStore to a trend file.
+
+    The sample timestamps must fit resolution, like in write().
+    """
+    samples = store.samples(asset, start, end)
+    write(path, [sample.timestamp for sample in samples],
+          {field: [getattr(sample, field) for sample in samples]
+           for field in fields}, types, resolution)
+    return len(samples)
+
+
+class TrendFile:
+    """Class to read a trend file through a memory map."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except Exception:
+            self._map.close()
+            raise
+
+    def _read_header(self):
+        if len(self._map) < HEADER.size:
+            raise ValueError('Not a trend file: {0}'.format(self.path))
+        (magic, version, count, self.rows, self.first, self.resolution,
+         self.block_size) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError('Not a trend file: {0}'.format(self.path))
+        if version != VERSION:
+            raise ValueError('Trend file version not supported: '
+                             '{0}'.format(version))
+        self._index = {}
+        for number in range(count):
+            name, code, offset = COLUMN.unpack_from(
+                self._map, HEADER.size + number * COLUMN.size)
+            name = name.rstrip(b'\0').decode()
+            code = code.decode()
+            rows = self.rows
+            if name == BLOCKS:
+                rows = -(-rows // self.block_size)
+            size = rows * array(code).itemsize
+            if offset + size > len(self._map):
+                raise ValueError('Trend file truncated: {0}'.format(
+                    self.path))
+            self._index[name] = (code, offset, size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.rows
+
+    def close(self):
+        """Unmap the file. Views returned by column() must be released."""
+        if not self._map.closed:
+            self._map.close()
+
+    @property
+    def columns(self):
+        """Return the names of the value columns."""
+        return [name for name in self._index
+                if name not in (TIMESTAMP, BLOCKS)]
+
+    def column(self, name, start=0, stop=None):
+        """Return rows [start, stop) of a column as a memoryview.
+
+        The view reads the mapped file, without copying, on little-endian
+        machines.
+        """
+        try:
+            code, offset, size = self._index[name]
+        except KeyError:
+            raise KeyError('Column not defined: {0}'.format(name)) from None
+        view = memoryview(self._map)[offset:offset + size]
+        if not _LITTLE:
+            values = array(code, view)
+            values.byteswap()
+            view.release()
+            return memoryview(values)[start:stop]
+        return view.cast(code)[start:stop]
+
+    def timestamps(self, start=0, stop=None):
+        """Return the timestamps of rows [start, stop).
+
+        Deltas are decoded from the block of start on, so the cost is the
+        rows asked for plus less than a block.
+        """
+        stop = self.rows if stop is None else min(stop, self.rows)
+        if start >= stop:
+            return []
+        block = start // self.block_size
+        with self.column(BLOCKS, block, block + 1) as blocks, \
+                self.column(TIMESTAMP, block * self.block_size + 1,
+                            stop) as deltas:
+            ticks = list(accumulate(deltas, initial=blocks[0]))
+        first, resolution = self.first, self.resolution
+        return [first + tick * resolution
+                for tick in ticks[start - block * self.block_size:]]
+
+    def _row(self, value):
+        """Return the first row with a timestamp at or after value."""
+        first, resolution = self.first, self.resolution
+        with self.column(BLOCKS) as blocks:
+            # The first block starting at or after value
+            low, high = 0, len(blocks)
+            while low < high:
+                middle = (low + high) // 2
+                if first + blocks[middle] * resolution < value:
+                    low = middle + 1
+                else:
+                    high = middle
+        if low == 0:
+            return 0
+        # The row is in the block before it, or starts this one
+        start = (low - 1) * self.block_size
+        timestamps = self.timestamps(start, start + self.block_size)
+        for row, timestamp in enumerate(timestamps, start):
+            if timestamp >= value:
+                return row
+        return start + len(timestamps)
+
+    def range(self, start=None, end=None):
+        """Return the rows [first, stop) with timestamps in [start, end).
+
+        Only the blocks column and the deltas of two blocks are read.
+        """
+        first = 0 if start is None else self._row(start)
+        stop = self.rows if end is None else self._row(end)
+        return first, max(first, stop)
@@ -43,6 +43,10 @@ class Validator:
             raise ValueError('{0}: Input value must be a valid number, '
                              'not: infinite'.format(name))
 
+        if value != value:
+            raise ValueError('{0}: Input value must be a valid number, '
+                             'not: nan'.format(name))
+
         return value
 
     @staticmethod
@@ -21,21 +21,68 @@
 
 """This module provides Viscosity Class."""
 
+import functools
 import math
 
 from .exception import InvertedViscosityError
 from .exception import ConceptError
 from .validator import validate
 
+TO_KELVIN = 273.15
+
+
+@functools.lru_cache(maxsize=1024)
+def d341_constants(viscosity40, viscosity100):
+    """Return the (A, B) constants of the ASTM D341 line of an oil.
+
+    log10(log10(v + 0.7)) = A - B * log10(T)
+    where:
+    v: Kinematic viscosity (cSt)
+    T: Temperature (K)
+
+    The constants only depend on the oil, so they are cached per
+    (KV40, KV100) pair.
+    """
+    x = math.log10(math.log10(viscosity40 + 0.7))
+    y = math.log10(math.log10(viscosity100 + 0.7))
+    t0 = math.log10(40 + TO_KELVIN)
+    t1 = math.log10(100 + TO_KELVIN)
+    b = (x - y) / (t1 - t0)
+    a = x + b * t0
+    return a, b
+
 
 class Viscosity:
     """Class for calculations on Viscosity."""
 
+    # ASTM D2270 interpolation coefficients (a, b, c, d, e, f) of L and H
+    # for each KV100 interval
+    coefficients = {
+        (2, 3.8): (1.14673, 1.7576, -0.109, 0.84155, 1.5521, -0.077),
+        (3.8, 4.4): (3.38095, -15.4952, 33.196, 0.78571, 1.7929, -0.183),
+        (4.4, 5): (2.5, -7.2143, 13.812, 0.82143, 1.5679, 0.119),
+        (5, 6.4): (0.101, 16.635, -45.469, 0.04985, 9.1613, -18.557),
+        (6.4, 7): (3.35714, -23.5643, 78.466, 0.22619, 7.7369, -16.656),
+        (7, 7.7): (0.01191, 21.475, -72.870, 0.79762, -0.7321, 14.61),
+        (7.7, 9): (0.41858, 16.1558, -56.040, 0.05794, 10.5156, -28.240),
+        (9, 12): (0.88779, 7.5527, -16.600, 0.26665, 6.7015, -10.810),
+        (12, 15): (0.7672, 10.7972, -38.180, 0.20073, 8.4658, -22.490),
+        (15, 18): (0.97305, 5.3135, -2.200, 0.28889, 5.9741, -4.930),
+        (18, 22): (0.97256, 5.25, -0.980, 0.24504, 7.416, -16.730),
+        (22, 28): (0.91413, 7.4759, -21.820, 0.20323, 9.1267, -34.230),
+        (28, 40): (0.87031, 9.7157, -50.770, 0.18411, 10.1015, -46.750),
+        (40, 55): (0.84703, 12.6752, -133.310, 0.17029, 11.4866, -80.620),
+        (55, 70): (0.85921, 11.1009, -83.19, 0.1713, 11.368, -76.940),
+        (70, float('inf')): (0.83531, 14.6731, -216.246, 0.16841, 11.8493,
+                             -96.947)
+    }
+
     def __init__(self):
         self._viscosity40 = None
         self._viscosity100 = None
         self._temperature = None
         self._v_index = None
+        self._viscosity = None
 
     def viscosity_index(self, viscosity40, viscosity100):
         """Calculate the Viscosity Index (VI) by ASTM-D2270.
@@ -120,18 +167,38 @@ class Viscosity:
         self._validate_viscosity_relation()
         self.temperature = temperature
 
-        to_kelvin = 273.15
-
-        x = math.log10(math.log10(self._viscosity40 + 0.7))
-        y = math.log10(math.log10(self._viscosity100 + 0.7))
-        t0 = math.log10(40 + to_kelvin)
-        t1 = math.log10(100 + to_kelvin)
-        target_t = math.log10(self._temperature + to_kelvin)
-        b = (x - y) / (t1 - t0)
-        a = x + b * t0
+        a, b = d341_constants(self._viscosity40, self._viscosity100)
+        target_t = math.log10(self._temperature + TO_KELVIN)
         v = 10 ** (10 ** (a - b * target_t)) - 0.7
         return round(v, 2)
 
+    def temperature_at_viscosity(self, viscosity40, viscosity100, viscosity):
+        """Calculate the temperature where the oil reaches a given viscosity.
+
+        It solves the ASTM D341 line for the temperature:
+
+                    A - log10(log10(v + 0.7))
+        log10(T) = ---------------------------
+                                B
+        where:
+        T: Temperature (K)
+        v: Kinematic viscosity to reach (cSt)
+        A, B: Constants of the D341 line through KV40 and KV100
+        """
+        # Validate Data
+        self.viscosity40 = viscosity40
+        self.viscosity100 = viscosity100
+        self._validate_viscosity_relation()
+        validate(self, 'Viscosity', viscosity, '_viscosity', limit=0.3,
+                 strict=True)
+
+        a, b = d341_constants(self._viscosity40, self._viscosity100)
+        if b == 0:
+            raise ConceptError('Viscosity: not defined for an oil whose '
+                               'viscosity does not change with temperature')
+        target_t = (a - math.log10(math.log10(self._viscosity + 0.7))) / b
+        return round(10 ** target_t - TO_KELVIN, 1)
+
     def _viscosity_index(self, viscosity40, viscosity100):
         """Calculate the Viscosity Index (VI) by ASTM-D2270."""
         # Validate Data
@@ -139,29 +206,9 @@ class Viscosity:
         self.viscosity100 = viscosity100
         self._validate_viscosity_relation()
 
-        up = float('inf')
-        coefficients = {
-             (2, 3.8): (1.14673, 1.7576, -0.109, 0.84155, 1.5521, -0.077),
-             (3.8, 4.4): (3.38095, -15.4952, 33.196, 0.78571, 1.7929, -0.183),
-             (4.4, 5): (2.5, -7.2143, 13.812, 0.82143, 1.5679, 0.119),
-             (5, 6.4): (0.101, 16.635, -45.469, 0.04985, 9.1613, -18.557),
-             (6.4, 7): (3.35714, -23.5643, 78.466, 0.22619, 7.7369, -16.656),
-             (7, 7.7): (0.01191, 21.475, -72.870, 0.79762, -0.7321, 14.61),
-             (7.7, 9): (0.41858, 16.1558, -56.040, 0.05794, 10.5156, -28.240),
-             (9, 12): (0.88779, 7.5527, -16.600, 0.26665, 6.7015, -10.810),
-             (12, 15): (0.7672, 10.7972, -38.180, 0.20073, 8.4658, -22.490),
-             (15, 18): (0.97305, 5.3135, -2.200, 0.28889, 5.9741, -4.930),
-             (18, 22): (0.97256, 5.25, -0.980, 0.24504, 7.416, -16.730),
-             (22, 28): (0.91413, 7.4759, -21.820, 0.20323, 9.1267, -34.230),
-             (28, 40): (0.87031, 9.7157, -50.770, 0.18411, 10.1015, -46.750),
-             (40, 55): (0.84703, 12.6752, -133.310, 0.17029, 11.4866, -80.620),
-             (55, 70): (0.85921, 11.1009, -83.19, 0.1713, 11.368, -76.940),
-             (70, up): (0.83531, 14.6731, -216.246, 0.16841, 11.8493, -96.947)
-        }
-
         a, b, c, d, e, f = [0] * 6
 
-        for k, v in coefficients.items():
+        for k, v in self.coefficients.items():
             if k[0] <= self._viscosity100 < k[1]:
                 a, b, c, d, e, f = v
                 break
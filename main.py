@@ -21,13 +21,45 @@
 
 """This module provides Lubricalc main function."""
 
-from controller import MainController
+import atexit
+import importlib
+import os
+import sys
+import time
 
+# Headless commands and the modules providing their main(argv); neither
+# these nor the lubricalc package import PyQt5
+COMMANDS = {'batch': 'lubricalc.batch',
+            'serve': 'lubricalc.service'}
 
-def main():
-    ctrl = MainController()
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    metrics = os.environ.get('LUBRICALC_METRICS')
+    if metrics:
+        from lubricalc import instrument
+        instrument.enable()
+        atexit.register(instrument.export, metrics)
+    if argv[:1] and argv[0] in COMMANDS:
+        return importlib.import_module(COMMANDS[argv[0]]).main(argv[1:])
+    return gui()
+
+
+def gui():
+    """Launch the GUI, the only place PyQt5 and the views get imported."""
+    started = time.perf_counter()
+    try:
+        from controller import MainController
+    except ImportError as error:
+        if not (error.name or '').startswith('PyQt5'):
+            raise
+        print('lubricalc: the GUI needs PyQt5 ({0}); the headless commands '
+              'are: {1}'.format(error, ', '.join(sorted(COMMANDS))),
+              file=sys.stderr)
+        return 1
+    ctrl = MainController(started)
     ctrl.run()
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
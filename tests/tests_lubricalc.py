@@ -22,19 +22,73 @@
 
 """This module provides tests for lubricalc package."""
 
-import nose
+import asyncio
+import bisect
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
 
+import nose
+try:
+    from PyQt5 import QtCore
+    from PyQt5 import QtWidgets
+except ImportError:
+    QtWidgets = None
+
+from benchmarks.fuzz_solvers import CASES
+from benchmarks.fuzz_solvers import CountingViscosity
 import lubricalc.validator as v
 from lubricalc.exception import ConceptError
 from lubricalc.exception import InvertedViscosityError
 from lubricalc.exception import ViscosityIntervalError
+from lubricalc.batch import BatchRunner
+from lubricalc.batch import calculate
+from lubricalc.batch import read_jsonl
 from lubricalc.bearing import Bearing
+from lubricalc.cache import ResultCache
+from lubricalc import columnar
 from lubricalc.blend import OilBlend
+from lubricalc import instrument
+from lubricalc.formulation import Formulation
+from lubricalc.history import HistoryStore
+from lubricalc.icp import ICPReader
+from lubricalc.icp import metal_name
 from lubricalc.mixture import OilMixture
+from lubricalc.monitor import FlowRegimeMonitor
+from lubricalc.monitor import Reading
+from lubricalc.monitor import read_readings
+from lubricalc.optimizer import AdditiveOptimizer
+from lubricalc.optimizer import AdditivePackage
+from lubricalc.parallel import ParallelExecutor
+from lubricalc.parallel import SHARED_FIELDS
+from lubricalc.pipeline import Pipeline
 from lubricalc.reynolds import Reynolds
+from lubricalc.service import CalculationService
+from lubricalc.shared import SharedColumns
+from lubricalc import trendfile
+from lubricalc.trendfile import TrendFile
 from lubricalc.validator import Validator
 from lubricalc.viscosity import Viscosity
 
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+# Cold import budget of the headless entry points, in microseconds
+IMPORT_BUDGET = 300000
+
+
+@contextlib.contextmanager
+def temporary_path(name):
+    """Yield the path of a file name in a new temporary directory."""
+    with tempfile.TemporaryDirectory() as directory:
+        yield os.path.join(directory, name)
+
 
 class TestValidator:
     """Class to test Validator class."""
@@ -57,6 +111,10 @@ class TestValidator:
     def test_validate_float(self):
         assert self.validator.validate_float('Variable', 1.02) == 1.02
 
+    @nose.tools.raises(ValueError)
+    def test_validate_float_nan(self):
+        self.validator.validate_float('Variable', float('nan'))
+
     def test_validate_float_string_float_input(self):
         assert self.validator.validate_float('Variable', '1.02') == 1.02
 
@@ -127,6 +185,30 @@ class TestReynolds:
     def test_reynolds_inf_input(self):
         Reynolds().reynolds_number(float('inf'), 0.01, 3.0)
 
+    def test_transition_temperatures(self):
+        assert Reynolds().transition_temperatures(
+            46, 7, 2, 0.05) == (38.2, 55.0)
+
+    def test_transition_temperatures_string_input(self):
+        assert Reynolds().transition_temperatures(
+            '46', '7,0', ' 2', '0,05') == (38.2, 55.0)
+
+    def test_transition_temperatures_match_d341(self):
+        mixed, turbulent = Reynolds().transition_temperatures(
+            220, 19, 2.5, 0.1)
+        assert abs(Viscosity().viscosity_at_any_temp(
+            220, 19, mixed) - 125) < 0.5
+        assert abs(Viscosity().viscosity_at_any_temp(
+            220, 19, turbulent) - 62.5) < 0.5
+
+    def test_transition_temperatures_unreachable(self):
+        assert Reynolds().transition_temperatures(
+            46, 7, 2, 0.0003).turbulent is None
+
+    @nose.tools.raises(InvertedViscosityError)
+    def test_transition_temperatures_inverted_viscosity(self):
+        Reynolds().transition_temperatures(7, 46, 2, 0.05)
+
 
 class TestViscosity:
     """Class to test Viscosity class."""
@@ -188,6 +270,44 @@ class TestViscosity:
     def test_viscosity_lt_273_iso46(self):
         Viscosity().viscosity_at_any_temp('46', '7 ', '-275')
 
+    def test_temperature_at_viscosity_iso46(self):
+        assert Viscosity().temperature_at_viscosity(46, 7, 58.08) == 35.0
+
+    @nose.tools.raises(ConceptError)
+    def test_temperature_at_viscosity_unreachable(self):
+        Viscosity().temperature_at_viscosity(46, 7, 0.3)
+
+
+class TestSolverCases:
+    """Class to test the worst-case inputs of the inverse viscosity solvers.
+
+    benchmarks/fuzz_solvers.py finds them and adds them to the cases file;
+    its --check mode replays them against their time budgets.
+    """
+
+    @staticmethod
+    def cases(calc):
+        with open(CASES) as file:
+            return [case for case in json.load(file) if case['calc'] == calc]
+
+    def check(self, calc):
+        cases = self.cases(calc)
+        assert cases
+        for case in cases:
+            viscosity = CountingViscosity()
+            result = getattr(viscosity, calc)(**case['args'])
+            assert result == case['result'], case
+            assert viscosity.iterations <= case['iterations'], case
+            assert columnar.calculate(calc, {
+                name: [value] for name, value in case['args'].items()}) == \
+                [case['result']]
+
+    def test_viscosity_at_40(self):
+        self.check('viscosity_at_40')
+
+    def test_viscosity_at_100(self):
+        self.check('viscosity_at_100')
+
 
 class TestOilMixture:
     """Class to test OilMixture class."""
@@ -245,6 +365,177 @@ class TestOilBlend:
                                Magnesium=' 1,15',
                                zinc=1.66) == 0.83
 
+    def test_total_ash_batch(self):
+        assert OilBlend.total_ash_batch(
+            [[0.47, 1.15, 1.66], [0, 0, 0]], [8.5, 8.5],
+            metals=['Calcium', 'Magnesium', 'zinc']) == [0.83, 0.0]
+
+    def test_total_ash_batch_single_additive_percent(self):
+        contents = [[0.1 * n] * len(OilBlend.metals()) for n in range(5)]
+        ash = OilBlend.total_ash_batch(contents, 10)
+        for row, value in zip(contents, ash):
+            expected = OilBlend(10).total_ash(
+                **dict(zip(OilBlend.metals(), row)))
+            assert abs(value - expected) < 0.011
+
+    @nose.tools.raises(ConceptError)
+    def test_total_ash_batch_negative_content(self):
+        OilBlend.total_ash_batch([[0.47, -1.15]], [8.5],
+                                 metals=['calcium', 'magnesium'])
+
+    @nose.tools.raises(ConceptError)
+    def test_total_ash_batch_zero_additive_percent(self):
+        OilBlend.total_ash_batch([[0.47]], [0], metals=['calcium'])
+
+    @nose.tools.raises(ValueError)
+    def test_total_ash_batch_wrong_shape(self):
+        OilBlend.total_ash_batch([[0.47, 1.15]], [8.5], metals=['calcium'])
+
+    def test_total_ash_batch_validates_like_total_ash(self):
+        assert OilBlend.total_ash_batch(
+            [[' 0,47', '1.15', '']], ['8,5'],
+            metals=['calcium', 'magnesium', 'zinc']) == [0.62]
+        for contents, percents in (([[float('nan')]], [8.5]),
+                                   ([[float('inf')]], [8.5]),
+                                   ([[0.47]], [float('nan')])):
+            nose.tools.assert_raises(ValueError, OilBlend.total_ash_batch,
+                                     contents, percents, ['calcium'])
+
+    @nose.tools.raises(ValueError)
+    def test_total_ash_batch_empty_rows(self):
+        OilBlend.total_ash_batch([[], []], [8.5, 8.5], metals=[])
+
+
+class TestFormulation:
+    """Class to test Formulation class against OilBlend.total_ash()."""
+
+    def test_total_ash(self):
+        formulation = Formulation(8.5, Calcium=0.47, Magnesium=1.15,
+                                  zinc=1.66)
+        assert formulation.total_ash == OilBlend(8.5).total_ash(
+            Calcium=0.47, Magnesium=1.15, zinc=1.66)
+
+    def test_update_metal_content(self):
+        formulation = Formulation('8.5 ', calcium='.47', zinc=1.66)
+        formulation.set_metal_content('Magnesium', ' 1,15')
+        assert formulation.total_ash == 0.83
+        assert formulation.sulfated_ash('magnesium') == 0.484
+
+    def test_update_additive_percent(self):
+        formulation = Formulation(8.5, calcium=0.47, magnesium=1.15)
+        formulation.additive_percent = 12
+        assert abs(formulation.total_ash - OilBlend(12).total_ash(
+            calcium=0.47, magnesium=1.15)) < 0.011
+
+    def test_updates_match_recomputation(self):
+        formulation = Formulation(5)
+        contents = {}
+        for n in range(3000):
+            metal = list(OilBlend.metals())[n % 11]
+            contents[metal] = (n * 7 % 13) / 10
+            formulation.set_metal_content(metal, contents[metal])
+            if n % 500 == 0:
+                formulation.additive_percent = 1 + n % 17
+        expected = OilBlend(formulation.additive_percent).total_ash(
+            **contents)
+        assert abs(formulation.total_ash - expected) < 0.011
+        assert formulation.metal_contents() == contents
+
+    def test_change_notifications(self):
+        changes = []
+        formulation = Formulation(8.5)
+        formulation.connect(lambda f: changes.append(f.total_ash))
+        formulation.set_metal_content('zinc', 1.66)
+        formulation.additive_percent = 10
+        assert changes == [0.21, 0.25]
+
+    @nose.tools.raises(ConceptError)
+    def test_negative_metal_content(self):
+        Formulation(8.5).set_metal_content('zinc', -1)
+
+
+class TestAdditiveOptimizer:
+    """Class to test AdditiveOptimizer class."""
+
+    optimizer = AdditiveOptimizer(max_ash=0.8, max_additive_mass=12,
+                                  oil_density=0.88)
+    package = AdditivePackage('A', 0.96, {'Calcium': 2.0, 'zinc': 1.2,
+                                          'magnesium': 0.3})
+
+    def test_treat_ash_limit(self):
+        treatment = self.optimizer.treat(self.package)
+        assert treatment == ('A', 7.93, 0.8, 8.65, 0.182)
+        blend = OilBlend(treatment.additive_percent)
+        assert blend.total_ash(**self.package.metal_contents) <= 0.8
+        assert blend.additive_percent_mass(0.96, 0.88) == 8.65
+
+    def test_treat_mass_limit(self):
+        package = AdditivePackage('B', 1.0, {'calcium': 0.5})
+        assert self.optimizer.treat(package).additive_percent == 10.56
+
+    def test_treat_rates(self):
+        treatment = self.optimizer.treat(self.package, treat_rates=[5, 7.5])
+        assert treatment.additive_percent == 7.5
+        assert self.optimizer.treat(self.package, treat_rates=[9]) is None
+
+    def test_rank(self):
+        packages = [self.package,
+                    AdditivePackage('B', 1.0, {'calcium': 0.5}),
+                    AdditivePackage('C', 1.0, {'zinc': 3.0})]
+        ranking = self.optimizer.rank(packages)
+        assert [t.package for t in ranking] == ['A', 'B', 'C']
+        assert self.optimizer.rank(packages, top=1) == ranking[:1]
+
+    @nose.tools.raises(ConceptError)
+    def test_zero_max_ash(self):
+        AdditiveOptimizer(max_ash=0, max_additive_mass=12, oil_density=0.88)
+
+
+class TestICPReader:
+    """Class to test ICPReader class."""
+
+    data = ('Sample,Zn (ppm),Ca (ppm),Mg,Fe,additive_percent\n'
+            'S1,16600,4700,11500,3,\n'
+            'S2,<5,,0,1,10\n'
+            'S3,abc,1,1,1,\n')
+
+    def test_metal_name(self):
+        assert metal_name('Zn (ppm)') == 'zinc'
+        assert metal_name(' Molybdenum') == 'molybdenum'
+        assert metal_name('Fe') is None
+
+    def test_process(self):
+        output = io.StringIO()
+        reader = ICPReader(8.5, additive_density=0.959, oil_density=0.881)
+        assert reader.process(io.StringIO(self.data), output) == 3
+        rows = output.getvalue().splitlines()
+        assert rows[0].endswith(',sulfated_ash,additive_percent_mass,error')
+        assert rows[1] == 'S1,16600,4700,11500,3,,0.83,9.25,'
+        assert rows[2] == 'S2,<5,,0,1,10,0.0,10.89,'
+        assert rows[3].startswith('S3,abc,1,1,1,,,,')
+
+    def test_chunks(self):
+        chunks = list(ICPReader(8.5, chunk_size=2).chunks(
+            io.StringIO(self.data)))
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert chunks[0][0][-3:] == [0.83, '', '']
+
+    def test_empty_file(self):
+        with temporary_path('empty.csv') as path:
+            open(path, 'w').close()
+            with open(path) as infile:
+                with nose.tools.assert_raises(ValueError) as context:
+                    ICPReader(8.5).process(infile, io.StringIO())
+        assert 'empty.csv' in str(context.exception)
+
+    @nose.tools.raises(ValueError)
+    def test_zero_chunk_size(self):
+        ICPReader(8.5, chunk_size=0)
+
+    @nose.tools.raises(ConceptError)
+    def test_zero_additive_percent(self):
+        ICPReader(0)
+
 
 class TestBearing:
     """Class to test Bearing class."""
@@ -285,5 +576,1366 @@ class TestBearing:
         Bearing().velocity_factor(45, 60, 3000)
 
 
+class TestFlowRegimeMonitor:
+    """Class to test FlowRegimeMonitor class."""
+
+    @staticmethod
+    def monitor():
+        monitor = FlowRegimeMonitor(hysteresis=0.05)
+        monitor.add_circuit('c1', 46, 7, 0.02)
+        return monitor
+
+    def test_first_reading_event(self):
+        events = list(self.monitor().process([Reading('c1', 0, 60, 20)]))
+        assert events[0][:4] == ('c1', 0, None, 'laminar')
+
+    def test_regime_change_on_warm_up(self):
+        readings = [Reading('c1', t, 60, 20 + t) for t in range(40)]
+        events = list(self.monitor().process(readings))
+        assert [e.current for e in events] == ['laminar', 'mixed']
+        assert events[1].reynolds > 2000 * 1.05
+
+    def test_hysteresis_holds_regime(self):
+        # Re oscillates around 2000 inside the hysteresis band
+        viscosity = 60 * 4 * 10 ** 6 / (60000 * 3.14159265 * 0.02) / 2000
+        temperature = Viscosity().temperature_at_viscosity(46, 7, viscosity)
+        readings = [Reading('c1', t, 60 + (-1) ** t, temperature)
+                    for t in range(100)]
+        assert len(list(self.monitor().process(readings))) == 1
+
+    def test_diameter_per_circuit(self):
+        monitor = self.monitor()
+        monitor.add_circuit('c2', 46, 7, 0.04)
+        readings = [Reading('c1', 0, 60, 20), Reading('c2', 0, 60, 20)]
+        events = list(monitor.process(readings))
+        assert monitor.diameter('c1') == 0.02
+        assert monitor.diameter('c2') == 0.04
+        assert events[0].reynolds == round(2 * events[1].reynolds, 1)
+
+    @nose.tools.raises(ConceptError)
+    def test_zero_diameter(self):
+        self.monitor().add_circuit('c2', 46, 7, 0)
+
+    def test_read_readings(self):
+        lines = ['circuit,timestamp,flow_rate,temperature', 'c1,0,60,20.5']
+        assert list(read_readings(lines)) == [Reading('c1', 0.0, 60.0, 20.5)]
+
+    @nose.tools.raises(ConceptError)
+    def test_unknown_circuit(self):
+        list(self.monitor().process([Reading('c2', 0, 60, 20)]))
+
+    @nose.tools.raises(InvertedViscosityError)
+    def test_inverted_viscosity_circuit(self):
+        self.monitor().add_circuit('c2', 7, 46, 0.02)
+
+
+class TestBatch:
+    """Class to test the headless batch command."""
+
+    records = ['{"calc": "viscosity_index", "viscosity40": 138.9, '
+               '"viscosity100": 18.1}',
+               '{"calc": "mix_proportions", "viscosity0": 680, '
+               '"viscosity1": 220, "mix_viscosity": 460, "temperature": 40}',
+               '{"calc": "viscosity_index", "viscosity40": 15, '
+               '"viscosity100": 150}',
+               'not json',
+               '{"calc": "total_ash", "additive_percent": 8.5, '
+               '"calcium": 0.47, "magnesium": 1.15, "zinc": 1.66}']
+
+    malformed = ['[1, 2]', '{"calc": ["x"]}', '"text"',
+                 '{"calc": "oil_mix_viscosity", "viscosity0": 20, '
+                 '"viscosity1": 16, "oil0_percent": 45}',
+                 '{"calc": "total_ash", "calcium": 0.47}',
+                 '{"calc": "grease_amount", "outer_diameter": 25, '
+                 '"width": 60}']
+
+    def test_calculate(self):
+        assert calculate('grease_amount',
+                         {'outer_diameter': 25, 'width': '60'}) == 7.5
+
+    def test_calculate_mixture_numeric_temperature(self):
+        assert calculate('oil_mix_viscosity',
+                         {'viscosity0': 20, 'viscosity1': 16,
+                          'oil0_percent': 45, 'temperature': 100}) == 17.67
+
+    @nose.tools.raises(ValueError)
+    def test_calculate_unknown(self):
+        calculate('viscosity_at_0', {})
+
+    @nose.tools.raises(ConceptError)
+    def test_calculate_unknown_metal(self):
+        calculate('total_ash', {'additive_percent': 8.5, 'iron': 1})
+
+    def test_runner_jsonl(self):
+        output = io.StringIO()
+        errors = io.StringIO()
+        runner = BatchRunner(output, errors)
+        runner.run(read_jsonl(self.records))
+        results = [json.loads(line)['result']
+                   for line in output.getvalue().splitlines()]
+        failures = [json.loads(line)
+                    for line in errors.getvalue().splitlines()]
+        assert results == [145, {'oil1': 67.32, 'oil2': 32.68}, 0.83]
+        assert [(f['record'], f['error']) for f in failures] == [
+            (3, 'InvertedViscosityError'), (4, 'ValueError')]
+        assert runner.failed == 2
+
+    def test_runner_malformed_records(self):
+        output = io.StringIO()
+        errors = io.StringIO()
+        runner = BatchRunner(output, errors)
+        runner.run(read_jsonl(self.malformed))
+        failures = [json.loads(line)
+                    for line in errors.getvalue().splitlines()]
+        assert [(f['record'], f['error']) for f in failures] == [
+            (number, 'ValueError') for number in range(1, 6)]
+        assert 'missing arguments: temperature' in failures[3]['message']
+        assert json.loads(output.getvalue())['result'] == 7.5
+
+    def test_runner_overflow(self):
+        output = io.StringIO()
+        errors = io.StringIO()
+        runner = BatchRunner(output, errors)
+        runner.run([{'calc': 'viscosity_at_any_temp', 'viscosity40': 100,
+                     'viscosity100': 10, 'temperature': -260},
+                    {'calc': 'viscosity_index', 'viscosity40': 46,
+                     'viscosity100': 6.8}])
+        assert json.loads(errors.getvalue())['error'] == 'OverflowError'
+        assert json.loads(output.getvalue())['result'] == 102
+        assert runner.failed == 1
+
+    def test_runner_csv(self):
+        output = io.StringIO()
+        runner = BatchRunner(output, io.StringIO(), output_format='csv')
+        runner.run([{'calc': 'velocity_factor', 'outer_diameter': '58',
+                     'inner_diameter': '45', 'rpm': '3000'}])
+        assert output.getvalue().splitlines() == [
+            'calc,outer_diameter,inner_diameter,rpm,result',
+            'velocity_factor,58,45,3000,154500']
+
+    def test_main_stdin(self):
+        process = subprocess.run(
+            [sys.executable, os.path.join(ROOT, 'main.py'), 'batch',
+             '--format', 'csv'],
+            input='calc,viscosity40,viscosity100\n'
+                  'viscosity_index,22.83,5.05\n'
+                  'viscosity_index,1.5,1\n',
+            capture_output=True, text=True)
+        assert process.stdout.splitlines() == [
+            'calc,viscosity40,viscosity100,result',
+            'viscosity_index,22.83,5.05,156']
+        assert '"ConceptError"' in process.stderr
+        assert process.returncode == 1
+
+    def test_main_missing_file(self):
+        with temporary_path('missing.jsonl') as path:
+            process = subprocess.run(
+                [sys.executable, os.path.join(ROOT, 'main.py'), 'batch',
+                 path], capture_output=True, text=True)
+        assert 'missing.jsonl' in process.stderr
+        assert 'Traceback' not in process.stderr
+        assert process.returncode == 2
+
+
+class TestResultCache:
+    """Class to test ResultCache class."""
+
+    def test_hits(self):
+        with temporary_path('cache.db') as path:
+            with ResultCache(path) as cache:
+                assert cache.calculate('viscosity_index', {
+                    'viscosity40': '73,3', 'viscosity100': 8.86}) == 92
+                assert cache.calculate('viscosity_index', {
+                    'viscosity40': 73.3, 'viscosity100': ' 8.86'}) == 92
+                assert (cache.hits, cache.misses) == (1, 1)
+            with ResultCache(path) as cache:
+                cache.calculate('viscosity_index', {'viscosity40': 73.3,
+                                                    'viscosity100': 8.86})
+                assert cache.hit_rate == 1
+            with ResultCache(path, version='0.0') as cache:
+                cache.calculate('viscosity_index', {'viscosity40': 73.3,
+                                                    'viscosity100': 8.86})
+                assert cache.hit_rate == 0
+
+    def test_results_and_errors(self):
+        with temporary_path('cache.db') as path:
+            requests = [('mix_proportions', {'viscosity0': 680,
+                                             'viscosity1': 220,
+                                             'mix_viscosity': 460,
+                                             'temperature': 40}),
+                        ('viscosity_index', {'viscosity40': 15,
+                                             'viscosity100': 150}),
+                        ('flow_type', {'velocity': 15, 'length': 10,
+                                       'viscosity': 15})]
+            with ResultCache(path) as cache:
+                cold = cache.calculate_many(requests)
+            with ResultCache(path) as cache:
+                warm = cache.calculate_many(requests)
+                assert cache.hits == 3
+            assert warm[0] == (67.32, 32.68)
+            assert warm[0]._asdict() == cold[0]._asdict()
+            assert type(warm[1]) is InvertedViscosityError
+            assert str(warm[1]) == str(cold[1])
+            assert warm[2] == 'laminar'
+
+    def test_eviction(self):
+        with temporary_path('cache.db') as path:
+            with ResultCache(path, max_entries=10) as cache:
+                cache.calculate_many([('grease_amount', {
+                    'outer_diameter': 25, 'width': width})
+                    for width in range(1, 16)])
+                count, = cache._connection.execute(
+                    'SELECT count(*) FROM results').fetchone()
+                assert count <= 10
+
+    def test_batch_runner(self):
+        with temporary_path('cache.db') as path:
+            outputs = []
+            for _ in range(2):
+                output = io.StringIO()
+                errors = io.StringIO()
+                with ResultCache(path) as cache:
+                    runner = BatchRunner(output, errors, cache=cache,
+                                         chunk_size=2)
+                    runner.run(read_jsonl(TestBatch.records))
+                outputs.append((output.getvalue(), errors.getvalue()))
+            assert cache.hits == 4
+            output = io.StringIO()
+            errors = io.StringIO()
+            BatchRunner(output, errors).run(read_jsonl(TestBatch.records))
+            assert outputs == [(output.getvalue(), errors.getvalue())] * 2
+
+    def test_batch_runner_malformed(self):
+        with temporary_path('cache.db') as path:
+            output = io.StringIO()
+            errors = io.StringIO()
+            with ResultCache(path) as cache:
+                runner = BatchRunner(output, errors, cache=cache)
+                runner.run(read_jsonl(TestBatch.malformed))
+            assert runner.failed == 5
+            assert json.loads(output.getvalue())['result'] == 7.5
+            assert [json.loads(line)['record'] for line
+                    in errors.getvalue().splitlines()] == [1, 2, 3, 4, 5]
+
+
+    def test_batch_runner_overflow(self):
+        records = [{'calc': 'viscosity_at_any_temp', 'viscosity40': 100,
+                    'viscosity100': 10, 'temperature': -260},
+                   {'calc': 'viscosity_index', 'viscosity40': 46,
+                    'viscosity100': 6.8}]
+        with temporary_path('cache.db') as path:
+            outputs = []
+            for _ in range(2):
+                output = io.StringIO()
+                errors = io.StringIO()
+                with ResultCache(path) as cache:
+                    BatchRunner(output, errors, cache=cache).run(records)
+                outputs.append((output.getvalue(), errors.getvalue()))
+            assert cache.hits == 2
+        assert json.loads(outputs[0][1])['error'] == 'OverflowError'
+        assert json.loads(outputs[0][0])['result'] == 102
+        assert outputs[0] == outputs[1]
+
+class TestHistoryStore:
+    """Class to test HistoryStore class."""
+
+    @staticmethod
+    def samples():
+        return [{'asset': asset, 'timestamp': hour * 3600.0,
+                 'viscosity40': 40.0 + hour, 'viscosity100': 6.8,
+                 'iron': None if hour % 2 else hour / 1000}
+                for hour in range(48) for asset in ('pump', 'gearbox')]
+
+    def test_samples(self):
+        with temporary_path('history.db') as path:
+            with HistoryStore(path) as store:
+                assert store.add_many(self.samples()) == 96
+                assert store.assets() == ['gearbox', 'pump']
+                samples = store.samples('pump', 3600, 4 * 3600)
+                assert [s.timestamp for s in samples] == [3600, 7200, 10800]
+                assert samples[0].asset == 'pump'
+                assert samples[0].v_index == columnar.viscosity_index(
+                    [41], [6.8])[0]
+                assert store.latest('gearbox').viscosity40 == 87
+                assert store.samples('mill') == []
+                assert store.latest('mill') is None
+            with HistoryStore(path) as store:
+                store.add('pump', 3600, viscosity40=46, v_index=100)
+                sample, = store.samples('pump', 3600, 7200)
+                assert (sample.viscosity40, sample.viscosity100,
+                        sample.v_index) == (46, None, 100)
+                assert len(store.samples('pump')) == 48
+
+    def test_failed_batch_adds_nothing(self):
+        with temporary_path('history.db') as path:
+            with HistoryStore(path) as store:
+                nose.tools.assert_raises(ValueError, store.add_many, [
+                    {'asset': 'A', 'timestamp': 1}, {'asset': 'A2'}])
+                store.add('B', 5, viscosity40=46)
+                assert store.assets() == ['B']
+                assert store.samples('A') == []
+                assert [s.asset for s in store.samples('B')] == ['B']
+
+    def test_values_are_parsed(self):
+        with temporary_path('history.db') as path:
+            sample = {'asset': 'C', 'timestamp': '1', 'viscosity40': '46,2',
+                      'viscosity100': ' 6.8'}
+            with HistoryStore(path) as store:
+                store.add_many([sample])
+                assert 'v_index' not in sample
+                stored, = store.samples('C')
+                assert (stored.timestamp, stored.viscosity40,
+                        stored.viscosity100) == (1, 46.2, 6.8)
+                assert stored.v_index == columnar.viscosity_index(
+                    [46.2], [6.8])[0]
+                summary = store.summary('C', 'viscosity40')
+                assert (summary.mean, summary.min) == (46.2, 46.2)
+                for bad in ({'viscosity40': 'abc'}, {'iron': 'nan'}):
+                    nose.tools.assert_raises(ValueError, store.add, 'C', 2,
+                                             **bad)
+                assert len(store.samples('C')) == 1
+
+    def test_aggregates(self):
+        with temporary_path('history.db') as path:
+            with HistoryStore(path) as store:
+                store.add_many(self.samples())
+                summary = store.summary('pump', 'iron', 0, 10 * 3600)
+                assert summary.count == 5
+                assert summary.mean == 0.004
+                assert (summary.min, summary.max) == (0, 0.008)
+                assert (summary.first, summary.last) == (0, 0.008)
+                days = store.trend('pump', 'viscosity40', bucket=86400)
+                assert [(day.start, day.count, day.min, day.max)
+                        for day in days] == [(0, 24, 40, 63),
+                                             (86400, 24, 64, 87)]
+                assert days[0].mean == 51.5
+                assert store.trend('mill', 'iron') == []
+
+    def test_trend_bucket(self):
+        with temporary_path('history.db') as path:
+            with HistoryStore(path) as store:
+                store.add_many(self.samples())
+                assert len(store.trend('pump', 'iron', bucket='43200')) == 4
+                for bucket, error in ((0, ConceptError),
+                                      (-86400, ConceptError),
+                                      ('day', ValueError),
+                                      (float('nan'), ValueError)):
+                    nose.tools.assert_raises(error, store.trend, 'pump',
+                                             'iron', bucket=bucket)
+
+    @nose.tools.raises(ValueError)
+    def test_field(self):
+        with temporary_path('history.db') as path:
+            with HistoryStore(path) as store:
+                store.summary('pump', 'viscosity40; DROP TABLE samples')
+
+
+class TestTrendFile:
+    """Class to test trend files."""
+
+    def test_round_trip(self):
+        with temporary_path('pump.trend') as path:
+            trendfile.write(path, [1000, 1060, 1060, 4600],
+                            {'viscosity40': [46.2, None, 46.5, 47],
+                             'v_index': [100, 101, 99, 98]},
+                            types={'v_index': 'i'}, resolution=60)
+            with TrendFile(path) as trend:
+                assert len(trend) == 4
+                assert trend.columns == ['viscosity40', 'v_index']
+                assert trend.timestamps() == [1000, 1060, 1060, 4600]
+                with trend.column('viscosity40') as column:
+                    assert column.readonly and column.format == 'd'
+                    values = column.tolist()
+                assert values[::2] == [46.2, 46.5] and values[1] != values[1]
+                with trend.column('v_index', 1, 3) as column:
+                    assert column.tolist() == [101, 99]
+                assert trend.range(1060, 4600) == (1, 3)
+                assert trend.range(5000) == (4, 4)
+
+    def test_range_by_blocks(self):
+        with temporary_path('pump.trend') as path:
+            timestamps = [minute * 60.0 for minute in range(1000)
+                          for _ in range(minute % 3)]
+            trendfile.write(path, timestamps, {}, resolution=60,
+                            block_size=16)
+            with TrendFile(path) as trend:
+                assert trend.timestamps() == timestamps
+                assert trend.timestamps(100, 140) == timestamps[100:140]
+                for start, end in ((0, 60), (6000, 6030), (59950, 60000),
+                                   (-60, 0), (30000, 29000)):
+                    first = bisect.bisect_left(timestamps, start)
+                    stop = bisect.bisect_left(timestamps, end)
+                    assert trend.range(start, end) == (first,
+                                                       max(first, stop))
+
+    def test_export(self):
+        with temporary_path('pump.trend') as path:
+            directory = os.path.dirname(path)
+            with HistoryStore(os.path.join(directory, 'history.db')) as store:
+                store.add_many(TestHistoryStore.samples())
+                assert trendfile.export(store, 'pump', path, start=3600,
+                                        end=7 * 3600) == 6
+            with TrendFile(path) as trend:
+                assert trend.timestamps() == [hour * 3600.0
+                                              for hour in range(1, 7)]
+                with trend.column('viscosity40') as column:
+                    assert column.tolist() == [41, 42, 43, 44, 45, 46]
+
+    @nose.tools.raises(ValueError)
+    def test_unsorted(self):
+        with temporary_path('pump.trend') as path:
+            trendfile.write(path, [60, 0], {})
+
+    def test_invalid_arguments(self):
+        with temporary_path('pump.trend') as path:
+            for arguments in ({'resolution': 0}, {'resolution': -1},
+                              {'block_size': 0}, {'block_size': 1.5}):
+                nose.tools.assert_raises(ValueError, trendfile.write, path,
+                                         [0, 1], {}, **arguments)
+            assert not os.path.exists(path)
+
+    def test_timestamps_off_resolution(self):
+        with temporary_path('pump.trend') as path:
+            with nose.tools.assert_raises(ValueError) as context:
+                trendfile.write(path, [0.4, 0.6, 1.7], {})
+            assert '0.6' in str(context.exception)
+            trendfile.write(path, [0.4, 0.6, 1.7], {}, resolution=0.1)
+            with TrendFile(path) as trend:
+                assert [round(timestamp, 9) for timestamp
+                        in trend.timestamps()] == [0.4, 0.6, 1.7]
+
+    def test_missing_integer(self):
+        with temporary_path('pump.trend') as path:
+            with nose.tools.assert_raises(ValueError) as context:
+                trendfile.write(path, [0, 60], {'v_index': [100, None]},
+                                types={'v_index': 'i'})
+            assert 'v_index' in str(context.exception)
+
+    @nose.tools.raises(ValueError)
+    def test_not_trend_file(self):
+        with temporary_path('pump.trend') as path:
+            with open(path, 'wb') as file:
+                file.write(b'timestamp,viscosity40\n' * 4)
+            TrendFile(path)
+
+
+class TestHeadlessImport:
+    """Class to test that headless entry points never import PyQt5."""
+
+    modules = ['main', 'lubricalc.batch', 'lubricalc.cache',
+               'lubricalc.columnar', 'lubricalc.formulation',
+               'lubricalc.history', 'lubricalc.icp', 'lubricalc.instrument',
+               'lubricalc.monitor', 'lubricalc.optimizer',
+               'lubricalc.parallel', 'lubricalc.pipeline',
+               'lubricalc.service', 'lubricalc.trendfile']
+
+    @staticmethod
+    def run(code):
+        # A None entry in sys.modules makes any PyQt5 import fail
+        return subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             "import sys; sys.modules['PyQt5'] = None; " + code],
+            cwd=ROOT, capture_output=True, text=True)
+
+    def test_no_qt_imports(self):
+        process = self.run('import ' + ', '.join(self.modules))
+        assert process.returncode == 0, process.stderr
+        assert 'PyQt5' not in process.stderr
+        assert ' views' not in process.stderr
+
+    def test_modules_alone(self):
+        # Each module on its own, so an import cycle can't hide behind
+        # the modules imported before it
+        for module in self.modules:
+            process = self.run('import ' + module)
+            assert process.returncode == 0, (module, process.stderr)
+
+    def test_gui_without_qt(self):
+        process = self.run('import main; sys.exit(main.main([]))')
+        assert process.returncode == 1
+        assert 'the GUI needs PyQt5' in process.stderr
+
+    def test_import_time_budget(self):
+        process = self.run('import main, lubricalc.batch')
+        cumulative = 0
+        for line in process.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() in ('main',
+                                                          'lubricalc.batch'):
+                cumulative += int(fields[1])
+        assert 0 < cumulative < IMPORT_BUDGET, cumulative
+
+
+class TestInstrument:
+    """Class to test the instrument module."""
+
+    @staticmethod
+    def record(function):
+        instrument.reset()
+        instrument.enable()
+        try:
+            function()
+        finally:
+            instrument.disable()
+        return instrument.snapshot()
+
+    def test_disabled_restores_originals(self):
+        method = Viscosity.__dict__['viscosity_at_40']
+        batch_method = OilBlend.__dict__['total_ash_batch']
+        function = columnar.FUNCTIONS['viscosity_index']
+        self.record(lambda: None)
+        assert not instrument.enabled()
+        assert Viscosity.__dict__['viscosity_at_40'] is method
+        assert OilBlend.__dict__['total_ash_batch'] is batch_method
+        assert columnar.FUNCTIONS['viscosity_index'] is function
+        assert sys.modules['lubricalc.viscosity'].validate is v.validate
+
+    def test_counts_and_iterations(self):
+        def run():
+            for _ in range(3):
+                Viscosity().viscosity_at_40(viscosity100=10, v_index=100)
+            columnar.calculate('viscosity_index', {'viscosity40': [100, 1],
+                                                   'viscosity100': [11, 11]})
+        metrics = self.record(run)
+        metric = metrics['Viscosity.viscosity_at_40']
+        assert metric['count'] == 3
+        assert metric['errors'] == 0
+        assert metric['iterations'] > 3
+        assert set(metric['quantiles']) == {'0.5', '0.9', '0.99'}
+        assert metrics['validate']['count'] > metric['iterations']
+        assert metrics['columnar.viscosity_index']['count'] == 1
+
+    def test_errors(self):
+        def run():
+            try:
+                Viscosity().viscosity_index(viscosity40=1, viscosity100=11)
+            except ConceptError:
+                pass
+        metrics = self.record(run)
+        assert metrics['Viscosity.viscosity_index']['errors'] == 1
+        assert metrics['validate']['errors'] == 1
+
+    def test_export(self):
+        self.record(lambda: Reynolds().flow_type(
+            velocity=2, length=0.05, viscosity=32))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.prom')
+            instrument.export(path)
+            with open(path) as file:
+                text = file.read()
+            instrument.export(path[:-4] + 'json')
+            with open(path[:-4] + 'json') as file:
+                metrics = json.load(file)
+        assert 'lubricalc_calls_total{function="Reynolds.flow_type"} 1' in text
+        assert '# TYPE lubricalc_seconds summary' in text
+        assert metrics['Reynolds.flow_type']['count'] == 1
+
+
+class TestCalculationWorker:
+    """Class to test CalculationWorker class."""
+
+    @staticmethod
+    def application():
+        if QtWidgets is None:
+            raise nose.SkipTest('PyQt5 is not installed')
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        if QtWidgets.QApplication.instance() is None:
+            TestCalculationWorker.app = QtWidgets.QApplication([])
+
+    def worker(self):
+        self.application()
+        from views.worker import CalculationWorker
+        worker = CalculationWorker()
+        worker.results = []
+        worker.finished.connect(
+            lambda key, result: worker.results.append((key, result)))
+        worker.failed.connect(
+            lambda key, error: worker.results.append((key, type(error))))
+        return worker
+
+    @staticmethod
+    def wait(worker, timeout=30):
+        deadline = time.perf_counter() + timeout
+        while worker.pending() and time.perf_counter() < deadline:
+            QtWidgets.QApplication.processEvents()
+            time.sleep(0.001)
+        QtWidgets.QApplication.processEvents()
+        assert worker.pending() == 0
+
+    def test_rapid_requests_supersede(self):
+        worker = self.worker()
+        for v_index in range(80, 180):
+            worker.submit('kv40', Viscosity().viscosity_at_40,
+                          viscosity100=8.86, v_index=v_index)
+        self.wait(worker)
+        assert worker.results == [
+            ('kv40', Viscosity().viscosity_at_40(8.86, 179))]
+        assert worker.cancelled == 99
+
+    def test_keys_and_errors(self):
+        worker = self.worker()
+        worker.submit('vi', Viscosity().viscosity_index, viscosity40=22.83,
+                      viscosity100=5.05)
+        worker.submit('kv100', Viscosity().viscosity_at_100,
+                      viscosity40='abc', v_index=92)
+        self.wait(worker)
+        assert sorted(worker.results) == [('kv100', ValueError),
+                                          ('vi', 156)]
+
+    def test_unexpected_error(self):
+        worker = self.worker()
+        worker.submit('ratio', lambda a, b: a / b, a=1, b=0)
+        self.wait(worker)
+        assert worker.results == [('ratio', ZeroDivisionError)]
+
+
+class TestLiveTabs:
+    """Class to test live recalculation in the tabs."""
+
+    @staticmethod
+    def tab(name):
+        TestCalculationWorker.application()
+        import views.tabs
+        tab = getattr(views.tabs, name)()
+        tab.live = True
+        return tab
+
+    def test_live_cheap_calculation(self):
+        tab = self.tab('ViscosityTab')
+        tab.viscosity0_40_edit.setText('22.83')
+        tab.viscosity0_100_edit.setText('5.05')
+        assert tab.index_label.text() == 'Viscosity Index = 156'
+        tab.viscosity0_100_edit.setText('5.0x')
+        assert tab.index_label.text() == 'Viscosity Index'
+        assert 'valid number' in tab.status_label.text()
+        tab.viscosity0_100_edit.setText(' 5.050')
+        assert tab.index_label.text() == 'Viscosity Index = 156'
+        assert tab.status_label.text() == ''
+
+    def test_live_background_calculation_is_cached(self):
+        tab = self.tab('ViscosityTab')
+        tab.debounce = 0
+        tab.viscosity1_100_edit.setText('8.86')
+        tab.index0_edit.setText('92')
+        deadline = time.perf_counter() + 30
+        while (tab.viscosity_40_label.text().endswith('C') and
+               time.perf_counter() < deadline):
+            QtWidgets.QApplication.processEvents()
+        assert tab.viscosity_40_label.text() == \
+            'Kinematic Viscosity at 40°C = 73.86 cSt'
+        tab.index0_edit.setText('9')
+        tab.index0_edit.setText('92')
+        # Answered from the cache, without waiting for the worker
+        assert tab.viscosity_40_label.text() == \
+            'Kinematic Viscosity at 40°C = 73.86 cSt'
+        assert tab.worker.pending() == 0
+
+    def test_not_live(self):
+        tab = self.tab('BearingTab')
+        tab.live = False
+        tab.outer_diameter_edit.setText('25')
+        tab.width_edit.setText('60')
+        assert tab.grease_amount_label.text() == \
+            'Amount of Grease for Re-lubrication'
+        tab.grease_amount_btn.click()
+        assert tab.grease_amount_label.text() == \
+            'Amount of Grease for Re-lubrication = 7.5 g'
+
+
+class TestLazyTabs:
+    """Class to test that tabs are built when first shown."""
+
+    @staticmethod
+    def tabs():
+        TestCalculationWorker.application()
+        from views.tabs import TabsCollection
+        return TabsCollection()
+
+    def test_built_on_first_show(self):
+        tabs = self.tabs()
+        assert tabs.count() > 2
+        assert tabs.tab(0) is not None
+        assert [tabs.tab(index) for index in range(1, tabs.count())] == [
+            None] * (tabs.count() - 1)
+        tabs.setCurrentIndex(2)
+        tab = tabs.tab(2)
+        assert tab is not None and tabs.tab(1) is None
+        tabs.setCurrentIndex(0)
+        tabs.setCurrentIndex(2)
+        assert tabs.tab(2) is tab
+
+    def test_set_live_reaches_later_tabs(self):
+        tabs = self.tabs()
+        tabs.set_live(True)
+        assert tabs.tab(0).live
+        tabs.setCurrentIndex(1)
+        assert tabs.tab(1).live
+        tabs.set_live(False)
+        assert not tabs.tab(0).live and not tabs.tab(1).live
+
+    def test_startup_time(self):
+        TestCalculationWorker.application()
+        from controller import MainController
+        controller = MainController(started=time.perf_counter() - 1)
+        assert controller.startup_time is None
+        stderr = io.StringIO()
+        os.environ['LUBRICALC_STARTUP_TIME'] = '1'
+        try:
+            with contextlib.redirect_stderr(stderr):
+                controller.view.show()
+                QtWidgets.QApplication.processEvents()
+        finally:
+            del os.environ['LUBRICALC_STARTUP_TIME']
+            controller.view.hide()
+        startup_time = controller.startup_time
+        assert startup_time >= 1
+        assert stderr.getvalue().startswith('Window shown in ')
+        # Only the first show is timed
+        controller.view.show()
+        QtWidgets.QApplication.processEvents()
+        controller.view.close()
+        assert controller.startup_time == startup_time
+
+
+class TestBatchTab:
+    """Class to test the batch table tab and its model."""
+
+    @staticmethod
+    def tab():
+        TestCalculationWorker.application()
+        from views.tabs import BatchTab
+        return BatchTab()
+
+    def test_parse_table(self):
+        TestCalculationWorker.application()
+        from views.tablemodel import parse_table
+        assert parse_table('1\t2\n3\n', ['a', 'b']) == (
+            ['a', 'b'], [['1', '3'], ['2', '']])
+        assert parse_table('x\ty\n1\t2', ['a', 'b']) == (
+            ['x', 'y'], [['1'], ['2']])
+        assert parse_table('46,0\t6,8\n', ['a', 'b']) == (
+            ['a', 'b'], [['46,0'], ['6,8']])
+
+    def test_comma_decimals(self):
+        tab = self.tab()
+        tab.calc_combo.setCurrentText('viscosity_index')
+        QtWidgets.QApplication.clipboard().setText('22,83\t5,05\n')
+        tab.paste_btn.click()
+        model = tab.model
+        assert model.rowCount() == 1
+        assert model.data(model.index(0, 0),
+                          QtCore.Qt.BackgroundRole) is None
+        tab.batch_btn.click()
+        TestCalculationWorker.wait(tab.worker)
+        assert model.data(model.index(0, 2)) == '156'
+
+    def test_paste_and_calculate(self):
+        tab = self.tab()
+        tab.calc_combo.setCurrentText('viscosity_index')
+        QtWidgets.QApplication.clipboard().setText(
+            '22.83\t5.05\n15\t150\nabc\t5\n' * 1000)
+        tab.paste_btn.click()
+        tab.batch_btn.click()
+        TestCalculationWorker.wait(tab.worker)
+        model = tab.model
+        assert model.rowCount() == 3000
+        assert model.columnCount() == 3
+        assert [model.data(model.index(row, 2)) for row in range(3)] == [
+            '156', 'Error', 'Error']
+        assert 'greater than' in model.data(model.index(1, 2),
+                                            QtCore.Qt.ToolTipRole)
+        assert model.data(model.index(2, 0),
+                          QtCore.Qt.BackgroundRole) is not None
+        assert model.data(model.index(0, 0),
+                          QtCore.Qt.BackgroundRole) is None
+        assert tab.summary_label.text().endswith('2000 failed')
+
+    def test_tuple_results(self):
+        tab = self.tab()
+        tab.calc_combo.setCurrentText('mix_proportions')
+        tab.model.set_columns(tab.arguments('mix_proportions'),
+                              [['680'], ['220'], ['460'], ['40']])
+        tab.batch_btn.click()
+        TestCalculationWorker.wait(tab.worker)
+        model = tab.model
+        assert [model.headerData(column, QtCore.Qt.Horizontal)
+                for column in (4, 5)] == ['oil1', 'oil2']
+        assert [model.data(model.index(0, column))
+                for column in (4, 5)] == ['67.32', '32.68']
+
+
+class TestViscosityChart:
+    """Class to test ViscosityChart class."""
+
+    @staticmethod
+    def chart():
+        TestCalculationWorker.application()
+        from views.chart import ViscosityChart
+        chart = ViscosityChart()
+        chart.resize(600, 400)
+        for index in range(50):
+            chart.add_oil('oil', 40 + index * 10, 6 + index * 0.5)
+        return chart
+
+    def test_viscosities_match_d341(self):
+        chart = self.chart()
+        assert chart.viscosities_at(60) == [
+            Viscosity().viscosity_at_any_temp(40 + index * 10,
+                                              6 + index * 0.5, 60)
+            for index in range(50)]
+
+    def test_cursor_does_not_rerender_curves(self):
+        chart = self.chart()
+        moves = []
+        chart.cursor_moved.connect(lambda t, values: moves.append(values))
+        chart.grab()
+        for temperature in range(0, 120, 5):
+            chart.set_cursor(temperature)
+            chart.grab()
+        assert chart.renders == 1
+        assert len(moves) == 24 and len(moves[0]) == 50
+        chart.resize(500, 300)
+        chart.grab()
+        assert chart.renders == 2
+
+    def test_comma_decimals(self):
+        chart = self.chart()
+        chart.add_oil('comma', '46,2', ' 6,8')
+        assert chart.viscosities_at(60)[-1] == \
+            Viscosity().viscosity_at_any_temp(46.2, 6.8, 60)
+
+    @nose.tools.raises(InvertedViscosityError)
+    def test_inverted_oil(self):
+        self.chart().add_oil('bad', 5, 10)
+
+
+class TestCalculationService:
+    """Class to test CalculationService class."""
+
+    @staticmethod
+    def exchange(service, lines):
+        async def run():
+            server = await service.start(port=0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(''.join(line + '\n' for line in lines).encode())
+            writer.write_eof()
+            responses = [json.loads(line) for line in
+                         (await reader.read()).decode().splitlines()]
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return responses
+        return asyncio.run(run())
+
+    def test_responses_in_order(self):
+        responses = self.exchange(CalculationService(), TestBatch.records)
+        assert [r.get('result') for r in responses] == [
+            145, {'oil1': 67.32, 'oil2': 32.68}, None, None, 0.83]
+        assert [r.get('error') for r in responses] == [
+            None, None, 'InvertedViscosityError', 'ValueError', None]
+
+    def test_requests_are_batched(self):
+        service = CalculationService(batch_delay=0.05)
+        lines = [json.dumps({'id': index, 'calc': 'viscosity_at_40',
+                             'viscosity100': 8.86, 'v_index': 80 + index})
+                 for index in range(20)]
+        responses = self.exchange(service, lines)
+        assert [r['id'] for r in responses] == list(range(20))
+        assert [r['result'] for r in responses] == [
+            Viscosity().viscosity_at_40(8.86, 80 + index)
+            for index in range(20)]
+        assert service.requests == 20
+        assert service.batches == 1
+
+    def test_error_responses(self):
+        responses = self.exchange(CalculationService(), [
+            '{"id": "a", "calc": "viscosity_at_0"}',
+            '{"id": "b", "calc": "total_ash", "additive_percent": 8.5, '
+            '"iron": 1}',
+            '{"id": "c", "calc": "grease_amount", "width": 60}',
+            '[1, 2]',
+            '{"id": "d", "calc": ["grease_amount"]}',
+            '{"id": "e", "calc": "grease_amount", "outer_diameter": 25, '
+            '"width": 60}'])
+        assert [(r.get('id'), r.get('error')) for r in responses] == [
+            ('a', 'ValueError'), ('b', 'ConceptError'), ('c', 'ValueError'),
+            (None, 'ValueError'), ('d', 'ValueError'), ('e', None)]
+        assert responses[-1]['result'] == 7.5
+
+
+class TestColumnar:
+    """Class to test columnar calculators against the scalar ones."""
+
+    def test_viscosity_index(self):
+        assert columnar.viscosity_index(
+            [22.83, 73.3, '138,9'], [5.05, 8.86, 18.1]) == [156, 92, 145]
+
+    def test_viscosity_index_errors(self):
+        results = columnar.viscosity_index([15, 1.5, 'inf'], [150, 1, 18.1])
+        assert [type(r) for r in results] == [
+            InvertedViscosityError, ConceptError, ValueError]
+
+    def test_viscosity_at_40(self):
+        viscosity100 = [15, 5.05, 18.124, 46.3]
+        v_index = [130, 156, 95, 0]
+        assert columnar.viscosity_at_40(viscosity100, v_index) == [
+            Viscosity().viscosity_at_40(*row)
+            for row in zip(viscosity100, v_index)]
+
+    def test_viscosity_at_100(self):
+        viscosity40 = [112, 22.83, 460, 3.5]
+        v_index = [140, 156, 95, 40]
+        assert columnar.viscosity_at_100(viscosity40, v_index) == [
+            Viscosity().viscosity_at_100(*row)
+            for row in zip(viscosity40, v_index)]
+
+    def test_viscosity_at_100_v_index_not_defined(self):
+        result, = columnar.viscosity_at_100([112], [401])
+        assert isinstance(result, ConceptError)
+
+    def test_viscosity_at_any_temp(self):
+        assert columnar.viscosity_at_any_temp(
+            [4.6, 46, '46'], [2, 7, '7 '], [20, 20, '35.0']) == [
+                6.89, 130.66, 58.08]
+
+    def test_mix_proportions(self):
+        results = columnar.mix_proportions([680, 320], [220, 680],
+                                           [460, 1000], ['40', '40'])
+        assert results[0] == (67.32, 32.68)
+        assert isinstance(results[1], ViscosityIntervalError)
+
+    def test_lubrication_frequency(self):
+        assert columnar.lubrication_frequency(
+            rpm=['1750.0 '], inner_diameter=[18], ft=[0], fc=[1], fh=[2],
+            fv=[0], fp=[0], fd=[2]) == [508]
+
+    def test_total_ash(self):
+        assert columnar.total_ash([8.5], Calcium=[0.47], Magnesium=[1.15],
+                                  zinc=[1.66]) == [0.83]
+
+    def test_unrounded(self):
+        result, = columnar.viscosity_at_any_temp([46], [7], [20],
+                                                 rounded=False)
+        assert result != 130.66
+        assert round(result, 2) == 130.66
+        assert columnar.calculate('viscosity_index', {
+            'viscosity40': [22.83], 'viscosity100': [5.05]},
+            rounded=False)[0] != 156
+
+    def test_unrounded_v_index_range(self):
+        # VI -0.08 rounds to 0, inside the range, and -0.59 to -1
+        rounded = columnar.viscosity_index([40.24, 40.3], [5, 5])
+        raw = columnar.viscosity_index([40.24, 40.3], [5, 5], rounded=False)
+        assert rounded[0] == 0 and -0.5 < raw[0] < 0
+        assert type(rounded[1]) is type(raw[1]) is ConceptError
+
+    def test_unrounded_chain(self):
+        viscosity = columnar.viscosity_at_any_temp([46], [7], [20],
+                                                   rounded=False)
+        raw = columnar.reynolds_number([3], [50], viscosity, rounded=False)
+        assert raw == [3 * 50 / viscosity[0]]
+
+    def test_present(self):
+        results = columnar.calculate('mix_proportions', {
+            'viscosity0': [680, 320], 'viscosity1': [220, 680],
+            'mix_viscosity': [460, 1000], 'temperature': ['40', '40']},
+            rounded=False)
+        presented = columnar.present('mix_proportions', results)
+        assert presented[0] == (67.32, 32.68)
+        assert type(presented[0]) is type(results[0])
+        assert presented[1] is results[1]
+
+
+class TestParallelExecutor:
+    """Class to test ParallelExecutor class."""
+
+    def test_run_keeps_order(self):
+        viscosity40 = [22.83, 73.3, 15, '138,9', 1.5] * 3
+        viscosity100 = [5.05, 8.86, 150, 18.1, 1] * 3
+        with ParallelExecutor(workers=2, chunk_size=2) as executor:
+            results = executor.run('viscosity_index',
+                                   {'viscosity40': viscosity40,
+                                    'viscosity100': viscosity100})
+        expected = columnar.viscosity_index(viscosity40, viscosity100)
+        assert [str(r) for r in results] == [str(r) for r in expected]
+        assert isinstance(results[2], InvertedViscosityError)
+
+    def test_run_non_numeric_results(self):
+        with ParallelExecutor(workers=1) as executor:
+            assert executor.run('flow_type', {'velocity': [15, 2],
+                                              'length': [10, 0.1],
+                                              'viscosity': [15, 2]}) == [
+                'laminar', 'laminar']
+
+    @nose.tools.raises(ValueError)
+    def test_unknown_calculation(self):
+        ParallelExecutor().run('viscosity_at_0', {})
+
+    def test_run_shared_in_place(self):
+        viscosity40 = [22.83, 73.3, 15, 138.9, 1.5] * 3
+        viscosity100 = [5.05, 8.86, 150, 18.1, 1] * 3
+        with SharedColumns.from_columns(
+                {'viscosity40': viscosity40,
+                 'viscosity100': viscosity100}) as inputs, \
+                SharedColumns.create(['result'], 15) as outputs:
+            with ParallelExecutor(workers=2, chunk_size=4) as executor:
+                errors = executor.run_shared('viscosity_index', inputs,
+                                             outputs)
+            results = outputs['result'].tolist()
+        expected = columnar.viscosity_index(viscosity40, viscosity100)
+        assert sorted(errors) == [2, 4, 7, 9, 12, 14]
+        assert isinstance(errors[2], InvertedViscosityError)
+        for index, result in enumerate(expected):
+            if index not in errors:
+                assert results[index] == result
+
+    def test_run_shared_tuple_results(self):
+        with SharedColumns.from_columns({'viscosity40': [22.83, 73.3],
+                                         'viscosity100': [5.05, 8.86],
+                                         'velocity': [3, 0.2],
+                                         'length': [0.05, 0.05]}) as inputs, \
+                SharedColumns.create(['mixed', 'turbulent'], 2) as outputs:
+            with ParallelExecutor(workers=1) as executor:
+                errors = executor.run_shared('transition_temperatures',
+                                             inputs, outputs)
+            assert outputs['mixed'][0] == 12.1
+            assert outputs['turbulent'][0] == 27.0
+        assert list(errors) == [1]
+
+    @nose.tools.raises(ValueError)
+    def test_run_shared_text_results(self):
+        with SharedColumns.from_columns({'velocity': [15], 'length': [10],
+                                         'viscosity': [15]}) as inputs, \
+                SharedColumns.create(['result'], 1) as outputs:
+            with ParallelExecutor(workers=1) as executor:
+                executor.run_shared('flow_type', inputs, outputs)
+
+    @nose.tools.raises(ValueError)
+    def test_run_shared_output_width(self):
+        with SharedColumns.from_columns({'viscosity40': [22.83],
+                                         'viscosity100': [5.05],
+                                         'velocity': [3],
+                                         'length': [0.05]}) as inputs, \
+                SharedColumns.create(['mixed'], 1) as outputs:
+            with ParallelExecutor(workers=1) as executor:
+                executor.run_shared('transition_temperatures', inputs,
+                                    outputs)
+
+    @nose.tools.raises(ValueError)
+    def test_run_shared_output_length(self):
+        columns = {'viscosity40': [22.83, 46], 'viscosity100': [5.05, 6.8]}
+        with SharedColumns.from_columns(columns) as inputs, \
+                SharedColumns.create(['result'], 1) as outputs:
+            with ParallelExecutor(workers=1) as executor:
+                executor.run_shared('viscosity_index', inputs, outputs)
+
+
+class TestPipeline:
+    """Class to test Pipeline class."""
+
+    @staticmethod
+    def records(consumed):
+        for index, (viscosity40, viscosity100) in enumerate(
+                [('22.83', '5.05'), ('73,3', 8.86), (15, 150),
+                 ('138.9', 18.1), ('x', 7)] * 4):
+            consumed.append(index)
+            yield {'id': index, 'kv40': viscosity40, 'kv100': viscosity100}
+
+    def test_lazy_by_chunk(self):
+        consumed = []
+        pipeline = Pipeline(self.records(consumed), chunk_size=5).calculate(
+            'viscosity_index', viscosity40='kv40', viscosity100='kv100')
+        assert consumed == []
+        records = iter(pipeline)
+        next(records)
+        assert consumed == [0, 1, 2, 3, 4]
+        assert len(list(records)) == 11
+
+    def test_fused_stages(self):
+        errors = []
+        pipeline = (Pipeline(self.records([]), chunk_size=3,
+                             errors=lambda record, error: errors.append(
+                                 (record['id'], type(error))))
+                    .validate('kv40', 'kv100', limit=2)
+                    .calculate('viscosity_index', output='vi',
+                               viscosity40='kv40', viscosity100='kv100')
+                    .calculate('viscosity_at_any_temp', output='kv',
+                               viscosity40='kv40', viscosity100='kv100',
+                               temperature=60)
+                    .filter(lambda record: record['vi'] > 100))
+        records = list(pipeline)
+        assert [record['id'] for record in records] == [0, 3, 5, 8, 10, 13,
+                                                        15, 18]
+        assert records[0] == {'id': 0, 'kv40': 22.83, 'kv100': 5.05,
+                              'vi': 156, 'kv': calculate(
+                                  'viscosity_at_any_temp',
+                                  {'viscosity40': 22.83,
+                                   'viscosity100': 5.05,
+                                   'temperature': 60})}
+        assert errors[:2] == [(2, InvertedViscosityError), (4, ValueError)]
+        assert len(errors) == 8
+
+    def test_validate_below_limit(self):
+        errors = []
+        records = list(Pipeline(
+            [{'kv40': 46}, {'kv40': '1,5'}],
+            errors=lambda record, error: errors.append(type(error)))
+            .validate('kv40', limit=2))
+        assert records == [{'kv40': 46.0}]
+        assert errors == [ConceptError]
+
+    def test_constant_arguments(self):
+        records = list(Pipeline([{'id': 0}, {'id': 1}]).calculate(
+            'viscosity_at_any_temp', output='kv', viscosity40=46,
+            viscosity100=6.8, temperature=60))
+        expected = calculate('viscosity_at_any_temp', {
+            'viscosity40': 46, 'viscosity100': 6.8, 'temperature': 60})
+        assert records == [{'id': 0, 'kv': expected},
+                           {'id': 1, 'kv': expected}]
+
+    def test_stats(self):
+        # Records have no viscosity40 field, so every one fails
+        failing = Pipeline(self.records([])).calculate('viscosity_index')
+        assert list(failing) == []
+        assert failing.stats()[0].failed == 20
+
+        pipeline = (Pipeline(self.records([]), chunk_size=4)
+                    .calculate('viscosity_index', viscosity40='kv40',
+                               viscosity100='kv100')
+                    .map(lambda record: record, name='identity'))
+        assert len(list(pipeline)) == 12
+        stats = pipeline.stats()
+        assert [s.name for s in stats] == ['viscosity_index', 'identity']
+        assert [(s.rows, s.failed) for s in stats] == [(20, 8), (12, 0)]
+        assert 'rows/s' in pipeline.report()
+
+    @nose.tools.raises(ValueError)
+    def test_unknown_calculation(self):
+        Pipeline([]).calculate('viscosity_at_0')
+
+
+class TestEquivalence:
+    """Class to test the fast engines against the calculators.
+
+    Seeded random rows, valid and invalid, go through batch.calculate()
+    (the calculator classes) and through columnar, ParallelExecutor.run()
+    and ParallelExecutor.run_shared(); every row must give the same result
+    and the same error category. LUBRICALC_EQUIVALENCE_ROWS and
+    LUBRICALC_EQUIVALENCE_SEED run larger or other samples.
+    """
+
+    rows = int(os.environ.get('LUBRICALC_EQUIVALENCE_ROWS', 300))
+    seed = int(os.environ.get('LUBRICALC_EQUIVALENCE_SEED', 0))
+
+    # Input ranges per argument; both viscosities go through oil()
+    ranges = {'viscosity40': (2, 2000), 'viscosity100': (2, 100),
+              'v_index': (0, 400), 'temperature': (-30, 150),
+              'viscosity': (0.5, 5000), 'viscosity0': (2, 1500),
+              'viscosity1': (2, 1500), 'mix_viscosity': (2, 1500),
+              'oil0_percent': (0, 100), 'outer_diameter': (10, 400),
+              'inner_diameter': (5, 300), 'width': (5, 100),
+              'rpm': (100, 10000), 'velocity': (0.5, 20),
+              'length': (0.001, 0.5), 'additive_percent': (0.5, 25),
+              'additive_density': (0.8, 1.3), 'oil_density': (0.8, 0.95),
+              'Calcium': (0, 3), 'magnesium': (0, 3), 'zinc': (0, 3),
+              'boron': (0, 1)}
+
+    arguments = {
+        'viscosity_index': ['viscosity40', 'viscosity100'],
+        'viscosity_at_40': ['viscosity100', 'v_index'],
+        'viscosity_at_100': ['viscosity40', 'v_index'],
+        'viscosity_at_any_temp': ['viscosity40', 'viscosity100',
+                                  'temperature'],
+        'temperature_at_viscosity': ['viscosity40', 'viscosity100',
+                                     'viscosity'],
+        'oil_mix_viscosity': ['viscosity0', 'viscosity1', 'oil0_percent',
+                              'temperature'],
+        'mix_proportions': ['viscosity0', 'viscosity1', 'mix_viscosity',
+                            'temperature'],
+        'grease_amount': ['outer_diameter', 'width'],
+        'lubrication_frequency': ['rpm', 'inner_diameter'] + sorted(
+            Bearing.factors_map),
+        'velocity_factor': ['outer_diameter', 'inner_diameter', 'rpm'],
+        'reynolds_number': ['velocity', 'length', 'viscosity'],
+        'flow_type': ['velocity', 'length', 'viscosity'],
+        'transition_temperatures': ['viscosity40', 'viscosity100',
+                                    'velocity', 'length'],
+        'additive_percent_mass': ['additive_percent', 'additive_density',
+                                  'oil_density'],
+        'total_ash': ['additive_percent', 'Calcium', 'magnesium', 'zinc',
+                      'boron']}
+
+    # The scalar inverse solvers step towards their answer, so fewer rows
+    slow = {'viscosity_at_40': 0.05, 'viscosity_at_100': 0.05}
+
+    # Their first argument over its whole valid range, log-uniform so low
+    # viscosities are as well covered as the ones near the scan cap
+    solver_ranges = {'viscosity100': (2, 2000), 'viscosity40': (2, 20000)}
+
+    # Samples by (calc, numeric), shared by the tests
+    samples = {}
+
+    invalid = ('', 'abc', 'inf', '-inf', 'nan', '1e400', '1.2.3')
+
+    @staticmethod
+    def category(result):
+        """Return the error category of a result, None for a value."""
+        if not isinstance(result, Exception):
+            return None
+        if isinstance(result, LookupError):
+            # batch.calculate() reports them as not defined
+            return ConceptError
+        for cls in (InvertedViscosityError, ViscosityIntervalError,
+                    ConceptError, ValueError):
+            if isinstance(result, cls):
+                return cls
+        return type(result)
+
+    @classmethod
+    def same(cls, result, expected):
+        if isinstance(expected, tuple):
+            return isinstance(result, tuple) and len(result) == len(
+                expected) and all(map(cls.same, result, expected))
+        if isinstance(expected, float) and expected != expected:
+            return result != result
+        return type(result) is type(expected) and result == expected
+
+    @classmethod
+    def mangle(cls, rand, value, low):
+        """Return value as a user or a file could give it, or broken."""
+        roll = rand.random()
+        if roll < 0.04:
+            return rand.choice(cls.invalid)
+        if roll < 0.08:
+            return rand.choice((0, -1, low - 0.01, -0.0))
+        if roll < 0.16:
+            return str(value).replace('.', ',')
+        if roll < 0.2:
+            return ' {0} '.format(value)
+        if roll < 0.28:
+            return int(value)
+        return value
+
+    @classmethod
+    def row(cls, calc, rand, numeric=False):
+        """Return random arguments for calc, mostly valid."""
+        numbers = {}
+        for name in cls.arguments[calc]:
+            if name in Bearing.factors_map:
+                # One index past the end now and then
+                numbers[name] = rand.randint(0, len(Bearing.factors_map[
+                    name]) - (rand.random() > 0.02))
+                continue
+            low, high = cls.ranges[name]
+            numbers[name] = round(rand.uniform(low, high),
+                                  rand.randint(0, 3))
+        if 'viscosity40' in numbers and 'viscosity100' in numbers and \
+                rand.random() < 0.9:
+            numbers['viscosity40'] = round(
+                numbers['viscosity100'] * rand.uniform(3, 12), 2)
+        if calc in cls.slow:
+            name = cls.arguments[calc][0]
+            low, high = cls.solver_ranges[name]
+            numbers[name] = round(math.exp(rand.uniform(math.log(low),
+                                                        math.log(high))),
+                                  rand.randint(0, 3))
+        if numeric:
+            args = {name: float(value) if rand.random() > 0.05 else
+                    -float(value) for name, value in numbers.items()}
+            if 'temperature' in args and calc in ('oil_mix_viscosity',
+                                                  'mix_proportions'):
+                args['temperature'] = rand.choice((40.0, 100.0, 100.0, 60.0))
+            return args
+        args = {name: value if name in Bearing.factors_map else
+                cls.mangle(rand, value, cls.ranges[name][0])
+                for name, value in numbers.items()}
+        if 'temperature' in args and calc in ('oil_mix_viscosity',
+                                              'mix_proportions'):
+            args['temperature'] = rand.choice(('40', '100', '100', '60'))
+        return args
+
+    @staticmethod
+    def reference(calc, args):
+        try:
+            return calculate(calc, args)
+        except columnar.ROW_ERRORS as error:
+            return error
+
+    def sample(self, calc, numeric=False):
+        """Return (columns, expected results) of a seeded sample."""
+        if (calc, numeric) not in self.samples:
+            self.samples[calc, numeric] = self.new_sample(calc, numeric)
+        return self.samples[calc, numeric]
+
+    def new_sample(self, calc, numeric):
+        rand = random.Random('{0}-{1}-{2}'.format(calc, self.seed, numeric))
+        rows = [self.row(calc, rand, numeric) for _ in range(
+            max(1, int(self.rows * self.slow.get(calc, 1))))]
+        columns = {name: [args[name] for args in rows]
+                   for name in self.arguments[calc]}
+        return columns, [self.reference(calc, args) for args in rows]
+
+    @staticmethod
+    def message(calc, result):
+        """Return the message batch.calculate() gives for an error."""
+        if isinstance(result, LookupError):
+            return '{0}: not defined for {1}'.format(calc, result)
+        return str(result)
+
+    def check(self, calc, results, expected, columns):
+        assert len(results) == len(expected)
+        for index, (result, reference) in enumerate(zip(results, expected)):
+            args = {name: column[index] for name, column in columns.items()}
+            assert self.category(result) == self.category(reference), (
+                calc, args, result, reference)
+            if self.category(reference) is None:
+                assert self.same(result, reference), (calc, args, result,
+                                                      reference)
+            else:
+                assert self.message(calc, result) == str(reference), (
+                    calc, args, result, reference)
+
+    def test_columnar(self):
+        for calc in sorted(columnar.FUNCTIONS):
+            columns, expected = self.sample(calc)
+            self.check(calc, columnar.calculate(calc, columns), expected,
+                       columns)
+
+    def test_parallel(self):
+        with ParallelExecutor(workers=2, chunk_size=64) as executor:
+            for calc in sorted(columnar.FUNCTIONS):
+                columns, expected = self.sample(calc)
+                self.check(calc, executor.run(calc, columns), expected,
+                           columns)
+
+    def test_run_shared(self):
+        nan = float('nan')
+        with ParallelExecutor(workers=2, chunk_size=64) as executor:
+            for calc in sorted(SHARED_FIELDS):
+                columns, expected = self.sample(calc, numeric=True)
+                fields = list(SHARED_FIELDS[calc])
+                with SharedColumns.from_columns(columns) as inputs, \
+                        SharedColumns.create(fields, inputs.length) as \
+                        outputs:
+                    errors = executor.run_shared(calc, inputs, outputs)
+                    results = list(zip(*(outputs[name].tolist()
+                                         for name in fields)))
+                for index, reference in enumerate(expected):
+                    if self.category(reference) is not None:
+                        assert self.category(errors[index]) == \
+                            self.category(reference)
+                        assert self.message(calc, errors[index]) == \
+                            str(reference)
+                        continue
+                    assert index not in errors
+                    if not isinstance(reference, tuple):
+                        reference = (reference,)
+                    assert self.same(results[index], tuple(
+                        nan if value is None else float(value)
+                        for value in reference)), (calc, index)
+
+
 if __name__ == '__main__':
     nose.run()
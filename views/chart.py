@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+# File name: chart.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides ViscosityChart Class."""
+
+import math
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from lubricalc.viscosity import TO_KELVIN
+from lubricalc.viscosity import Viscosity
+from lubricalc.viscosity import d341_constants
+
+VISCOSITY_TICKS = (2, 3, 5, 10, 20, 50, 100, 200, 500, 1000, 10000)
+
+
+def _loglog(viscosity):
+    return math.log10(math.log10(viscosity + 0.7))
+
+
+class ViscosityChart(QtWidgets.QWidget):
+    """Class to plot viscosity against temperature on ASTM D341 axes.
+
+    On these axes, log10(log10(v + 0.7)) against log10(T), every oil is
+    the straight D341 line of its (A, B) constants, so each curve is
+    worked out once, when the oil is added, as the two points where it
+    crosses the plot edges: the whole curve decimated to its pixels.
+    Grid and curves are painted into a pixmap that is only rebuilt when
+    the oils or the widget size change; moving the temperature cursor
+    repaints just the strips under its old and new positions.
+    """
+
+    # Temperature (°C) and the viscosity of every oil there (cSt)
+    cursor_moved = QtCore.pyqtSignal(float, list)
+
+    margins = (64, 20, 24, 44)
+    temperature_range = (-20.0, 150.0)
+    viscosity_range = (2.0, 20000.0)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.oils = []
+        self.renders = 0
+        self._lines = []
+        self._constants = []
+        self._pixmap = None
+        self._cursor = None
+        self._x_range = [math.log10(t + TO_KELVIN)
+                         for t in self.temperature_range]
+        self._y_range = [_loglog(v) for v in self.viscosity_range]
+        self.setMouseTracking(True)
+        self.setMinimumSize(320, 240)
+
+    def add_oil(self, name, viscosity40, viscosity100):
+        """Add the D341 line of an oil; inputs are validated like in
+        Viscosity.viscosity_at_any_temp()."""
+        viscosity = Viscosity()
+        viscosity.viscosity_at_any_temp(viscosity40, viscosity100, 40)
+        a, b = d341_constants(viscosity.viscosity40, viscosity.viscosity100)
+        (x0, x1), (y0, y1) = self._x_range, self._y_range
+        # Line ends at the left and right edges, as fractions of the plot
+        self._lines.append(((a - b * x0 - y0) / (y1 - y0),
+                            (a - b * x1 - y0) / (y1 - y0)))
+        self._constants.append((a, b))
+        self.oils.append(name)
+        self._pixmap = None
+        self.update()
+
+    def clear(self):
+        self.oils = []
+        self._lines = []
+        self._constants = []
+        self._pixmap = None
+        self.update()
+
+    def viscosities_at(self, temperature):
+        """Return the viscosity of every oil at temperature (°C)."""
+        x = math.log10(temperature + TO_KELVIN)
+        return [round(10 ** (10 ** (a - b * x)) - 0.7, 2)
+                for a, b in self._constants]
+
+    def set_cursor(self, temperature):
+        """Move the temperature cursor, None to hide it."""
+        dirty = self._cursor_rect()
+        self._cursor = temperature
+        if temperature is not None:
+            dirty = dirty.united(self._cursor_rect())
+            self.cursor_moved.emit(temperature,
+                                   self.viscosities_at(temperature))
+        self.update(dirty)
+
+    def _plot_rect(self):
+        left, top, right, bottom = self.margins
+        return QtCore.QRect(left, top, self.width() - left - right,
+                            self.height() - top - bottom)
+
+    def _x(self, temperature):
+        plot = self._plot_rect()
+        x0, x1 = self._x_range
+        return plot.left() + plot.width() * (
+            math.log10(temperature + TO_KELVIN) - x0) / (x1 - x0)
+
+    def _y(self, viscosity):
+        plot = self._plot_rect()
+        y0, y1 = self._y_range
+        return plot.bottom() - plot.height() * (
+            _loglog(viscosity) - y0) / (y1 - y0)
+
+    def _temperature(self, x):
+        plot = self._plot_rect()
+        x0, x1 = self._x_range
+        return 10 ** (x0 + (x1 - x0) * (x - plot.left()) /
+                      plot.width()) - TO_KELVIN
+
+    def _cursor_rect(self):
+        if self._cursor is None:
+            return QtCore.QRect()
+        plot = self._plot_rect()
+        x = int(self._x(self._cursor))
+        return QtCore.QRect(x - 80, 0, 160, plot.bottom() + 6)
+
+    @staticmethod
+    def color(index):
+        return QtGui.QColor.fromHsv(index * 137 % 360, 220, 200)
+
+    def _render(self):
+        self.renders += 1
+        self._pixmap = QtGui.QPixmap(self.size())
+        self._pixmap.fill(self.palette().color(QtGui.QPalette.Base))
+        painter = QtGui.QPainter(self._pixmap)
+        plot = self._plot_rect()
+        metrics = painter.fontMetrics()
+        grid = QtGui.QPen(QtGui.QColor(220, 220, 220))
+        text = self.palette().color(QtGui.QPalette.Text)
+
+        for viscosity in VISCOSITY_TICKS:
+            y = int(self._y(viscosity))
+            painter.setPen(grid)
+            painter.drawLine(plot.left(), y, plot.right(), y)
+            painter.setPen(text)
+            label = '{0:g}'.format(viscosity)
+            painter.drawText(plot.left() - metrics.width(label) - 6,
+                             y + metrics.ascent() // 2, label)
+        start, stop = (int(t) for t in self.temperature_range)
+        for temperature in range(start, stop + 1, 10):
+            x = int(self._x(temperature))
+            painter.setPen(grid)
+            painter.drawLine(x, plot.top(), x, plot.bottom())
+            if temperature % 20 == 0:
+                painter.setPen(text)
+                label = str(temperature)
+                painter.drawText(x - metrics.width(label) // 2,
+                                 plot.bottom() + metrics.height(), label)
+        painter.setPen(text)
+        painter.drawRect(plot)
+        painter.drawText(plot.left(), self.height() - 4,
+                         'Temperature (°C)   Kinematic Viscosity (cSt)')
+
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setClipRect(plot)
+        for index, (start, end) in enumerate(self._lines):
+            painter.setPen(QtGui.QPen(self.color(index), 1.5))
+            painter.drawLine(
+                QtCore.QPointF(plot.left(),
+                               plot.bottom() - start * plot.height()),
+                QtCore.QPointF(plot.right(),
+                               plot.bottom() - end * plot.height()))
+        painter.end()
+
+    def paintEvent(self, event):
+        if self._pixmap is None or self._pixmap.size() != self.size():
+            self._render()
+        painter = QtGui.QPainter(self)
+        painter.drawPixmap(event.rect(), self._pixmap, event.rect())
+        if self._cursor is None:
+            return
+        plot = self._plot_rect()
+        x = self._x(self._cursor)
+        painter.setPen(self.palette().color(QtGui.QPalette.Text))
+        painter.drawLine(QtCore.QPointF(x, plot.top()),
+                         QtCore.QPointF(x, plot.bottom()))
+        label = '{0:.1f} °C'.format(self._cursor)
+        width = painter.fontMetrics().width(label)
+        # Keep the label inside the plot, on the left near the right edge
+        if x + 4 + width < plot.right():
+            left = int(x) + 4
+        else:
+            left = int(x) - 4 - width
+        painter.drawText(left, plot.top() + 14, label)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setClipRect(plot)
+        for index, viscosity in enumerate(self.viscosities_at(self._cursor)):
+            low, high = self.viscosity_range
+            if low <= viscosity <= high:
+                painter.setBrush(self.color(index))
+                painter.drawEllipse(QtCore.QPointF(x, self._y(viscosity)),
+                                    3, 3)
+
+    def mouseMoveEvent(self, event):
+        if self._plot_rect().contains(event.pos()):
+            self.set_cursor(round(self._temperature(event.x()), 1))
+        super().mouseMoveEvent(event)
+
+    def leaveEvent(self, event):
+        self.set_cursor(None)
+        super().leaveEvent(event)
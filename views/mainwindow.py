@@ -32,12 +32,22 @@ from .tabs import TabsCollection
 class LubricalcMWin(QMainWindow):
     """Lubricalc main window."""
 
+    # Emitted once, when the window is first shown
+    shown = QtCore.pyqtSignal()
+
     def __init__(self):
         super().__init__()
+        self._shown = False
         self._init_win()
         self._create_menubar()
         self._create_status_bar()
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._shown:
+            self._shown = True
+            self.shown.emit()
+
     def _init_win(self):
         self.resize(600, 600)
         self.setWindowTitle(APP_NAME + ' ' + VERSION)
@@ -53,15 +63,21 @@ class LubricalcMWin(QMainWindow):
         menubar = QtWidgets.QMenuBar(self)
         menubar.setGeometry(QtCore.QRect(0, 0, 600, 27))
         menu_file = QtWidgets.QMenu(self.tr('&File'), menubar)
+        menu_options = QtWidgets.QMenu(self.tr('&Options'), menubar)
         menu_help = QtWidgets.QMenu(self.tr('&Help'), menubar)
 
         self.action_about = QtWidgets.QAction(self.tr('&About'), self)
         self.action_exit = QtWidgets.QAction(self.tr('&Exit'), self)
+        self.action_live = QtWidgets.QAction(self.tr('&Live Calculation'),
+                                             self)
+        self.action_live.setCheckable(True)
 
         menu_file.addAction(self.action_exit)
+        menu_options.addAction(self.action_live)
         menu_help.addAction(self.action_about)
 
         menubar.addMenu(menu_file)
+        menubar.addMenu(menu_options)
         menubar.addMenu(menu_help)
 
         self.setMenuBar(menubar)
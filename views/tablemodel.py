@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+# File name: tablemodel.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides ColumnarTableModel Class."""
+
+from PyQt5 import QtCore, QtGui
+
+from lubricalc.validator import Validator
+
+INVALID_COLOR = QtGui.QColor(255, 200, 200)
+
+
+def parse_table(text, names):
+    """Return (names, columns) from tab separated text.
+
+    A first row with no number in it is taken as a header with the column
+    names; otherwise columns are named after names, in order.
+    """
+    rows = [line.split('\t') for line in text.splitlines() if line.strip()]
+    if rows and not any(_is_number(cell) for cell in rows[0]):
+        names, rows = [cell.strip() for cell in rows[0]], rows[1:]
+    names = list(names)
+    columns = [[] for _ in names]
+    for row in rows:
+        row = row + [''] * (len(names) - len(row))
+        for column, cell in zip(columns, row):
+            column.append(cell.strip())
+    return names, columns
+
+
+def _is_number(value):
+    # Parsed like the calculators parse it, so '46,2' is a number too
+    try:
+        Validator.validate_float('', value)
+    except ValueError:
+        return False
+    return True
+
+
+class ColumnarTableModel(QtCore.QAbstractTableModel):
+    """Class to show input columns and their results in a table view.
+
+    Data stays in one list per column, the way lubricalc.columnar takes
+    and returns it, so a whole column goes to the calculators without
+    copying and the view only formats the cells it paints. Failed results
+    and cells that are not numbers are painted red, with the error as
+    tool tip.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names = []
+        self.columns = []
+        self.result_names = []
+        self.results = []
+
+    def set_columns(self, names, columns):
+        self.beginResetModel()
+        self.names = list(names)
+        self.columns = [list(column) for column in columns]
+        self.result_names = []
+        self.results = []
+        self.endResetModel()
+
+    def input_columns(self):
+        """Return a mapping of the input names to their columns."""
+        return dict(zip(self.names, self.columns))
+
+    def set_results(self, results):
+        """Show results, one result column per field of tuple results."""
+        fields = next((result._fields for result in results
+                       if hasattr(result, '_fields')), None)
+        self.beginResetModel()
+        self.result_names = list(fields) if fields else ['result']
+        self.results = results
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or not self.columns:
+            return 0
+        return len(self.columns[0])
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.names) + len(self.result_names)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Vertical:
+            return section + 1
+        return (self.names + self.result_names)[section]
+
+    def flags(self, index):
+        flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+        if index.column() < len(self.names):
+            flags |= QtCore.Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        row, column = index.row(), index.column()
+        if column < len(self.names):
+            value = self.columns[column][row]
+            invalid = value != '' and not _is_number(value)
+            error = 'Not a number' if invalid else None
+        else:
+            value = self.results[row]
+            error = str(value) if isinstance(value, Exception) else None
+            if error is not None:
+                value = 'Error'
+            elif value is not None and len(self.result_names) > 1:
+                value = value[column - len(self.names)]
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return '' if value is None else str(value)
+        if role == QtCore.Qt.ToolTipRole:
+            return error
+        if role == QtCore.Qt.BackgroundRole and error is not None:
+            return INVALID_COLOR
+        return None
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if role != QtCore.Qt.EditRole or index.column() >= len(self.names):
+            return False
+        row = index.row()
+        self.columns[index.column()][row] = str(value).strip()
+        self.dataChanged.emit(index, index)
+        if self.results:
+            # The result of the row is out of date until recalculated
+            self.results[row] = None
+            self.dataChanged.emit(self.index(row, len(self.names)),
+                                  self.index(row, self.columnCount() - 1))
+        return True
@@ -21,46 +21,202 @@
 
 """This module provides Tabs for Lubricalc app."""
 
-from PyQt5 import QtGui, QtWidgets
+from collections import OrderedDict
+import inspect
+import time
 
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from lubricalc import columnar
+from lubricalc.batch import calculate
 from lubricalc.blend import OilBlend
 from lubricalc.exception import *
-from lubricalc.bearing import Bearing
-from lubricalc.mixture import OilMixture
 from lubricalc.viscosity import Viscosity
+from .chart import ViscosityChart
+from .tablemodel import ColumnarTableModel
+from .tablemodel import parse_table
+from .worker import CalculationWorker
 
 
 class TabsCollection(QtWidgets.QTabWidget):
-    """Class to define tabs."""
+    """Class to define tabs.
+
+    Every tab starts as an empty placeholder page and its widgets are only
+    built the first time it is shown.
+    """
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.live = False
+        self._pending = {}
         self._create_tabs()
+        self.currentChanged.connect(self._build_tab)
+        self._build_tab(self.currentIndex())
 
     def _create_tabs(self):
         for tab_class in BaseTab.__subclasses__():
+            placeholder = QtWidgets.QWidget()
+            layout = QtWidgets.QVBoxLayout(placeholder)
+            layout.setContentsMargins(0, 0, 0, 0)
+            index = self.addTab(placeholder, tab_class.text)
+            self._pending[index] = tab_class
+
+    def _build_tab(self, index):
+        tab_class = self._pending.pop(index, None)
+        if tab_class is not None:
             tab = tab_class()
-            self.addTab(tab, tab.text)
+            tab.live = self.live
+            self.widget(index).layout().addWidget(tab)
+
+    def set_live(self, live):
+        """Turn live recalculation on or off in every tab."""
+        self.live = live
+        for index in range(self.count()):
+            tab = self.tab(index)
+            if tab is not None:
+                tab.live = live
+
+    def tab(self, index):
+        """Return the tab at index, or None if it has not been built yet."""
+        layout = self.widget(index).layout()
+        return layout.itemAt(0).widget() if layout.count() else None
 
 
 class BaseTab(QtWidgets.QWidget):
-    """Base tab class."""
+    """Base tab class.
+
+    Calculations run through calculate(): results of recent inputs come
+    from a small per-tab cache, calculations listed in background run on
+    the worker, and errors are shown in the tab status label. In live
+    mode, editing a watched input recomputes at once if the result is
+    cached or cheap, and after a debounce delay otherwise.
+    """
+
+    text = ''
+    background = ()
+    cache_size = 128
+    debounce = 250
 
     def __init__(self):
         super().__init__()
         self.font = QtGui.QFont()
         self.font.setBold(True)
+        self.live = False
+        self.cache = OrderedDict()
+        self._outputs = {}
+        self._keys = {}
+        self._args = {}
+        self._timers = {}
+        self._editing = False
+        self._status_calc = None
+        self.status_label = QtWidgets.QLabel()
+        self.status_label.setStyleSheet('color: red')
+        self.status_label.setWordWrap(True)
+        self.worker = CalculationWorker(self)
+        self.worker.finished.connect(self.on_calculation_finished)
+        self.worker.failed.connect(self.on_calculation_finished)
 
     def setup_ui(self):
         raise NotImplementedError('It must be implemented by subclasses')
 
+    def watch(self, handler, *widgets):
+        """Call handler when any of widgets changes in live mode."""
+        def changed(*args):
+            if self.live:
+                self._editing = True
+                try:
+                    handler()
+                finally:
+                    self._editing = False
+
+        for widget in widgets:
+            if isinstance(widget, QtWidgets.QLineEdit):
+                widget.textChanged.connect(changed)
+            elif isinstance(widget, QtWidgets.QComboBox):
+                widget.currentIndexChanged.connect(changed)
+            else:
+                widget.valueChanged.connect(changed)
+
+    @staticmethod
+    def normalize(value):
+        """Return the cache key form of an input ('5', ' 5.0' -> 5.0)."""
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return value.strip() if isinstance(value, str) else value
+
+    def calculate(self, calc, outputs, **kwargs):
+        """Run the lubricalc.batch calculation calc with kwargs.
+
+        outputs are (label, text) pairs; every label is set to
+        text.format(result). A new calculation of calc supersedes the one
+        still running, so only the result of the latest inputs is shown.
+        """
+        key = (calc, tuple(sorted((name, self.normalize(value))
+                                  for name, value in kwargs.items())))
+        self._outputs[calc] = outputs
+        self._keys[calc] = key
+        self._args[calc] = kwargs
+        if calc in self._timers:
+            self._timers[calc].stop()
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.worker.cancel(calc)
+            self._show(calc, self.cache[key])
+        elif calc not in self.background:
+            try:
+                result = calculate(calc, kwargs)
+            except (ValueError, ConceptError) as error:
+                result = error
+            self._store(key, result)
+            self._show(calc, result)
+        elif self._editing:
+            # Wait for the user to stop typing before a long calculation
+            self.worker.cancel(calc)
+            timer = self._timers.get(calc)
+            if timer is None:
+                timer = self._timers[calc] = QtCore.QTimer(self)
+                timer.setSingleShot(True)
+                timer.setInterval(self.debounce)
+                timer.timeout.connect(lambda: self._submit(calc))
+            timer.start()
+        else:
+            self._submit(calc)
+
+    def _submit(self, calc):
+        self.worker.submit(calc, calculate, calc=calc, args=self._args[calc])
+
+    def _store(self, key, result):
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _show(self, calc, result):
+        if isinstance(result, Exception):
+            for label, text in self._outputs[calc]:
+                label.setText(text.partition(' =')[0])
+            self.status_label.setText(str(result))
+            self._status_calc = calc
+            return
+        for label, text in self._outputs[calc]:
+            label.setText(text.format(result))
+        if self._status_calc == calc:
+            self.status_label.clear()
+            self._status_calc = None
+
+    def on_calculation_finished(self, calc, result):
+        self._store(self._keys[calc], result)
+        self._show(calc, result)
+
 
 class ViscosityTab(BaseTab):
     """Class to implement Viscosity tab."""
 
+    text = 'Viscosity'
+    background = ('viscosity_at_40', 'viscosity_at_100')
+
     def __init__(self):
         super().__init__()
-        self.text = 'Viscosity'
         self.setup_ui()
         self.viscosity_index_btn.clicked.connect(
             self.on_viscosity_index_button_clicked)
@@ -70,6 +226,15 @@ class ViscosityTab(BaseTab):
             self.on_viscosity_100_button_clicked)
         self.viscosity_any_btn.clicked.connect(
             self.on_viscosity_any_button_clicked)
+        self.watch(self.on_viscosity_index_button_clicked,
+                   self.viscosity0_40_edit, self.viscosity0_100_edit)
+        self.watch(self.on_viscosity_40_button_clicked,
+                   self.viscosity1_100_edit, self.index0_edit)
+        self.watch(self.on_viscosity_100_button_clicked,
+                   self.viscosity1_40_edit, self.index1_edit)
+        self.watch(self.on_viscosity_any_button_clicked,
+                   self.viscosity2_40_edit, self.viscosity2_100_edit,
+                   self.temperature_dspin)
 
     def setup_ui(self):
         """Setup tab UI."""
@@ -78,6 +243,7 @@ class ViscosityTab(BaseTab):
         general_layout.addWidget(self._create_viscosity_40_group())
         general_layout.addWidget(self._create_viscosity_100_group())
         general_layout.addWidget(self._create_viscosity_any_group())
+        general_layout.addWidget(self.status_label)
         self.setLayout(general_layout)
 
     def _create_viscosity_index_group(self):
@@ -95,7 +261,7 @@ class ViscosityTab(BaseTab):
         index_layout.addRow(self.viscosity_index_btn, self.index_label)
         index_gpb.setLayout(index_layout)
         self.viscosity_index_btn.setToolTip(
-            Viscosity().viscosity_index.__doc__)
+            Viscosity.viscosity_index.__doc__)
         return index_gpb
 
     def _create_viscosity_40_group(self):
@@ -114,7 +280,7 @@ class ViscosityTab(BaseTab):
         viscosity_40_layout.addRow(self.viscosity_40_btn,
                                    self.viscosity_40_label)
         viscosity_40_gpb.setLayout(viscosity_40_layout)
-        self.viscosity_40_btn.setToolTip(Viscosity().viscosity_at_40.__doc__)
+        self.viscosity_40_btn.setToolTip(Viscosity.viscosity_at_40.__doc__)
         return viscosity_40_gpb
 
     def _create_viscosity_100_group(self):
@@ -133,7 +299,7 @@ class ViscosityTab(BaseTab):
         viscosity_100_layout.addRow(self.viscosity_100_btn,
                                     self.viscosity_100_label)
         viscosity_100_gpb.setLayout(viscosity_100_layout)
-        self.viscosity_100_btn.setToolTip(Viscosity().viscosity_at_100.__doc__)
+        self.viscosity_100_btn.setToolTip(Viscosity.viscosity_at_100.__doc__)
         return viscosity_100_gpb
 
     def _create_viscosity_any_group(self):
@@ -163,117 +329,61 @@ class ViscosityTab(BaseTab):
         return viscosity_any_gpb
 
     def on_viscosity_index_button_clicked(self):
-        try:
-            vi = Viscosity().viscosity_index(
-                viscosity40=self.viscosity0_40_edit.text(),
-                viscosity100=self.viscosity0_100_edit.text())
-            self.index_label.setText('Viscosity Index' + ' = ' + str(vi))
-        except ValueError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except InvertedViscosityError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except ConceptError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
+        self.calculate('viscosity_index',
+                       ((self.index_label, 'Viscosity Index = {0}'),),
+                       viscosity40=self.viscosity0_40_edit.text(),
+                       viscosity100=self.viscosity0_100_edit.text())
 
     def on_viscosity_40_button_clicked(self):
-        try:
-            result = Viscosity().viscosity_at_40(
-                viscosity100=self.viscosity1_100_edit.text(),
-                v_index=self.index0_edit.text())
-            self.viscosity_40_label.setText('Kinematic Viscosity at 40°C' +
-                                            ' = ' + str(result) + ' ' + 'cSt')
-        except ValueError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except ConceptError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
+        self.calculate('viscosity_at_40',
+                       ((self.viscosity_40_label,
+                         'Kinematic Viscosity at 40°C = {0} cSt'),),
+                       viscosity100=self.viscosity1_100_edit.text(),
+                       v_index=self.index0_edit.text())
 
     def on_viscosity_100_button_clicked(self):
-        try:
-            result = Viscosity().viscosity_at_100(
-                viscosity40=self.viscosity1_40_edit.text(),
-                v_index=self.index1_edit.text())
-            self.viscosity_100_label.setText('Kinematic Viscosity at 100°C' +
-                                             ' = ' + str(result) + ' ' + 'cSt')
-        except ValueError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except ConceptError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
+        self.calculate('viscosity_at_100',
+                       ((self.viscosity_100_label,
+                         'Kinematic Viscosity at 100°C = {0} cSt'),),
+                       viscosity40=self.viscosity1_40_edit.text(),
+                       v_index=self.index1_edit.text())
 
     def on_viscosity_any_button_clicked(self):
-        try:
-            result = Viscosity().viscosity_at_any_temp(
-                viscosity40=self.viscosity2_40_edit.text(),
-                viscosity100=self.viscosity2_100_edit.text(),
-                temperature=self.temperature_dspin.value())
-            self.viscosity_any_label.setText(
-                'Kinematic Viscosity at' + ' ' +
-                str(self.temperature_dspin.value()) + '°C' +
-                ' = ' + str(result) + ' ' + 'cSt')
-        except ValueError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except InvertedViscosityError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except ConceptError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
+        temperature = self.temperature_dspin.value()
+        self.calculate('viscosity_at_any_temp',
+                       ((self.viscosity_any_label,
+                         'Kinematic Viscosity at ' + str(temperature) +
+                         '°C = {0} cSt'),),
+                       viscosity40=self.viscosity2_40_edit.text(),
+                       viscosity100=self.viscosity2_100_edit.text(),
+                       temperature=temperature)
 
 
 class BaseOilMixtureTab(BaseTab):
     """Class to implement Base Oil Mixture tab."""
 
+    text = 'Oil Mixture'
+
     def __init__(self):
         super().__init__()
-        self.text = 'Oil Mixture'
         self.setup_ui()
         self.mix_viscosity_btn.clicked.connect(
             self.on_mix_viscosity_button_clicked)
         self.mix_proportions_btn.clicked.connect(
             self.on_calculate_proportions_btn_clicked)
+        self.watch(self.on_mix_viscosity_button_clicked,
+                   self.viscosity01_edit, self.viscosity02_edit,
+                   self.oil1_percent_edit, self.temperature0_combo)
+        self.watch(self.on_calculate_proportions_btn_clicked,
+                   self.viscosity11_edit, self.viscosity12_edit,
+                   self.mix_viscosity_edit, self.temperature1_combo)
 
     def setup_ui(self):
         """Setup tab UI."""
         general_layout = QtWidgets.QVBoxLayout()
         general_layout.addWidget(self._create_base_oil_mixture_group())
         general_layout.addWidget(self._create_base_oil_proportions_group())
+        general_layout.addWidget(self.status_label)
         self.setLayout(general_layout)
 
     def _create_base_oil_mixture_group(self):
@@ -330,69 +440,50 @@ class BaseOilMixtureTab(BaseTab):
         return proportions_gpb
 
     def on_mix_viscosity_button_clicked(self):
-        try:
-            mix_viscosity = OilMixture().oil_mix_viscosity(
-                viscosity0=self.viscosity01_edit.text(),
-                viscosity1=self.viscosity02_edit.text(),
-                oil0_percent=self.oil1_percent_edit.text(),
-                temperature=self.temperature0_combo.currentText())
-            self.mix_viscosity_label.setText('Mixture Kinematic Viscosity' +
-                                             ' = ' + str(mix_viscosity) + ' ' +
-                                             'cSt')
-        except ValueError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except ConceptError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
+        self.calculate('oil_mix_viscosity',
+                       ((self.mix_viscosity_label,
+                         'Mixture Kinematic Viscosity = {0} cSt'),),
+                       viscosity0=self.viscosity01_edit.text(),
+                       viscosity1=self.viscosity02_edit.text(),
+                       oil0_percent=self.oil1_percent_edit.text(),
+                       temperature=self.temperature0_combo.currentText())
 
     def on_calculate_proportions_btn_clicked(self):
-        try:
-            proportions = OilMixture().mix_proportions(
-                viscosity0=self.viscosity11_edit.text(),
-                viscosity1=self.viscosity12_edit.text(),
-                mix_viscosity=self.mix_viscosity_edit.text(),
-                temperature=self.temperature1_combo.currentText())
-            self.oil1_label.setText('1st. Oil Proportion in Mixture' + ' = ' +
-                                    str(proportions.oil1) + ' ' + '%')
-            self.oil2_label.setText('2nd. Oil Proportion in Mixture' + ' = ' +
-                                    str(proportions.oil2) + ' ' + '%')
-        except ValueError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except ConceptError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
+        self.calculate('mix_proportions',
+                       ((self.oil1_label,
+                         '1st. Oil Proportion in Mixture = {0.oil1} %'),
+                        (self.oil2_label,
+                         '2nd. Oil Proportion in Mixture = {0.oil2} %')),
+                       viscosity0=self.viscosity11_edit.text(),
+                       viscosity1=self.viscosity12_edit.text(),
+                       mix_viscosity=self.mix_viscosity_edit.text(),
+                       temperature=self.temperature1_combo.currentText())
 
 
 class BearingTab(BaseTab):
     """Class to implement Bearing Lubrication tab."""
 
+    text = 'Bearing Lubrication'
+
     def __init__(self):
         super().__init__()
-        self.text = 'Bearing Lubrication'
         self.setup_ui()
         self.grease_amount_btn.clicked.connect(
             self.on_grease_amount_button_clicked)
         self.frequency_btn.clicked.connect(self.on_frequency_button_clicked)
+        self.watch(self.on_grease_amount_button_clicked,
+                   self.outer_diameter_edit, self.width_edit)
+        self.watch(self.on_frequency_button_clicked,
+                   self.rpm_edit, self.inner_diameter_edit, self.ft_combo,
+                   self.fc_combo, self.fh_combo, self.fv_combo,
+                   self.fp_combo, self.fd_combo)
 
     def setup_ui(self):
         """Setup tab UI."""
         general_layout = QtWidgets.QVBoxLayout()
         general_layout.addWidget(self._create_grease_amount_group())
         general_layout.addWidget(self._create_frequency_group())
+        general_layout.addWidget(self.status_label)
         self.setLayout(general_layout)
 
     def _create_grease_amount_group(self):
@@ -460,69 +551,49 @@ class BearingTab(BaseTab):
         return frequency_group
 
     def on_grease_amount_button_clicked(self):
-        try:
-            grease_amount = Bearing().grease_amount(
-                outer_diameter=self.outer_diameter_edit.text(),
-                width=self.width_edit.text())
-            self.grease_amount_label.setText('Amount of Grease for '
-                                             'Re-lubrication'
-                                             + ' = ' + str(grease_amount)
-                                             + ' ' + 'g')
-        except ValueError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except ConceptError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
+        self.calculate('grease_amount',
+                       ((self.grease_amount_label,
+                         'Amount of Grease for Re-lubrication = {0} g'),),
+                       outer_diameter=self.outer_diameter_edit.text(),
+                       width=self.width_edit.text())
 
     def on_frequency_button_clicked(self):
-        try:
-            frequency = Bearing().lubrication_frequency(
-                rpm=self.rpm_edit.text(),
-                inner_diameter=self.inner_diameter_edit.text(),
-                ft=self.ft_combo.currentIndex(),
-                fh=self.fh_combo.currentIndex(),
-                fv=self.fv_combo.currentIndex(),
-                fp=self.fp_combo.currentIndex(),
-                fc=self.fc_combo.currentIndex(),
-                fd=self.fd_combo.currentIndex())
-            self.frequency_label.setText('Re-lubrication Frequency' + ' = ' +
-                                         str(frequency) + ' ' + 'hours')
-        except ValueError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except ConceptError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
+        self.calculate('lubrication_frequency',
+                       ((self.frequency_label,
+                         'Re-lubrication Frequency = {0} hours'),),
+                       rpm=self.rpm_edit.text(),
+                       inner_diameter=self.inner_diameter_edit.text(),
+                       ft=self.ft_combo.currentIndex(),
+                       fh=self.fh_combo.currentIndex(),
+                       fv=self.fv_combo.currentIndex(),
+                       fp=self.fp_combo.currentIndex(),
+                       fc=self.fc_combo.currentIndex(),
+                       fd=self.fd_combo.currentIndex())
 
 
 class AdditiveAshTab(BaseTab):
     """Class to implement Additive / Ash tab."""
 
+    text = 'Additive/Ash'
+
     def __init__(self):
         super().__init__()
-        self.text = 'Additive/Ash'
         self.setup_ui()
         self.additive_btn.clicked.connect(self.on_additive_button_clicked)
         self.total_ash_btn.clicked.connect(self.on_total_ash_button_clicked)
+        self.watch(self.on_additive_button_clicked,
+                   self.additive_percent0_edit, self.additive_density_edit,
+                   self.oil_density_edit)
+        self.watch(self.on_total_ash_button_clicked,
+                   self.additive_percent1_edit,
+                   *(self.__dict__[metal] for metal in OilBlend.metals()))
 
     def setup_ui(self):
         """Setup tab UI."""
         general_layout = QtWidgets.QVBoxLayout()
         general_layout.addWidget(self._create_additive_group())
         general_layout.addWidget(self._create_ash_group())
+        general_layout.addWidget(self.status_label)
         self.setLayout(general_layout)
 
     def _create_additive_group(self):
@@ -539,7 +610,7 @@ class AdditiveAshTab(BaseTab):
         additive_layout.addRow('Finished Oil Density (kg/L):',
                                self.oil_density_edit)
         self.additive_btn = QtWidgets.QPushButton('Calculate')
-        self.additive_btn.setToolTip(OilBlend(1).additive_percent_mass.__doc__)
+        self.additive_btn.setToolTip(OilBlend.additive_percent_mass.__doc__)
         self.additive_label = QtWidgets.QLabel('Additive')
         self.additive_label.setFont(self.font)
         additive_layout.addRow(self.additive_btn, self.additive_label)
@@ -568,46 +639,195 @@ class AdditiveAshTab(BaseTab):
         return ash_gpb
 
     def on_additive_button_clicked(self):
-        try:
-            blend = OilBlend(self.additive_percent0_edit.text())
-            additive = blend.additive_percent_mass(
-                additive_density=self.additive_density_edit.text(),
-                oil_density=self.oil_density_edit.text())
-            self.additive_label.setText('Additive' + ' = ' +
-                                        str(additive) + ' ' + '% by mass')
-        except ValueError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except ConceptError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
+        self.calculate('additive_percent_mass',
+                       ((self.additive_label, 'Additive = {0} % by mass'),),
+                       additive_percent=self.additive_percent0_edit.text(),
+                       additive_density=self.additive_density_edit.text(),
+                       oil_density=self.oil_density_edit.text())
 
     def on_total_ash_button_clicked(self):
+        metal_contents = {}
+        for metal in OilBlend.metals():
+            metal_contents[metal] = self.__dict__[metal].text()
+
+        self.calculate('total_ash',
+                       ((self.total_ash_label, 'Total Ash = {0} % by mass'),),
+                       additive_percent=self.additive_percent1_edit.text(),
+                       **metal_contents)
+
+
+class BatchTab(BaseTab):
+    """Class to implement Batch tab."""
+
+    text = 'Batch'
+
+    def __init__(self):
+        super().__init__()
+        self.model = ColumnarTableModel(self)
+        self.setup_ui()
+        self.calc_combo.currentTextChanged.connect(self.on_calc_changed)
+        self.paste_btn.clicked.connect(self.on_paste_button_clicked)
+        self.batch_btn.clicked.connect(self.on_batch_button_clicked)
+        self.on_calc_changed(self.calc_combo.currentText())
+
+    def setup_ui(self):
+        """Setup tab UI."""
+        general_layout = QtWidgets.QVBoxLayout()
+        controls_layout = QtWidgets.QHBoxLayout()
+        self.calc_combo = QtWidgets.QComboBox()
+        self.calc_combo.addItems(sorted(columnar.FUNCTIONS))
+        self.paste_btn = QtWidgets.QPushButton('Paste')
+        self.paste_btn.setToolTip('Paste tab separated rows, optionally '
+                                  'with a header row of argument names')
+        self.batch_btn = QtWidgets.QPushButton('Calculate')
+        controls_layout.addWidget(self.calc_combo, 1)
+        controls_layout.addWidget(self.paste_btn)
+        controls_layout.addWidget(self.batch_btn)
+        self.table_view = QtWidgets.QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.setWordWrap(False)
+        # Fixed row heights keep scrolling cheap for any number of rows
+        header = self.table_view.verticalHeader()
+        header.setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        header.setDefaultSectionSize(
+            self.table_view.fontMetrics().height() + 6)
+        self.summary_label = QtWidgets.QLabel()
+        self.summary_label.setFont(self.font)
+        general_layout.addLayout(controls_layout)
+        general_layout.addWidget(self.table_view)
+        general_layout.addWidget(self.summary_label)
+        general_layout.addWidget(self.status_label)
+        self.setLayout(general_layout)
+
+    @staticmethod
+    def arguments(calc):
+        """Return the argument names of a columnar calculation."""
+        parameters = inspect.signature(columnar.FUNCTIONS[calc]).parameters
+        # Options such as rounded have defaults and are not columns
+        return [name for name, parameter in parameters.items()
+                if parameter.kind != parameter.VAR_KEYWORD and
+                parameter.default is parameter.empty]
+
+    @staticmethod
+    def calculate_columns(calc, columns):
+        try:
+            return columnar.calculate(calc, columns)
+        except TypeError as error:
+            raise ValueError('{0}: {1}'.format(calc, error))
+
+    def on_calc_changed(self, calc):
+        names = self.arguments(calc)
+        self.model.set_columns(names, [[] for _ in names])
+        self.summary_label.clear()
+        self.status_label.clear()
+
+    def on_paste_button_clicked(self):
+        names, columns = parse_table(
+            QtWidgets.QApplication.clipboard().text(),
+            self.arguments(self.calc_combo.currentText()))
+        self.model.set_columns(names, columns)
+        self.summary_label.setText('{0} rows'.format(self.model.rowCount()))
+        self.status_label.clear()
+
+    def on_batch_button_clicked(self):
+        columns = {name: list(column)
+                   for name, column in self.model.input_columns().items()}
+        self._started = time.perf_counter()
+        self.summary_label.setText('Calculating {0} rows...'.format(
+            self.model.rowCount()))
+        self.status_label.clear()
+        self.worker.submit('batch', self.calculate_columns,
+                           calc=self.calc_combo.currentText(),
+                           columns=columns)
+
+    def on_calculation_finished(self, key, result):
+        if isinstance(result, Exception):
+            self.summary_label.clear()
+            self.status_label.setText(str(result))
+            return
+        self.model.set_results(result)
+        failed = sum(isinstance(value, Exception) for value in result)
+        self.summary_label.setText(
+            '{0} rows calculated in {1:.2f} s, {2} failed'.format(
+                len(result), time.perf_counter() - self._started, failed))
+
+
+class ViscosityChartTab(BaseTab):
+    """Class to implement Viscosity Chart tab."""
+
+    text = 'Viscosity Chart'
+
+    def __init__(self):
+        super().__init__()
+        self.setup_ui()
+        self.add_oil_btn.clicked.connect(self.on_add_oil_button_clicked)
+        self.paste_oils_btn.clicked.connect(self.on_paste_oils_button_clicked)
+        self.clear_oils_btn.clicked.connect(self.on_clear_oils_button_clicked)
+        self.chart.cursor_moved.connect(self.on_cursor_moved)
+
+    def setup_ui(self):
+        """Setup tab UI."""
+        general_layout = QtWidgets.QVBoxLayout()
+        oil_layout = QtWidgets.QHBoxLayout()
+        self.oil_name_edit = QtWidgets.QLineEdit()
+        self.oil_name_edit.setPlaceholderText('Oil')
+        self.oil_40_edit = QtWidgets.QLineEdit()
+        self.oil_40_edit.setPlaceholderText('KV40 (cSt)')
+        self.oil_100_edit = QtWidgets.QLineEdit()
+        self.oil_100_edit.setPlaceholderText('KV100 (cSt)')
+        self.add_oil_btn = QtWidgets.QPushButton('Add')
+        self.paste_oils_btn = QtWidgets.QPushButton('Paste')
+        self.paste_oils_btn.setToolTip('Paste tab separated rows of oil '
+                                       'name, KV40 and KV100')
+        self.clear_oils_btn = QtWidgets.QPushButton('Clear')
+        for widget in (self.oil_name_edit, self.oil_40_edit,
+                       self.oil_100_edit, self.add_oil_btn,
+                       self.paste_oils_btn, self.clear_oils_btn):
+            oil_layout.addWidget(widget)
+        self.chart = ViscosityChart()
+        self.legend_list = QtWidgets.QListWidget()
+        self.legend_list.setMaximumHeight(100)
+        general_layout.addLayout(oil_layout)
+        general_layout.addWidget(self.chart, 1)
+        general_layout.addWidget(self.legend_list)
+        general_layout.addWidget(self.status_label)
+        self.setLayout(general_layout)
+
+    def add_oil(self, name, viscosity40, viscosity100):
+        name = name or 'Oil {0}'.format(len(self.chart.oils) + 1)
+        self.chart.add_oil(name, viscosity40, viscosity100)
+        item = QtWidgets.QListWidgetItem(name)
+        item.setForeground(self.chart.color(len(self.chart.oils) - 1))
+        self.legend_list.addItem(item)
+
+    def on_add_oil_button_clicked(self):
         try:
-            blend = OilBlend(self.additive_percent1_edit.text())
-
-            metal_contents = {}
-            for metal in OilBlend.metals():
-                metal_contents[metal] = self.__dict__[metal].text()
-
-            total_ash = blend.total_ash(**metal_contents)
-            self.total_ash_label.setText('Total Ash' + ' = ' + str(total_ash) +
-                                         ' % by mass')
-        except ValueError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
-        except ConceptError as error:
-            QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical,
-                                  'Error',
-                                  error.__str__(),
-                                  QtWidgets.QMessageBox.Ok,
-                                  self).show()
+            self.add_oil(self.oil_name_edit.text(), self.oil_40_edit.text(),
+                         self.oil_100_edit.text())
+        except (ValueError, ConceptError) as error:
+            self.status_label.setText(str(error))
+        else:
+            self.status_label.clear()
+
+    def on_paste_oils_button_clicked(self):
+        _, columns = parse_table(QtWidgets.QApplication.clipboard().text(),
+                                 ['name', 'viscosity40', 'viscosity100'])
+        errors = []
+        for row, oil in enumerate(zip(*columns[:3]), 1):
+            try:
+                self.add_oil(*oil)
+            except (ValueError, ConceptError) as error:
+                errors.append('Row {0}: {1}'.format(row, error))
+        self.status_label.setText('\n'.join(errors[:5]))
+
+    def on_clear_oils_button_clicked(self):
+        self.chart.clear()
+        self.legend_list.clear()
+        self.status_label.clear()
+
+    def on_cursor_moved(self, temperature, viscosities):
+        for row, (name, viscosity) in enumerate(zip(self.chart.oils,
+                                                    viscosities)):
+            self.legend_list.item(row).setText(
+                '{0}: {1} cSt at {2:.1f} °C'.format(name, viscosity,
+                                                    temperature))
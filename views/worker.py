@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+# File name: worker.py
+#
+# Copyright (C) 2018 Leodanis Pozo Ramos <lpozor78@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301, USA.
+
+"""This module provides CalculationWorker Class."""
+
+from itertools import count
+
+from PyQt5 import QtCore
+
+
+class _JobSignals(QtCore.QObject):
+    done = QtCore.pyqtSignal(str, int, object, bool)
+
+
+class CalculationJob(QtCore.QRunnable):
+    """Class to run one calculation on a thread pool thread."""
+
+    def __init__(self, key, job_id, function, kwargs, signals):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.key = key
+        self.job_id = job_id
+        self.function = function
+        self.kwargs = kwargs
+        self.signals = signals
+
+    def run(self):
+        try:
+            result, failed = self.function(**self.kwargs), False
+        except Exception as error:
+            # Nothing must escape a pool thread, or done is never emitted
+            # and the job stays pending
+            result, failed = error, True
+        self.signals.done.emit(self.key, self.job_id, result, failed)
+
+
+class CalculationWorker(QtCore.QObject):
+    """Class to run calculations off the GUI thread.
+
+    Jobs are submitted under a key (one per result label, for instance).
+    A new job supersedes the previous job of its key: if that one has not
+    started yet it is taken off the pool, otherwise its result is dropped
+    when it arrives. Results and errors come back through signals, in the
+    thread the worker lives in.
+    """
+
+    finished = QtCore.pyqtSignal(str, object)
+    failed = QtCore.pyqtSignal(str, object)
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QtCore.QThreadPool.globalInstance()
+        self.cancelled = 0
+        self._ids = count(1)
+        self._jobs = {}
+        # Every job not finished yet, so running ones are not collected
+        self._submitted = {}
+        self._signals = _JobSignals()
+        self._signals.done.connect(self._on_done)
+
+    def submit(self, key, function, **kwargs):
+        """Run function(**kwargs) in the pool and return the job id."""
+        self.cancel(key)
+        job = CalculationJob(key, next(self._ids), function, kwargs,
+                             self._signals)
+        self._jobs[key] = job
+        self._submitted[job.job_id] = job
+        self.pool.start(job)
+        return job.job_id
+
+    def cancel(self, key):
+        """Supersede the job of key, if any."""
+        job = self._jobs.pop(key, None)
+        if job is not None:
+            self.cancelled += 1
+            if self.pool.tryTake(job):
+                del self._submitted[job.job_id]
+
+    def pending(self):
+        """Return the number of submitted jobs not finished yet."""
+        return len(self._submitted)
+
+    def _on_done(self, key, job_id, result, failed):
+        self._submitted.pop(job_id, None)
+        job = self._jobs.get(key)
+        if job is None or job.job_id != job_id:
+            # Superseded or cancelled
+            return
+        del self._jobs[key]
+        (self.failed if failed else self.finished).emit(key, result)